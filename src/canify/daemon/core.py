@@ -7,64 +7,117 @@ Canify Daemon 核心
 import logging
 import threading
 import time
+from concurrent.futures import Future
+from functools import partial
 from pathlib import Path
-from typing import Optional, Dict, Any
+from typing import Callable, Iterable, Optional, Dict, Any, List, Set, Tuple
 from queue import Queue, Empty
 
-from ..storage import DatabaseManager, SymbolTableManager, SpecStorageManager
-from ..parsers import EntityDeclarationParser, EntityReferenceParser, EntityFieldReferenceParser
+from ..models import SpecificationRule, ValidationResult
+from ..storage import BlobStore, DatabaseManager, SymbolTableManager, SpecStorageManager
+from ..storage.maintenance import MaintenanceScheduler
+from ..storage.storage_writer import StorageWriter
+from ..storage.project_databases import legacy_db_path, migrate_from_legacy, project_db_path
 from ..parsers.symbol_extractor import SymbolExtractor
-from ..parsers.entity_schema_parser import EntitySchemaParser
-from ..extraction.spec_extractor import SpecExtractor
 from ..filtering.tag_filter import TagFilter
 from ..execution.spec_executor import SpecExecutor
 from ..validation.validation_engine import ValidationEngine
 from ..ipc.server import IPCServer
+from ..discovery.git_branch import read_current_branch
+from ..discovery.ignore_matcher import IgnoreMatcher, is_ignore_file
 from .file_watcher import FileWatcher
+from .event_coalescer import EventCoalescer, FileEvent
+from .dependency_tracker import DependencyTracker, FileSymbolState
+from .impact_analyzer import ImpactAnalyzer
+from .validation_snapshot import ValidationSnapshot
+from .indexer import ProjectIndexer, ScanStats
 
 logger = logging.getLogger(__name__)
 
+# search_entities 请求的默认和最大分页大小
+SEARCH_DEFAULT_LIMIT = 20
+SEARCH_MAX_LIMIT = 200
+
+# 处理线程的任务类型：后台执行 spec 规则，结果写入验证快照
+TASK_RUN_SPECS = "run_specs"
+
 
 class CanifyDaemon:
     """Canify Daemon 核心类"""
 
-    def __init__(self, project_root: Path, db_path: Optional[Path] = None):
+    def __init__(
+        self,
+        project_root: Path,
+        db_path: Optional[Path] = None,
+        scan_workers: Optional[int] = None,
+        warm_start: bool = True,
+        event_quiet_window: float = 0.2,
+        background_validation: bool = True,
+        db_in_project: bool = False
+    ):
         """
         初始化 Canify Daemon
 
         Args:
             project_root: 项目根目录
-            db_path: 数据库文件路径
+            db_path: 数据库文件路径，None 表示使用项目数据库（见 storage.project_databases）
+            scan_workers: 初始扫描的工作进程数，None 表示使用 CPU 核数，1 表示串行扫描
+            warm_start: 是否复用已持久化的符号表，只重新解析变化的文件
+            event_quiet_window: 文件事件的安静窗口（秒），窗口内同一文件的多个事件合并处理
+            background_validation: 是否在后台持续维护验证快照，validate 请求直接返回快照
+            db_in_project: 未指定 db_path 时，是否将项目数据库放在项目内的 .canify 目录
         """
         self.project_root = project_root
-        self.db_manager = DatabaseManager(db_path)
-        self.symbol_table = SymbolTableManager(self.db_manager)
+        self.warm_start = warm_start
+        self.background_validation = background_validation
+        # 每个项目使用独立的数据库，不同项目的 daemon 不会争用同一个写锁
+        self.use_project_db = db_path is None
+        self.db_manager = DatabaseManager(db_path or project_db_path(project_root, db_in_project))
         self.spec_storage = SpecStorageManager(self.db_manager)
-        self.file_watcher = FileWatcher(project_root)
-
-        # 解析器
-        self.declaration_parser = EntityDeclarationParser()
-        self.reference_parser = EntityReferenceParser()
-        self.field_reference_parser = EntityFieldReferenceParser()
-        self.schema_parser = EntitySchemaParser()
+        self.symbol_table = SymbolTableManager(self.db_manager, self.spec_storage)
+        self.storage_writer = StorageWriter(self.db_manager)
+        self.blob_store = BlobStore(self.db_manager)
+        # 空闲时分步执行 WAL 检查点和增量整理，数据库和 WAL 文件不会随删除和重新插入无限增长
+        self.maintenance = MaintenanceScheduler(self.db_manager)
+
+        # 忽略规则由初始扫描和文件监听共用，忽略文件变化时重新加载
+        self.ignore_matcher = IgnoreMatcher(project_root)
+        self.file_watcher = FileWatcher(project_root, self.ignore_matcher)
+
+        # 索引与解析
+        self.indexer = ProjectIndexer(
+            project_root, self.db_manager, self.symbol_table, self.spec_storage,
+            scan_workers=scan_workers, writer=self.storage_writer, ignore_matcher=self.ignore_matcher,
+            blob_store=self.blob_store
+        )
         self.symbol_extractor = SymbolExtractor()
-        self.spec_extractor = SpecExtractor(self.project_root)
 
         # 验证与执行
         self.validation_engine = ValidationEngine(self.symbol_table)
         self.tag_filter = TagFilter()
         self.spec_executor = SpecExecutor(self.project_root)
+        self.dependency_tracker = DependencyTracker(self.symbol_table)
+        self.impact_analyzer = ImpactAnalyzer(self.symbol_table)
 
         # IPC服务器
         self.ipc_server = IPCServer()
 
-        # 事件队列
-        self.event_queue: Queue = Queue()
+        # 事件合并与队列
+        self.event_coalescer = EventCoalescer(quiet_window=event_quiet_window)
         self.processing_queue: Queue = Queue()
 
         # 状态管理
         self.is_running = False
         self.project_id: Optional[int] = None
+        self.last_scan_stats: Optional[ScanStats] = None
+
+        # 当前 git 分支，不在 git 版本库中时为None
+        self.branch: Optional[str] = None
+        self.last_branch_switch: Optional[Dict[str, Any]] = None
+
+        # 验证快照：按文件和实体保存的诊断结果，随文件事件增量维护
+        self.validation_snapshot = ValidationSnapshot()
+        self.last_revalidation: Optional[Dict[str, Any]] = None
 
         # 线程
         self.event_thread: Optional[threading.Thread] = None
@@ -78,12 +131,24 @@ class CanifyDaemon:
 
         # 初始化数据库
         self.db_manager.initialize_schema()
+        logger.info(f"项目数据库: {self.db_manager.db_path}")
+
+        # 从旧版本的全局数据库迁移该项目的数据
+        if self.use_project_db:
+            migrate_from_legacy(self.db_manager, self.project_root, legacy_db_path())
 
         # 获取或创建项目记录
         self.project_id = self.symbol_table.get_or_create_project(self.project_root)
 
-        # 清理项目旧数据
-        self.symbol_table.clear_project_data(self.project_id)
+        # 冷启动时清理项目旧数据，热启动时由初始扫描增量同步
+        if not self.warm_start:
+            self.symbol_table.clear_project_data(self.project_id)
+
+        # 加载进程内符号索引，验证时的实体查询不再访问数据库
+        self.symbol_table.load_index(self.project_id)
+
+        # 启动存储写入线程，之后的符号表写入都由它执行
+        self.storage_writer.start()
 
         # 注册RPC方法
         self._register_rpc_methods()
@@ -97,6 +162,10 @@ class CanifyDaemon:
         # 执行初始全量扫描
         self._perform_initial_scan()
 
+        # 构建初始验证快照
+        if self.background_validation:
+            self._build_validation_snapshot()
+
         # 启动事件处理线程
         self.is_running = True
         self.event_thread = threading.Thread(target=self._event_loop, daemon=False)
@@ -104,23 +173,30 @@ class CanifyDaemon:
 
         self.event_thread.start()
         self.processing_thread.start()
+        self.maintenance.start()
 
         logger.info(f"Canify Daemon 已启动，项目: {self.project_root}, IPC端口: {port}")
 
     def _perform_initial_scan(self):
         """
-        对项目目录执行一次初始的全量扫描和处理。
-        """
-        logger.info("开始对项目进行初始扫描...")
-        relevant_extensions = ['.md', '.py', '.yaml', '.yml']
+        对项目目录执行一次初始扫描和处理。
 
-        for file_path in self.project_root.rglob('*'):
-            if file_path.is_file() and file_path.suffix in relevant_extensions:
-                relative_path = file_path.relative_to(self.project_root)
-                logger.debug(f"初始扫描发现文件: {relative_path}")
-                self._handle_file_update(str(relative_path))
-        
-        logger.info("初始扫描完成。")
+        热启动时只重新解析自上次运行以来新增或变化的文件。
+        """
+        logger.info(f"开始对项目进行初始扫描 ({'增量' if self.warm_start else '全量'})...")
+        stats = self.indexer.scan(self.project_id, incremental=self.warm_start)
+        self.last_scan_stats = stats
+
+        self.branch = read_current_branch(self.project_root)
+        self._record_branch_files()
+
+        logger.info(
+            f"初始扫描完成: {stats.files} 个文件 ({stats.failed_files} 个失败, "
+            f"{stats.unchanged_files} 个未变化, {stats.deleted_files} 个已删除), "
+            f"{stats.declarations} 个声明, {stats.references} 个引用, "
+            f"耗时 {stats.elapsed_seconds:.2f}s, {stats.files_per_second:.1f} 文件/秒, "
+            f"{stats.workers} 个工作进程"
+        )
 
     def stop(self) -> None:
         """停止 daemon"""
@@ -141,52 +217,74 @@ class CanifyDaemon:
         if self.processing_thread:
             self.processing_thread.join(timeout=5)
 
+        # 等待剩余的写操作提交
+        self.maintenance.stop()
+        self.storage_writer.stop()
+
         # 关闭数据库连接
         self.db_manager.close()
+        self.db_manager.pool.close()
 
         logger.info("Canify Daemon 已停止")
 
     def _register_rpc_methods(self):
-        """注册RPC方法"""
+        """注册RPC方法，每个请求在自己的线程中处理，读操作使用连接池中的只读连接"""
         from ..ipc.protocol import RPCMethods
 
         # Daemon管理方法
         self.ipc_server.register_method(
             RPCMethods.PING,
-            self._handle_ping
+            self._with_reader(self._handle_ping)
         )
         self.ipc_server.register_method(
             RPCMethods.GET_STATUS,
-            self._handle_get_status
+            self._with_reader(self._handle_get_status)
         )
         self.ipc_server.register_method(
             RPCMethods.SHUTDOWN,
-            self._handle_shutdown
+            self._with_reader(self._handle_shutdown)
         )
 
         # 项目相关方法
         self.ipc_server.register_method(
             RPCMethods.GET_PROJECT_STATUS,
-            self._handle_get_project_status
+            self._with_reader(self._handle_get_project_status)
         )
         self.ipc_server.register_method(
             RPCMethods.RELOAD_PROJECT,
-            self._handle_reload_project
+            self._with_reader(self._handle_reload_project)
         )
 
         # 验证相关方法
         self.ipc_server.register_method(
             RPCMethods.VALIDATE,
-            self._handle_validate
+            self._with_reader(self._handle_validate)
         )
         self.ipc_server.register_method(
             RPCMethods.LINT,
-            self._handle_lint
+            self._with_reader(self._handle_lint)
         )
         self.ipc_server.register_method(
             RPCMethods.VERIFY,
-            self._handle_verify
+            self._with_reader(self._handle_verify)
+        )
+
+        # 查询相关方法
+        self.ipc_server.register_method(
+            RPCMethods.IMPACT_ANALYSIS,
+            self._with_reader(self._handle_impact_analysis)
         )
+        self.ipc_server.register_method(
+            RPCMethods.SEARCH_ENTITIES,
+            self._with_reader(self._handle_search_entities)
+        )
+
+    def _with_reader(self, handler: Callable[[Dict[str, Any]], Dict[str, Any]]) -> Callable[[Dict[str, Any]], Dict[str, Any]]:
+        """包装RPC处理方法，使其在连接池的只读连接上执行"""
+        def handle(params: Dict[str, Any]) -> Dict[str, Any]:
+            with self.db_manager.reader():
+                return handler(params)
+        return handle
 
     def _handle_ping(self, params: Dict[str, Any]) -> Dict[str, Any]:
         """处理ping请求"""
@@ -198,7 +296,22 @@ class CanifyDaemon:
             "status": "running",
             "project_root": str(self.project_root),
             "is_running": self.is_running,
-            "project_id": self.project_id
+            "project_id": self.project_id,
+            "db_path": str(self.db_manager.db_path),
+            "initial_scan": self.last_scan_stats.to_dict() if self.last_scan_stats else None,
+            "file_events": self.event_coalescer.get_stats(),
+            "revalidation": self.last_revalidation,
+            "storage_writer": self.storage_writer.get_stats(),
+            "symbol_index": self.symbol_table.index.get_stats(),
+            "schema_registry": self.symbol_table.schemas.get_stats(),
+            "connection_pool": self.db_manager.pool.get_stats(),
+            "impact_analyzer": self.impact_analyzer.get_stats(),
+            "parse_cache": self.indexer.processor.parse_cache.get_stats(),
+            "maintenance": self.maintenance.get_stats(),
+            "branch": self.branch,
+            "last_branch_switch": self.last_branch_switch,
+            "blob_store": self.blob_store.get_stats(self.project_id) if self.project_id is not None else None,
+            "validation_snapshot": self.validation_snapshot.get_stats() if self.background_validation else None
         }
 
     def _handle_shutdown(self, params: Dict[str, Any]) -> Dict[str, Any]:
@@ -227,41 +340,247 @@ class CanifyDaemon:
         return {"message": "项目重新加载已触发"}
 
     def _handle_validate(self, params: Dict[str, Any]) -> Dict[str, Any]:
-        """处理验证请求"""
+        """
+        处理验证请求
+
+        后台验证开启时直接返回验证快照，spec 规则只返回后台执行的缓存结果，尚未执行完的
+        列在 pending_specs 中；options 中的 wait 表示先等待已收到的文件事件和 spec 规则
+        执行完成，full 表示忽略快照、重新执行全量验证。
+        """
+        options = params.get("options", {})
+        if self.background_validation and self.validation_snapshot.is_ready and not options.get("full", False):
+            return self._validate_from_snapshot(params)
+        return self._validate_full(params)
+
+    def _validate_from_snapshot(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        """从验证快照返回验证结果"""
         command = params.get("command", "validate")
         target_path = params.get("target_path")
         working_directory = params.get("working_directory")
         options = params.get("options", {})
-        tags = options.get("tags")
-        remote = options.get("remote", False)
         verbose = options.get("verbose", False)
 
         try:
-            # 1. 从符号表构建视图
-            view = self._build_view_from_symbol_table(target_path)
+            quiescent = True
+            if options.get("wait", False):
+                quiescent = self.event_coalescer.wait_until_idle(timeout=options.get("wait_timeout", 30.0))
+                if not quiescent:
+                    logger.warning("等待文件事件处理完成超时，返回当前快照")
+
+            path_filter: Optional[Callable[[str], bool]] = None
+            if target_path:
+                absolute_target_path = str(self.project_root / target_path)
+
+                def under_target_path(file_path: str) -> bool:
+                    return str(self.project_root / file_path).startswith(absolute_target_path)
+
+                path_filter = under_target_path
+
+            validation_result, generation = self.validation_snapshot.collect(path_filter)
+            if verbose:
+                validation_result.verbose_data = self.validation_engine.collect_verbose_data(self.project_id)
+
+            # spec 规则只读取后台执行的缓存结果，尚未执行完的规则报告为待定并确保已排队
+            spec_result, pending_specs = self._collect_spec_results(options)
+            if pending_specs and options.get("wait", False):
+                if self._wait_for_spec_runs(timeout=options.get("wait_timeout", 30.0)):
+                    spec_result, pending_specs = self._collect_spec_results(options)
+                else:
+                    logger.warning("等待 spec 规则执行完成超时，返回部分结果")
+            validation_result.merge(spec_result)
+
+            result_dict = self._convert_validation_result_to_dict(validation_result)
+            result_dict.update({
+                "command": command,
+                "target_path": target_path,
+                "working_directory": working_directory,
+                "generation": generation,
+                "from_snapshot": True,
+                "quiescent": quiescent,
+                "pending_specs": pending_specs
+            })
+
+            logger.info(f"验证完成（快照代数 {generation}，{len(pending_specs)} 个 spec 规则待定）: "
+                       f"成功={validation_result.success}, "
+                       f"错误={len(validation_result.errors)}, 警告={len(validation_result.warnings)}")
+
+            return result_dict
+
+        except Exception as e:
+            logger.error(f"验证处理失败: {e}", exc_info=True)
+            return self._validation_failure_response(e, command, target_path, working_directory)
+
+    def _collect_spec_results(self, options: Dict[str, Any]) -> Tuple[ValidationResult, List[str]]:
+        """
+        合并请求选中的 spec 规则的缓存执行结果
+
+        没有缓存结果的规则不在当前线程执行，而是提交给后台执行（见 _schedule_spec_runs）。
 
-            # 2. 执行基础验证 (schema, references)
-            validation_result = self.validation_engine.validate_view(view, self.project_id, verbose=verbose)
+        Args:
+            options: 请求选项
+
+        Returns:
+            (合并后的执行结果, 尚无结果的规则ID列表)
+        """
+        specs_with_files = self.spec_storage.get_specs_with_files(self.project_id)
+        selected = {id(spec) for spec in self._filter_specs([spec for _, spec in specs_with_files], options)}
+
+        result = ValidationResult.success_result()
+        pending: List[str] = []
+        pending_files: Set[str] = set()
+        for spec_file, spec in specs_with_files:
+            if id(spec) not in selected:
+                continue
+            spec_result = self.validation_snapshot.get_spec_result(spec_file, spec.id)
+            if spec_result is None:
+                pending.append(spec.id)
+                pending_files.add(spec_file)
+            else:
+                result.merge(spec_result)
+
+        if pending:
+            # 排队中的执行会补上这些结果；环境过滤之外的规则（例如 remote）只在被请求时执行
+            self._schedule_spec_runs(sorted(pending_files), pending)
+        return result, pending
+
+    def _schedule_spec_runs(
+        self,
+        spec_files: Optional[List[str]] = None,
+        rule_ids: Optional[List[str]] = None
+    ) -> None:
+        """
+        提交后台执行 spec 规则的任务，结果写入验证快照
+
+        Args:
+            spec_files: 只执行这些文件中的规则，None 表示所有 spec 文件
+            rule_ids: 只执行这些规则，None 表示默认（local）执行环境的全部规则
+        """
+        self.processing_queue.put({
+            "type": TASK_RUN_SPECS,
+            "spec_files": spec_files,
+            "rule_ids": rule_ids,
+        })
+
+    def _run_spec_rules(self, spec_files: Optional[List[str]], rule_ids: Optional[List[str]]) -> None:
+        """
+        在处理线程中执行没有缓存结果的 spec 规则
+
+        开始执行前记录快照代数：执行期间规则所在的 spec 文件再次失效时，
+        验证快照拒绝缓存已过期的结果，失效时提交的新任务会重新执行。
+
+        Args:
+            spec_files: 只执行这些文件中的规则，None 表示所有 spec 文件
+            rule_ids: 只执行这些规则，None 表示默认（local）执行环境的全部规则
+        """
+        generation = self.validation_snapshot.generation
+        specs_with_files = self.spec_storage.get_specs_with_files(self.project_id)
+        if rule_ids is None:
+            selected = {id(spec) for spec in self._filter_specs([spec for _, spec in specs_with_files], {})}
+        else:
+            wanted = set(rule_ids)
+            selected = {id(spec) for _, spec in specs_with_files if spec.id in wanted}
+        file_filter = set(spec_files) if spec_files is not None else None
+
+        start_time = time.perf_counter()
+        executed = 0
+        for spec_file, spec in specs_with_files:
+            if id(spec) not in selected or (file_filter is not None and spec_file not in file_filter):
+                continue
+            if self.validation_snapshot.get_spec_result(spec_file, spec.id) is not None:
+                continue
+            spec_result = self.spec_executor.execute_single_spec(spec)
+            self.validation_snapshot.set_spec_result(spec_file, spec.id, spec_result, generation)
+            executed += 1
+
+        if executed:
+            logger.info(
+                f"后台执行了 {executed} 个 spec 规则, 代数 {generation}, "
+                f"耗时 {time.perf_counter() - start_time:.2f}s"
+            )
+
+    def _wait_for_spec_runs(self, timeout: float) -> bool:
+        """
+        等待已提交的后台任务（包括 spec 规则执行）全部完成
+
+        Args:
+            timeout: 最长等待时间（秒）
+
+        Returns:
+            是否在超时前完成
+        """
+        with self.processing_queue.all_tasks_done:
+            return self.processing_queue.all_tasks_done.wait_for(
+                lambda: self.processing_queue.unfinished_tasks == 0, timeout=timeout
+            )
+
+    def _filter_specs(self, specs: List[SpecificationRule], options: Dict[str, Any]) -> List[SpecificationRule]:
+        """
+        按标签和执行环境过滤 spec 规则
 
-            # 3. 执行 Spec 规则验证
-            specs_to_run = view.specs
+        Args:
+            specs: spec 规则列表
+            options: 请求选项
+
+        Returns:
+            需要执行的 spec 规则
+        """
+        tags = options.get("tags")
+        remote = options.get("remote", False)
+
+        # 按标签过滤
+        if tags:
+            logger.info(f"应用标签过滤: {tags}")
+            specs = self.tag_filter.filter_specs(specs, tags)
+
+        # 按环境过滤
+        env_to_run = "remote" if remote else "local"
+        final_specs = [spec for spec in specs if spec.env == env_to_run or (remote and spec.env == "local")]
+        logger.info(f"根据环境 '{env_to_run}' 过滤后，准备执行 {len(final_specs)} 个 spec 规则")
+        return final_specs
+
+    def _validation_failure_response(
+        self,
+        error: Exception,
+        command: str,
+        target_path: Optional[str],
+        working_directory: Optional[str]
+    ) -> Dict[str, Any]:
+        """构建验证处理失败时的响应"""
+        return {
+            "success": False,
+            "errors": [{
+                "message": f"验证处理失败: {error}",
+                "location": "daemon",
+                "rule_id": "daemon-error"
+            }],
+            "warnings": [],
+            "command": command,
+            "target_path": target_path,
+            "working_directory": working_directory
+        }
 
-            # 3.1. 按标签过滤
-            if tags:
-                logger.info(f"应用标签过滤: {tags}")
-                specs_to_run = self.tag_filter.filter_specs(specs_to_run, tags)
+    def _validate_full(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        """重新构建视图并执行全量验证"""
+        command = params.get("command", "validate")
+        target_path = params.get("target_path")
+        working_directory = params.get("working_directory")
+        options = params.get("options", {})
+        verbose = options.get("verbose", False)
 
-            # 3.2. 按环境过滤
-            env_to_run = "remote" if remote else "local"
-            final_specs = [spec for spec in specs_to_run if spec.env == env_to_run or (remote and spec.env == "local")]
-            logger.info(f"根据环境 '{env_to_run}' 过滤后，准备执行 {len(final_specs)} 个 spec 规则")
+        try:
+            # 1. 流式执行基础验证 (schema, references)，不在内存中构建完整视图
+            validation_result = self.validation_engine.validate_project(
+                self.project_id, self._target_path_prefix(target_path), verbose=verbose
+            )
 
-            # 3.3. 执行规则
+            # 2. 执行 Spec 规则验证
+            specs = self.spec_storage.get_specs_by_project(self.project_id)
+            final_specs = self._filter_specs(specs, options)
             if final_specs:
                 spec_result = self.spec_executor.execute_specs(final_specs)
                 validation_result.merge(spec_result)
 
-            # 4. 转换验证结果为可序列化的字典
+            # 3. 转换验证结果为可序列化的字典
             result_dict = self._convert_validation_result_to_dict(validation_result)
             result_dict.update({
                 "command": command,
@@ -276,18 +595,7 @@ class CanifyDaemon:
 
         except Exception as e:
             logger.error(f"验证处理失败: {e}", exc_info=True)
-            return {
-                "success": False,
-                "errors": [{
-                    "message": f"验证处理失败: {e}",
-                    "location": "daemon",
-                    "rule_id": "daemon-error"
-                }],
-                "warnings": [],
-                "command": command,
-                "target_path": target_path,
-                "working_directory": working_directory
-            }
+            return self._validation_failure_response(e, command, target_path, working_directory)
 
     def _handle_lint(self, params: Dict[str, Any]) -> Dict[str, Any]:
         """处理lint请求"""
@@ -342,19 +650,66 @@ class CanifyDaemon:
         """处理verify请求"""
         return self._handle_validate(params)
 
-    def _handle_file_event(self, file_path: str, event_type: str) -> None:
+    def _handle_impact_analysis(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        处理影响分析请求
+
+        params 中的 entity_ids（或单个 entity_id）为起始实体，
+        max_depth 为反向依赖的最大遍历层数，缺省表示不限制。
+        """
+        entity_ids = params.get("entity_ids") or ([params["entity_id"]] if params.get("entity_id") else [])
+        if not entity_ids:
+            return {"success": False, "errors": [{"message": "缺少 entity_ids 参数", "location": "daemon"}]}
+        if not self.project_id:
+            return {"success": False, "errors": [{"message": "项目未初始化", "location": "daemon"}]}
+
+        try:
+            report = self.impact_analyzer.analyze(self.project_id, entity_ids, params.get("max_depth"))
+            return {"success": True, **report.to_dict()}
+        except Exception as e:
+            logger.error(f"影响分析失败: {e}")
+            return {"success": False, "errors": [{"message": f"影响分析失败: {e}", "location": "daemon"}]}
+
+    def _handle_search_entities(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        处理实体搜索请求
+
+        params 中的 query 为搜索文本，entity_type 限定实体类型，
+        limit（最多 SEARCH_MAX_LIMIT）和 offset 用于分页。
+        """
+        query = params.get("query") or ""
+        if not self.project_id:
+            return {"success": False, "errors": [{"message": "项目未初始化", "location": "daemon"}]}
+
+        try:
+            limit = max(1, min(int(params.get("limit", SEARCH_DEFAULT_LIMIT)), SEARCH_MAX_LIMIT))
+            offset = max(0, int(params.get("offset", 0)))
+            # 多取一个结果，判断是否还有下一页
+            results = self.symbol_table.search_entities(
+                self.project_id, query, params.get("entity_type"), limit + 1, offset
+            )
+            return {
+                "success": True,
+                "query": query,
+                "offset": offset,
+                "limit": limit,
+                "has_more": len(results) > limit,
+                "results": [summary._asdict() for summary in results[:limit]],
+            }
+        except Exception as e:
+            logger.error(f"实体搜索失败: {e}")
+            return {"success": False, "errors": [{"message": f"实体搜索失败: {e}", "location": "daemon"}]}
+
+    def _handle_file_event(self, file_path: str, event_type: str, src_path: Optional[str] = None) -> None:
         """
         处理文件事件
 
         Args:
-            file_path: 文件路径（相对于项目根目录）
-            event_type: 事件类型（created, modified, deleted）
+            file_path: 文件路径（相对于项目根目录），moved 事件为目标路径
+            event_type: 事件类型（created, modified, deleted, moved）
+            src_path: moved 事件的原路径
         """
-        self.event_queue.put({
-            'file_path': file_path,
-            'event_type': event_type,
-            'timestamp': time.time()
-        })
+        self.event_coalescer.add(file_path, event_type, src_path)
 
     def _event_loop(self) -> None:
         """事件循环线程"""
@@ -362,14 +717,15 @@ class CanifyDaemon:
 
         while self.is_running:
             try:
-                # 从事件队列获取事件，超时1秒
-                event = self.event_queue.get(timeout=1)
-                self._process_event(event)
-                self.event_queue.task_done()
+                # 等待安静下来的文件事件，超时1秒
+                events = self.event_coalescer.wait_for_batch(timeout=1)
+                self._check_branch()
+                if events:
+                    try:
+                        self._process_events(events)
+                    finally:
+                        self.event_coalescer.batch_done()
 
-            except Empty:
-                # 队列为空，继续循环
-                continue
             except Exception as e:
                 logger.error(f"事件处理错误: {e}")
 
@@ -383,140 +739,269 @@ class CanifyDaemon:
             try:
                 # 从处理队列获取任务，超时1秒
                 task = self.processing_queue.get(timeout=1)
-                self._execute_task(task)
-                self.processing_queue.task_done()
-
             except Empty:
                 # 队列为空，继续循环
                 continue
+
+            try:
+                self._execute_task(task)
             except Exception as e:
                 logger.error(f"任务执行错误: {e}")
+            finally:
+                self.processing_queue.task_done()
 
+        self.db_manager.close()
         logger.debug("处理循环线程结束")
 
-    def _process_event(self, event: Dict[str, Any]) -> None:
+    def _process_events(self, events: List[FileEvent]) -> None:
         """
-        处理单个文件事件
+        处理一批合并后的文件事件
+
+        文件在事件线程中解析，入库操作全部提交给存储写入器，由其合并为少量事务；
+        单个文件处理失败只回滚该文件的修改，不影响批次中的其他文件。
 
         Args:
-            event: 文件事件
+            events: 合并后的文件事件
         """
-        file_path = event['file_path']
-        event_type = event['event_type']
+        # 忽略规则文件本身不入库，其变化会改变需要索引的文件集合
+        if any(is_ignore_file(event.file_path) for event in events):
+            indexed_events = [event for event in events if not is_ignore_file(event.file_path)]
+            if indexed_events:
+                self._process_events(indexed_events)
+            self._reload_ignore_rules()
+            return
+
+        logger.info(f"处理文件事件批次: {len(events)} 个文件")
+
+        # 记录每个受影响文件更新前的符号状态，用于计算变更影响范围
+        before: Dict[str, FileSymbolState] = {}
+        submitted: List[Tuple[FileEvent, List[Future]]] = []
+        for event in events:
+            paths = [event.file_path] if event.src_path is None else [event.src_path, event.file_path]
+            for path in paths:
+                if path not in before:
+                    before[path] = self.dependency_tracker.capture(self.project_id, path)
+            try:
+                submitted.append((event, self._submit_file_event(event)))
+            except Exception as e:
+                self._record_event_failure(event, e)
+
+        for event, futures in submitted:
+            for future in futures:
+                error = future.exception()
+                if error is not None:
+                    self._record_event_failure(event, error)
+                    break
+
+        changes: Dict[str, Tuple[FileSymbolState, FileSymbolState]] = {
+            path: (state, self.dependency_tracker.capture(self.project_id, path))
+            for path, state in before.items()
+        }
+        self._record_branch_files(before)
+        self._trigger_validation(changes)
 
-        logger.info(f"处理文件事件: {file_path} ({event_type})")
+    def _submit_file_event(self, event: FileEvent) -> List[Future]:
+        """
+        解析单个文件事件涉及的文件，并将符号表更新提交给存储写入器
 
-        # 根据事件类型处理
-        if event_type in ['created', 'modified']:
-            self._handle_file_update(file_path)
-        elif event_type == 'deleted':
-            self._handle_file_deletion(file_path)
+        Args:
+            event: 合并后的文件事件
 
-    def _handle_file_update(self, file_path: str) -> None:
+        Returns:
+            各写操作的 Future
+        """
+        logger.debug(f"处理文件事件: {event.file_path} ({event.event_type}, 合并 {event.event_count} 个事件)")
+
+        futures = []
+        if event.event_type == 'moved':
+            futures.append(self.indexer.submit_delete(self.project_id, event.src_path))
+            futures.extend(self._submit_file_update(event.file_path))
+        elif event.event_type in ['created', 'modified']:
+            futures.extend(self._submit_file_update(event.file_path))
+        elif event.event_type == 'deleted':
+            futures.append(self.indexer.submit_delete(self.project_id, event.file_path))
+        return futures
+
+    def _submit_file_update(self, file_path: str) -> List[Future]:
         """
         处理文件更新（创建或修改）
 
         Args:
             file_path: 文件路径
+
+        Returns:
+            写操作的 Future，文件不存在时为空列表
         """
-        try:
-            # 读取文件内容
-            full_path = self.project_root / file_path
-            if not full_path.exists():
-                logger.warning(f"文件不存在: {file_path}")
-                return
-
-            with open(full_path, 'r', encoding='utf-8') as f:
-                content = f.read()
-
-            # 1. 解析文件，获取声明和引用
-            declarations = self.declaration_parser.parse(content, full_path)
-            references = self.reference_parser.parse(content, full_path)
-            field_references = []
-            for declaration in declarations:
-                field_refs = self.field_reference_parser.parse_from_declaration(declaration, full_path)
-                field_references.extend(field_refs)
-            all_references = references + field_references
-
-            # 2. 在插入前检查重复声明
-            seen_in_this_file = set()
-            duplicate_errors = []
-
-            for declaration in declarations:
-                # 检查文件内部的重复
-                if declaration.entity_id in seen_in_this_file:
-                    error_message = f"实体ID '{declaration.entity_id}' 在文件 {file_path} 内部重复声明。"
-                    logger.error(error_message)
-                    duplicate_errors.append(error_message)
-                else:
-                    seen_in_this_file.add(declaration.entity_id)
-
-                # 检查与数据库中其他文件的重复
-                existing_symbol = self.symbol_table.get_entity_by_id(self.project_id, declaration.entity_id)
-                if existing_symbol:
-                    error_message = f"实体ID '{declaration.entity_id}' 重复声明。原声明位于: {existing_symbol.location.file_path}"
-                    logger.error(error_message)
-                    duplicate_errors.append(error_message)
-
-            # 3. 清理并插入新符号（如果没有重复错误）
-            if not duplicate_errors:
-                self.symbol_table.delete_symbols_by_file(self.project_id, file_path)
-                self.spec_storage.delete_specs_by_file(self.project_id, file_path)
-                self.symbol_table.insert_symbols(self.project_id, file_path, declarations, all_references)
-                logger.info(f"Markdown文件更新完成: {file_path} ({len(declarations)} 声明, {len(all_references)} 引用)")
-            else:
-                # 有重复错误，只清理符号但不插入新符号
-                self.symbol_table.delete_symbols_by_file(self.project_id, file_path)
-                combined_error = "\n".join(duplicate_errors)
-                self.symbol_table.update_file_status(self.project_id, file_path, 'error', combined_error)
-                logger.warning(f"Markdown文件有重复声明，跳过符号插入: {file_path}")
-
-            # 根据文件类型处理其他符号
-            if full_path.suffix == '.py':
-                schemas = self.schema_parser.parse(content, full_path)
-                for schema in schemas:
-                    self.symbol_table.insert_schema(self.project_id, file_path, schema)
-                logger.info(f"Python文件更新完成: {file_path} ({len(schemas)} schemas)")
-
-            elif full_path.name.startswith('spec_') and full_path.suffix in ['.yaml', '.yml']:
-                specs = self.spec_extractor.extract_specs_from_file(full_path)
-                if specs:
-                    self.spec_storage.store_specs(self.project_id, file_path, specs)
-                logger.info(f"Spec文件更新完成: {file_path} ({len(specs)} 规则)")
-
-            # 触发验证（可选）
-            self._trigger_validation(file_path)
+        full_path = self.project_root / file_path
+        if not full_path.exists():
+            logger.warning(f"文件不存在: {file_path}")
+            return []
+
+        symbols, future = self.indexer.submit_update(self.project_id, file_path)
+        if symbols.unchanged:
+            logger.debug(f"文件内容未变化，跳过解析: {file_path}")
+            return [future]
+        logger.info(
+            f"文件解析完成: {file_path} ({len(symbols.declarations)} 声明, {len(symbols.references)} 引用, "
+            f"{len(symbols.schemas)} schemas, {len(symbols.specs)} 规则)"
+        )
+        return [future]
 
-        except Exception as e:
-            logger.error(f"处理文件更新失败 {file_path}: {e}")
-            self.symbol_table.update_file_status(self.project_id, file_path, 'error', str(e))
+    def _record_event_failure(self, event: FileEvent, error: BaseException) -> None:
+        """记录文件事件处理失败"""
+        logger.error(f"处理文件事件失败 {event.file_path} ({event.event_type}): {error}")
+        if event.event_type != 'deleted':
+            try:
+                self.storage_writer.execute(partial(
+                    self.symbol_table.update_file_status, self.project_id, event.file_path, 'error', str(error)
+                ))
+            except Exception as e:
+                logger.error(f"更新文件状态失败 {event.file_path}: {e}")
+
+    def _reload_ignore_rules(self) -> None:
+        """
+        忽略规则文件变化后重新加载规则，并增量扫描项目
+
+        新被忽略的文件从符号表中删除，不再被忽略的文件被解析入库；
+        这类变更很少发生，验证快照直接全量重建。
+        """
+        self.ignore_matcher.reload()
+        stats = self.indexer.scan(self.project_id, incremental=True)
+        self._record_branch_files()
+        logger.info(
+            f"忽略规则变化后重新扫描: {stats.files} 个文件重新解析, {stats.deleted_files} 个文件移除"
+        )
+
+        if self.background_validation and (stats.files or stats.deleted_files):
+            self._build_validation_snapshot()
+
+    def _check_branch(self) -> None:
+        """
+        检测 git 分支切换
+
+        检出会为每个变化的文件产生事件，逐个处理相当于重新索引大半个项目。
+        检测到 HEAD 指向新的分支后改为执行一次增量扫描：变化的文件优先从文件符号存储
+        恢复解析结果，之后到达的检出事件因内容哈希未变化而只刷新文件状态。
+
+        离开的分支的文件映射在此前每次提交后已经记录（见 _record_branch_files），
+        这里不再记录：此时 files 表中可能已有检出写入的新分支内容。
+        """
+        branch = read_current_branch(self.project_root)
+        if branch is None or branch == self.branch:
+            return
 
-    def _handle_file_deletion(self, file_path: str) -> None:
+        start_time = time.perf_counter()
+        previous = self.branch
+        logger.info(f"检测到分支切换: {previous} -> {branch}")
+
+        stats = self.indexer.scan(self.project_id, incremental=True)
+        self.branch = branch
+        self._record_branch_files()
+        collected = self.storage_writer.execute(partial(self.blob_store.gc, self.project_id))
+
+        self.last_branch_switch = {
+            "from": previous,
+            "to": branch,
+            "scan": stats.to_dict(),
+            "collected_blobs": collected,
+            "elapsed_seconds": time.perf_counter() - start_time,
+        }
+        logger.info(
+            f"分支切换完成: {stats.files} 个文件变化 ({stats.restored_files} 个从存储恢复), "
+            f"{stats.deleted_files} 个已删除, 耗时 {self.last_branch_switch['elapsed_seconds']:.2f}s"
+        )
+
+        if self.background_validation and (stats.files or stats.deleted_files):
+            self._build_validation_snapshot()
+
+    def _record_branch_files(self, file_paths: Optional[Iterable[str]] = None) -> None:
         """
-        处理文件删除
+        在符号表更新提交后记录当前分支的文件映射
+
+        提交后再次读取 HEAD：分支已经变化时，刚提交的内容可能来自新分支的检出，
+        不记录到原分支下，由下一次 _check_branch 处理。
 
         Args:
-            file_path: 文件路径
+            file_paths: 只刷新这些文件的映射，None 表示替换当前分支的全部映射
         """
+        if self.branch is None or read_current_branch(self.project_root) != self.branch:
+            return
         try:
-            # 从符号表中删除相关符号
-            self.symbol_table.delete_symbols_by_file(self.project_id, file_path)
-            self.spec_storage.delete_specs_by_file(self.project_id, file_path)
-            logger.info(f"文件删除处理完成: {file_path}")
-
+            self.storage_writer.execute(
+                partial(self.blob_store.record_branch, self.project_id, self.branch, file_paths)
+            )
         except Exception as e:
-            logger.error(f"处理文件删除失败 {file_path}: {e}")
+            logger.warning(f"记录分支文件映射失败 {self.branch}: {e}")
+
+    def _build_validation_snapshot(self) -> None:
+        """对项目执行一次全量验证，作为验证快照的初始内容"""
+        start_time = time.perf_counter()
+
+        spec_files = {file_path for file_path, _ in self.spec_storage.get_specs_with_files(self.project_id)}
+        entity_files = [
+            file_path for file_path, state in self.symbol_table.get_file_states(self.project_id).items()
+            if state["status"] == 'parsed' and file_path not in spec_files
+        ]
+        results = self.validation_engine.validate_files(self.project_id, entity_files)
+        generation = self.validation_snapshot.replace(results)
+        self._schedule_spec_runs()
+
+        logger.info(
+            f"验证快照已构建: {len(results)} 个文件, 代数 {generation}, "
+            f"耗时 {time.perf_counter() - start_time:.2f}s"
+        )
 
-    def _trigger_validation(self, file_path: str) -> None:
+    def _trigger_validation(self, changes: Dict[str, Tuple[FileSymbolState, FileSymbolState]]) -> None:
         """
-        触发验证
+        重新验证受文件变更影响的文件并更新验证快照
+
+        通过 symbol_dependencies 表找出依赖变化符号的文件，只重新验证这些文件，
+        验证耗时与变更的影响范围成正比，而不是与项目规模成正比。
+        受影响的 spec 文件丢弃其缓存的执行结果，并提交给处理线程在后台重新执行。
 
         Args:
-            file_path: 文件路径
+            changes: 文件路径到 (更新前符号状态, 更新后符号状态) 的映射
         """
-        # 这里可以添加实时验证逻辑
-        # 目前只是记录日志
-        logger.debug(f"触发验证: {file_path}")
+        if not self.background_validation:
+            return
+
+        start_time = time.perf_counter()
+        affected_files = self.dependency_tracker.affected_files(self.project_id, changes)
+
+        entity_files = []
+        spec_files = []
+        removed_files = []
+        for file_path in sorted(affected_files):
+            if self.symbol_table.get_file_record(self.project_id, file_path) is None:
+                removed_files.append(file_path)
+            elif self.spec_storage.get_specs_by_file(self.project_id, file_path):
+                spec_files.append(file_path)
+            else:
+                entity_files.append(file_path)
+
+        results = self.validation_engine.validate_files(self.project_id, entity_files)
+        generation = self.validation_snapshot.update(
+            results,
+            removed_files=removed_files,
+            stale_spec_files=spec_files + removed_files
+        )
+        if spec_files:
+            self._schedule_spec_runs(spec_files)
+
+        elapsed = time.perf_counter() - start_time
+        self.last_revalidation = {
+            "generation": generation,
+            "changed_files": len(changes),
+            "affected_files": len(affected_files),
+            "validated_files": len(results),
+            "stale_spec_files": len(spec_files),
+            "errors": sum(len(result.errors) for result in results.values()),
+            "elapsed_seconds": round(elapsed, 4)
+        }
+        logger.info(
+            f"增量验证完成: {len(changes)} 个文件变更, 影响 {len(affected_files)} 个文件, "
+            f"验证 {len(results)} 个文件, 代数 {generation}, 耗时 {elapsed:.3f}s"
+        )
 
     def _execute_task(self, task: Dict[str, Any]) -> None:
         """
@@ -525,9 +1010,23 @@ class CanifyDaemon:
         Args:
             task: 任务数据
         """
-        # 这里可以执行更复杂的处理任务
-        # 目前只是记录日志
         logger.debug(f"执行任务: {task}")
+        if task.get("type") == TASK_RUN_SPECS:
+            self._run_spec_rules(task.get("spec_files"), task.get("rule_ids"))
+
+    def _target_path_prefix(self, target_path: Optional[str]) -> Optional[str]:
+        """
+        将目标路径转换为位置文件的前缀
+
+        Args:
+            target_path: 目标路径，None 表示整个项目
+
+        Returns:
+            绝对路径前缀，None 表示不过滤
+        """
+        if not target_path:
+            return None
+        return str(self.project_root / target_path)
 
     def _build_view_from_symbol_table(self, target_path: Optional[str] = None) -> View:
         """
@@ -539,39 +1038,17 @@ class CanifyDaemon:
         Returns:
             视图对象
         """
-        from ..models import View, EntityDeclaration, EntityReference
+        from ..models import View
 
         try:
-            # 获取所有实体
-            all_entities = self.symbol_table.get_all_entities(self.project_id)
-
-            # 将实体列表转换为字典，key为entity_id
-            entities_dict = {entity.entity_id: entity for entity in all_entities}
+            path_prefix = self._target_path_prefix(target_path)
 
-            # 如果指定了目标路径，过滤实体
-            if target_path:
-                target_entities = {}
-                # 将目标路径转换为绝对路径
-                absolute_target_path = str(self.project_root / target_path)
-                for entity_id, entity in entities_dict.items():
-                    if str(entity.location.file_path).startswith(absolute_target_path):
-                        target_entities[entity_id] = entity
-                entities = target_entities
-            else:
-                entities = entities_dict
-
-            # 获取所有引用
-            all_references = self.symbol_table.get_all_references(self.project_id)
-
-            # 如果指定了目标路径，过滤引用
-            if target_path:
-                absolute_target_path = str(self.project_root / target_path)
-                references = [
-                    ref for ref in all_references
-                    if str(ref.location.file_path).startswith(absolute_target_path)
-                ]
-            else:
-                references = all_references
+            # 获取目标路径下的实体和引用
+            entities = {
+                entity.entity_id: entity
+                for entity in self.symbol_table.iter_entities(self.project_id, path_prefix)
+            }
+            references = list(self.symbol_table.iter_references(self.project_id, path_prefix))
 
             # 获取所有模式名称
             schema_names = self.symbol_table.get_all_schema_names(self.project_id)
@@ -667,14 +1144,14 @@ class CanifyDaemon:
 
         try:
             # 获取实体统计
-            all_entities = self.symbol_table.get_all_entities(self.project_id)
-            dangling_refs = self.symbol_table.get_dangling_references(self.project_id)
+            entity_count = self.symbol_table.count_entities(self.project_id)
+            dangling_count = self.symbol_table.count_dangling_references(self.project_id)
 
             return {
                 'status': 'running',
                 'project_root': str(self.project_root),
-                'entity_count': len(all_entities),
-                'dangling_references': len(dangling_refs),
+                'entity_count': entity_count,
+                'dangling_references': dangling_count,
                 'entity_types': {}
             }
 
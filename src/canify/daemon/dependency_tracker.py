@@ -0,0 +1,108 @@
+"""
+依赖跟踪器
+
+根据 symbol_dependencies 表计算文件变更的影响范围。文件更新前后各取一次其提供的
+符号（实体、实体类型、模式），比较得到真正变化的符号，再查询依赖这些符号的文件。
+"""
+
+import logging
+from typing import Dict, Set, Tuple
+
+from ..storage import SymbolTableManager
+from ..storage.file_symbols import (
+    ANY_ENTITY_TYPE, SYMBOL_ENTITY, SYMBOL_ENTITY_TYPE, SYMBOL_SCHEMA
+)
+
+logger = logging.getLogger(__name__)
+
+# 文件提供的符号状态，见 SymbolTableManager.get_file_symbol_state
+FileSymbolState = Dict[str, Dict[str, str]]
+
+
+class DependencyTracker:
+    """依赖跟踪器"""
+
+    def __init__(self, symbol_table: SymbolTableManager):
+        """
+        初始化依赖跟踪器
+
+        Args:
+            symbol_table: 符号表管理器
+        """
+        self.symbol_table = symbol_table
+
+    def capture(self, project_id: int, file_path: str) -> FileSymbolState:
+        """
+        获取文件当前提供的符号状态
+
+        Args:
+            project_id: 项目ID
+            file_path: 文件路径
+
+        Returns:
+            文件符号状态
+        """
+        return self.symbol_table.get_file_symbol_state(project_id, file_path)
+
+    @staticmethod
+    def changed_symbols(before: FileSymbolState, after: FileSymbolState) -> Set[Tuple[str, str]]:
+        """
+        比较文件更新前后的符号状态
+
+        引用只关心目标实体是否存在及其类型，因此只有新增、删除或改变类型的实体
+        才会影响引用方；实体数据的任何变化都会影响读取该类型实体的 spec 规则。
+
+        Args:
+            before: 更新前的符号状态
+            after: 更新后的符号状态
+
+        Returns:
+            变化的 (符号类型, 符号ID) 集合
+        """
+        changed: Set[Tuple[str, str]] = set()
+
+        old_entities, new_entities = before["entities"], after["entities"]
+        for entity_id in old_entities.keys() | new_entities.keys():
+            old_type, new_type = old_entities.get(entity_id), new_entities.get(entity_id)
+            if old_type != new_type:
+                changed.add((SYMBOL_ENTITY, entity_id))
+            if old_type != new_type or before["entity_data"].get(entity_id) != after["entity_data"].get(entity_id):
+                for entity_type in (old_type, new_type):
+                    if entity_type is not None:
+                        changed.add((SYMBOL_ENTITY_TYPE, entity_type))
+
+        old_schemas, new_schemas = before["schemas"], after["schemas"]
+        for entity_type in old_schemas.keys() | new_schemas.keys():
+            if old_schemas.get(entity_type) != new_schemas.get(entity_type):
+                changed.add((SYMBOL_SCHEMA, entity_type))
+
+        if any(symbol_type == SYMBOL_ENTITY_TYPE for symbol_type, _ in changed):
+            changed.add((SYMBOL_ENTITY_TYPE, ANY_ENTITY_TYPE))
+
+        return changed
+
+    def affected_files(
+        self,
+        project_id: int,
+        changes: Dict[str, Tuple[FileSymbolState, FileSymbolState]]
+    ) -> Set[str]:
+        """
+        计算一组文件变更影响的文件
+
+        Args:
+            project_id: 项目ID
+            changes: 文件路径到 (更新前状态, 更新后状态) 的映射
+
+        Returns:
+            需要重新验证的文件路径集合，包括变更的文件本身
+        """
+        changed: Set[Tuple[str, str]] = set()
+        for before, after in changes.values():
+            changed |= self.changed_symbols(before, after)
+
+        affected = set(changes)
+        if changed:
+            affected |= self.symbol_table.get_dependent_files(project_id, changed)
+
+        logger.debug(f"变更影响分析: {len(changes)} 个文件, {len(changed)} 个符号变化, {len(affected)} 个受影响文件")
+        return affected
@@ -0,0 +1,269 @@
+"""
+文件事件合并器
+
+编辑器保存一次文件通常会产生多个 watchdog 事件（多次 modified、临时文件的
+created/deleted、重命名等）。合并器按文件路径累积事件，在路径安静一段时间后
+将其折叠为一个最终动作，并以批次形式交给 daemon 处理。
+"""
+
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# 单个路径持续有事件时，最多延迟这么久也要处理，避免被频繁写入的文件饿死
+DEFAULT_MAX_DELAY = 2.0
+
+
+@dataclass
+class FileEvent:
+    """合并后的文件事件"""
+
+    file_path: str
+    event_type: str  # created, modified, deleted, moved
+    src_path: Optional[str] = None  # moved 事件的原路径
+    event_count: int = 1  # 合并的原始事件数
+
+
+@dataclass
+class _PendingPath:
+    """路径上尚未处理的事件状态"""
+
+    first_type: str
+    last_type: str
+    first_seen: float
+    last_seen: float
+    event_count: int = 1
+
+
+class EventCoalescer:
+    """文件事件合并器"""
+
+    def __init__(self, quiet_window: float = 0.2, max_delay: float = DEFAULT_MAX_DELAY):
+        """
+        初始化文件事件合并器
+
+        Args:
+            quiet_window: 安静窗口（秒），路径在该时间内没有新事件才会被处理
+            max_delay: 最大延迟（秒），路径第一个事件之后最多等待这么久
+        """
+        self.quiet_window = quiet_window
+        self.max_delay = max(max_delay, quiet_window)
+
+        self._pending: Dict[str, _PendingPath] = {}
+        self._moved_from: Dict[str, str] = {}
+        self._condition = threading.Condition()
+
+        # 已取出但尚未处理完成的批次数
+        self._batches_in_flight = 0
+
+        # 统计信息
+        self.events_received = 0
+        self.events_coalesced = 0
+        self.actions_emitted = 0
+        self.batches_emitted = 0
+        self.last_batch_size = 0
+
+    def add(self, file_path: str, event_type: str, src_path: Optional[str] = None) -> None:
+        """
+        添加一个原始文件事件
+
+        Args:
+            file_path: 文件路径（相对于项目根目录），moved 事件为目标路径
+            event_type: 事件类型（created, modified, deleted, moved）
+            src_path: moved 事件的原路径
+        """
+        now = time.monotonic()
+        with self._condition:
+            self.events_received += 1
+            if event_type == 'moved' and src_path is not None:
+                # 移动拆分为原路径删除和目标路径创建，出队时再配对还原；
+                # 原始事件只计一次，记在原路径上
+                self._record(src_path, 'deleted', now)
+                self._record(file_path, 'created', now, count=0)
+                self._moved_from[file_path] = src_path
+            else:
+                self._record(file_path, event_type, now)
+            self._condition.notify_all()
+
+    def wait_for_batch(self, timeout: float) -> List[FileEvent]:
+        """
+        等待直到有路径安静下来或超时
+
+        取出的非空批次处理完成后需要调用 batch_done。
+
+        Args:
+            timeout: 最长等待时间（秒）
+
+        Returns:
+            合并后的事件批次，超时时为空列表
+        """
+        deadline = time.monotonic() + timeout
+        with self._condition:
+            while True:
+                now = time.monotonic()
+                batch = self._pop_ready(now)
+                if batch or now >= deadline:
+                    return batch
+
+                wait_until = deadline
+                next_due = self._next_due()
+                if next_due is not None:
+                    wait_until = min(wait_until, next_due)
+                self._condition.wait(max(0.0, wait_until - now))
+
+    def batch_done(self) -> None:
+        """标记一个已取出的批次处理完成"""
+        with self._condition:
+            self._batches_in_flight = max(0, self._batches_in_flight - 1)
+            self._condition.notify_all()
+
+    def wait_until_idle(self, timeout: float) -> bool:
+        """
+        等待所有已收到的事件处理完成
+
+        Args:
+            timeout: 最长等待时间（秒）
+
+        Returns:
+            是否在超时前进入空闲状态
+        """
+        deadline = time.monotonic() + timeout
+        with self._condition:
+            while self._pending or self._batches_in_flight:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self._condition.wait(remaining)
+            return True
+
+    def flush(self) -> List[FileEvent]:
+        """
+        立即取出所有待处理的事件，不等待安静窗口
+
+        取出的非空批次处理完成后需要调用 batch_done。
+
+        Returns:
+            合并后的事件批次
+        """
+        with self._condition:
+            return self._pop_ready(float('inf'))
+
+    @property
+    def pending_count(self) -> int:
+        """尚未处理的路径数"""
+        with self._condition:
+            return len(self._pending)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        获取合并统计信息
+
+        Returns:
+            统计信息字典
+        """
+        with self._condition:
+            return {
+                "quiet_window": self.quiet_window,
+                "events_received": self.events_received,
+                "events_coalesced": self.events_coalesced,
+                "actions_emitted": self.actions_emitted,
+                "batches_emitted": self.batches_emitted,
+                "last_batch_size": self.last_batch_size,
+                "pending_paths": len(self._pending),
+                "batches_in_flight": self._batches_in_flight,
+            }
+
+    def _record(self, file_path: str, event_type: str, now: float, count: int = 1) -> None:
+        """记录路径上的一个事件"""
+        pending = self._pending.get(file_path)
+        if pending is None:
+            self._pending[file_path] = _PendingPath(event_type, event_type, now, now, count)
+            return
+
+        pending.last_type = event_type
+        pending.last_seen = now
+        pending.event_count += count
+
+        # 目标路径被删除后不再是移动目标
+        if event_type == 'deleted':
+            self._moved_from.pop(file_path, None)
+
+    def _next_due(self) -> Optional[float]:
+        """最早可以处理的路径的到期时间"""
+        if not self._pending:
+            return None
+        return min(self._due_time(pending) for pending in self._pending.values())
+
+    def _due_time(self, pending: _PendingPath) -> float:
+        """路径的到期时间"""
+        return min(pending.last_seen + self.quiet_window, pending.first_seen + self.max_delay)
+
+    def _pop_ready(self, now: float) -> List[FileEvent]:
+        """取出所有已到期的路径并折叠为最终动作"""
+        ready = [path for path, pending in self._pending.items() if self._due_time(pending) <= now]
+        if not ready:
+            return []
+
+        # 移动的两端需要一起出队，才能还原为一个 moved 事件
+        for path in list(ready):
+            src_path = self._moved_from.get(path)
+            if src_path is not None and src_path in self._pending and src_path not in ready:
+                ready.append(src_path)
+
+        resolved: Dict[str, Optional[str]] = {}
+        counts: Dict[str, int] = {}
+        for path in ready:
+            pending = self._pending.pop(path)
+            resolved[path] = self._resolve(pending)
+            counts[path] = pending.event_count
+
+        # 目标路径最终为创建、原路径最终为删除时还原为移动
+        moves: Dict[str, str] = {}
+        for path in ready:
+            src_path = self._moved_from.pop(path, None)
+            if src_path is not None and resolved[path] == 'created' and resolved.get(src_path) == 'deleted':
+                moves[path] = src_path
+        paired_sources = set(moves.values())
+
+        batch: List[FileEvent] = []
+        for path in ready:
+            action = resolved[path]
+            if action is None or path in paired_sources:
+                continue
+            if path in moves:
+                src_path = moves[path]
+                batch.append(FileEvent(path, 'moved', src_path, counts[path] + counts[src_path]))
+            else:
+                batch.append(FileEvent(path, action, None, counts[path]))
+
+        # 事件全部抵消时也可能让等待者进入空闲状态
+        self._condition.notify_all()
+
+        raw_events = sum(counts.values())
+        self.events_coalesced += max(0, raw_events - len(batch))
+        self.actions_emitted += len(batch)
+        if batch:
+            self._batches_in_flight += 1
+            self.batches_emitted += 1
+            self.last_batch_size = len(batch)
+            logger.debug(f"合并文件事件: {raw_events} 个原始事件 -> {len(batch)} 个动作")
+        return batch
+
+    @staticmethod
+    def _resolve(pending: _PendingPath) -> Optional[str]:
+        """
+        将路径上的事件序列折叠为最终动作
+
+        Returns:
+            最终动作，事件互相抵消时为None（例如临时文件的创建后删除）
+        """
+        if pending.last_type == 'deleted':
+            return None if pending.first_type == 'created' else 'deleted'
+        if pending.first_type == 'created':
+            return 'created'
+        # 删除后重新创建（原子保存）或多次修改，都视为修改
+        return 'modified'
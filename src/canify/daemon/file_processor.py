@@ -0,0 +1,291 @@
+"""
+文件处理器
+
+负责读取并解析单个项目文件，产出可直接入库的文件符号数据。
+处理器不访问数据库，因此既可以在 daemon 进程内使用，也可以在扫描工作进程中使用。
+
+解析结果按 (文件路径, 内容哈希) 缓存：切换分支再切回来时，恢复为之前内容的文件
+直接复用当时的解析结果，不必重新解析。
+"""
+
+import logging
+import threading
+from collections import OrderedDict
+from dataclasses import replace
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from ..discovery.file_walker import FILE_KIND_MARKDOWN, FILE_KIND_PYTHON, FILE_KIND_SPEC, classify_file
+from ..parsers import EntityDeclarationParser, EntityReferenceParser, EntityFieldReferenceParser
+from ..parsers.entity_schema_parser import EntitySchemaParser
+from ..extraction.spec_extractor import SpecExtractor
+from ..storage.file_symbols import FileSymbols, content_hash
+
+logger = logging.getLogger(__name__)
+
+# 缓存的解析结果数量上限
+PARSE_CACHE_SIZE = 512
+
+# 缓存键：(文件路径, 内容哈希)
+ParseKey = Tuple[str, str]
+
+# 按 (文件路径, 内容哈希) 查找已保存解析结果的函数
+RestoreFunc = Callable[[str, str], Optional[FileSymbols]]
+
+
+class ParseCache:
+    """
+    内容寻址的解析结果缓存
+
+    声明和引用行中含有文件位置，同样的内容出现在不同路径时解析结果不同，
+    因此缓存键同时包含文件路径和内容哈希。
+    """
+
+    def __init__(self, size: int = PARSE_CACHE_SIZE):
+        """
+        初始化解析结果缓存
+
+        Args:
+            size: 缓存的解析结果数量上限，0 表示不缓存
+        """
+        self.size = size
+
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[ParseKey, FileSymbols]" = OrderedDict()
+
+        # 统计信息
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, file_path: str, file_hash: str) -> Optional[FileSymbols]:
+        """
+        查找缓存的解析结果
+
+        Args:
+            file_path: 文件路径（相对于项目根目录）
+            file_hash: 内容哈希
+
+        Returns:
+            解析结果的副本，未缓存时返回None
+        """
+        if self.size <= 0:
+            return None
+
+        key = (file_path, file_hash)
+        with self._lock:
+            symbols = self._entries.get(key)
+            if symbols is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+        return _copy_symbols(symbols)
+
+    def put(self, symbols: FileSymbols) -> None:
+        """
+        缓存解析结果，超过上限时淘汰最久未使用的条目
+
+        Args:
+            symbols: 解析成功的文件符号数据
+        """
+        if self.size <= 0:
+            return
+
+        key = (symbols.file_path, symbols.file_hash)
+        with self._lock:
+            self._entries[key] = _copy_symbols(symbols)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        获取缓存统计信息
+
+        Returns:
+            统计信息字典
+        """
+        with self._lock:
+            return {
+                "size": self.size,
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+def _copy_symbols(symbols: FileSymbols) -> FileSymbols:
+    """复制文件符号数据的列表，调用方修改返回值不影响缓存（行数据是不可变的元组）"""
+    return replace(
+        symbols,
+        declarations=list(symbols.declarations),
+        references=list(symbols.references),
+        schemas=list(symbols.schemas),
+        specs=list(symbols.specs),
+    )
+
+
+class FileProcessor:
+    """文件处理器"""
+
+    def __init__(self, project_root: Path, cache_size: int = PARSE_CACHE_SIZE):
+        """
+        初始化文件处理器
+
+        Args:
+            project_root: 项目根目录
+            cache_size: 缓存的解析结果数量上限，0 表示不缓存
+        """
+        self.project_root = project_root
+        self.parse_cache = ParseCache(cache_size)
+
+        # 解析器
+        self.declaration_parser = EntityDeclarationParser()
+        self.reference_parser = EntityReferenceParser()
+        self.field_reference_parser = EntityFieldReferenceParser()
+        self.schema_parser = EntitySchemaParser()
+        self.spec_extractor = SpecExtractor(project_root)
+
+        # 文件类型到解析函数的映射，未列出的类型不解析
+        self._parsers: Dict[str, Callable[[str, str, Path], FileSymbols]] = {
+            FILE_KIND_MARKDOWN: self._parse_markdown,
+            FILE_KIND_PYTHON: self._parse_python,
+            FILE_KIND_SPEC: self._parse_spec,
+        }
+
+    def process(
+        self,
+        file_path: str,
+        known_hash: Optional[str] = None,
+        restore: Optional[RestoreFunc] = None
+    ) -> FileSymbols:
+        """
+        读取并解析文件
+
+        按文件类型只运行相关的解析器：Markdown 解析实体声明和引用，Python 解析模式，
+        spec 文件解析 spec 规则；其他文件不读取内容，直接返回空结果。
+        解析失败不会抛出异常，而是记录在返回结果的 error 字段中。
+
+        Args:
+            file_path: 文件路径（相对于项目根目录）
+            known_hash: 已入库的内容哈希，与当前内容一致时跳过解析和入库
+            restore: 按 (文件路径, 内容哈希) 查找已保存解析结果的函数，解析结果缓存未命中时使用
+
+        Returns:
+            文件符号数据
+        """
+        return self._process(file_path, known_hash, restore, parse_missing=True)  # type: ignore[return-value]
+
+    def try_restore(self, file_path: str, known_hash: Optional[str], restore: RestoreFunc) -> Optional[FileSymbols]:
+        """
+        读取文件，只在内容未变化或可以恢复已有解析结果时返回，不解析文件
+
+        Args:
+            file_path: 文件路径（相对于项目根目录）
+            known_hash: 已入库的内容哈希
+            restore: 按 (文件路径, 内容哈希) 查找已保存解析结果的函数
+
+        Returns:
+            文件符号数据，需要解析时返回None
+        """
+        return self._process(file_path, known_hash, restore, parse_missing=False)
+
+    def _process(
+        self,
+        file_path: str,
+        known_hash: Optional[str],
+        restore: Optional[RestoreFunc],
+        parse_missing: bool
+    ) -> Optional[FileSymbols]:
+        """读取文件并依次尝试跳过、解析结果缓存、restore 和解析"""
+        full_path = self.project_root / file_path
+        kind = classify_file(full_path.name)
+        parse = self._parsers.get(kind) if kind is not None else None
+        if parse is None:
+            return FileSymbols(file_path=file_path, kind=kind)
+
+        try:
+            stat = full_path.stat()
+            with open(full_path, 'r', encoding='utf-8') as f:
+                content = f.read()
+
+            file_hash = content_hash(content)
+            if known_hash is not None and file_hash == known_hash:
+                return FileSymbols(
+                    file_path=file_path, kind=kind, file_hash=file_hash,
+                    mtime_ns=stat.st_mtime_ns, file_size=stat.st_size, unchanged=True
+                )
+
+            symbols = self.parse_cache.get(file_path, file_hash)
+            if symbols is None and restore is not None:
+                symbols = restore(file_path, file_hash)
+                if symbols is not None:
+                    self.parse_cache.put(symbols)
+            if symbols is None:
+                if not parse_missing:
+                    return None
+                symbols = parse(file_path, content, full_path)
+                symbols.kind = kind
+                symbols.file_hash = file_hash
+                self.parse_cache.put(symbols)
+            symbols.mtime_ns = stat.st_mtime_ns
+            symbols.file_size = stat.st_size
+            return symbols
+
+        except Exception as e:
+            if not parse_missing:
+                return None
+            logger.error(f"解析文件失败 {file_path}: {e}")
+            return FileSymbols(file_path=file_path, kind=kind, error=str(e))
+
+    def _parse_markdown(self, file_path: str, content: str, full_path: Path) -> FileSymbols:
+        """解析 Markdown 文件中的实体声明、链接引用和字段引用"""
+        declarations = self.declaration_parser.parse(content, full_path)
+        references = self.reference_parser.parse(content, full_path)
+        for declaration in declarations:
+            references.extend(
+                self.field_reference_parser.parse_from_declaration(declaration, full_path)
+            )
+        return FileSymbols.from_models(file_path, declarations, references)
+
+    def _parse_python(self, file_path: str, content: str, full_path: Path) -> FileSymbols:
+        """解析 Python 文件中的实体模式"""
+        schemas = self.schema_parser.parse(content, full_path)
+        return FileSymbols.from_models(file_path, [], [], schemas=schemas)
+
+    def _parse_spec(self, file_path: str, content: str, full_path: Path) -> FileSymbols:
+        """解析 spec 文件中的 spec 规则"""
+        specs = self.spec_extractor.extract_specs_from_content(content, full_path)
+        return FileSymbols.from_models(file_path, [], [], specs=specs)
+
+
+def find_duplicate_declarations(
+    symbols: FileSymbols,
+    lookup_location: Callable[[str], Optional[str]]
+) -> List[str]:
+    """
+    检查文件中的重复实体声明
+
+    Args:
+        symbols: 文件符号数据
+        lookup_location: 根据实体ID查询已有声明位置文件的函数，不存在时返回None
+
+    Returns:
+        重复声明的错误信息列表
+    """
+    seen_in_this_file = set()
+    duplicate_errors = []
+
+    for entity_id, _, _, _, _, location_file, _, _ in symbols.declarations:
+        # 检查文件内部的重复
+        if entity_id in seen_in_this_file:
+            duplicate_errors.append(f"实体ID '{entity_id}' 在文件 {symbols.file_path} 内部重复声明。")
+            continue
+        seen_in_this_file.add(entity_id)
+
+        # 检查与其他文件的重复（同一文件的旧声明不算重复）
+        existing_location = lookup_location(entity_id)
+        if existing_location is not None and existing_location != location_file:
+            duplicate_errors.append(f"实体ID '{entity_id}' 重复声明。原声明位于: {existing_location}")
+
+    return duplicate_errors
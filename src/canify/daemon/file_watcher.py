@@ -5,48 +5,57 @@
 """
 
 import logging
+import os
 import time
 from pathlib import Path
-from typing import Callable, Set, Dict, Any
+from typing import Callable, Set, Dict, Any, Optional
 from watchdog.observers import Observer
 from watchdog.events import FileSystemEventHandler, FileSystemEvent
 
+from ..discovery.file_walker import INDEXED_FILE_KINDS, classify_file
+from ..discovery.ignore_matcher import IgnoreMatcher, is_ignore_file
+
 logger = logging.getLogger(__name__)
 
 
 class CanifyFileEventHandler(FileSystemEventHandler):
     """Canify 文件事件处理器"""
 
-    def __init__(self, callback: Callable[[str, str], None], project_root: Path):
+    def __init__(
+        self,
+        callback: Callable[..., None],
+        project_root: Path,
+        ignore_matcher: Optional[IgnoreMatcher] = None
+    ):
         """
         初始化文件事件处理器
 
         Args:
-            callback: 文件变更回调函数，接收(file_path, event_type)
+            callback: 文件变更回调函数，接收(file_path, event_type)，
+                moved 事件额外传入原路径：(dest_path, 'moved', src_path)
             project_root: 项目根目录
+            ignore_matcher: 忽略规则匹配器，与初始扫描共用
         """
         self.callback = callback
         self.project_root = project_root
-        self.ignored_patterns = {
-            '*.pyc', '*.pyo', '*.pyd', '__pycache__',
-            '*.swp', '*.swo', '*.tmp', '.git', '.svn',
-            'node_modules', '.idea', '.vscode'
-        }
+        self.ignore_matcher = ignore_matcher if ignore_matcher is not None else IgnoreMatcher(project_root)
 
     def _should_ignore(self, file_path: str) -> bool:
-        """检查文件是否应该被忽略"""
-        path = Path(file_path)
+        """
+        检查文件是否应该被忽略
 
-        # 检查文件扩展名
-        if any(path.match(pattern) for pattern in self.ignored_patterns):
+        只保留初始扫描会索引的文件，以及忽略规则文件本身（其变化需要重新加载规则）。
+        """
+        relative_path = self._get_relative_path(file_path)
+        if os.path.isabs(relative_path):
+            # 文件不在项目目录内
             return True
 
-        # 检查目录名
-        for part in path.parts:
-            if any(part == pattern.strip('*') for pattern in self.ignored_patterns if not pattern.startswith('*.')):
-                return True
-
-        return False
+        if is_ignore_file(relative_path):
+            return False
+        if classify_file(os.path.basename(relative_path)) not in INDEXED_FILE_KINDS:
+            return True
+        return self.ignore_matcher.is_ignored(relative_path)
 
     def _get_relative_path(self, file_path: str) -> str:
         """获取相对于项目根目录的路径"""
@@ -82,30 +91,39 @@ class CanifyFileEventHandler(FileSystemEventHandler):
         if not event.is_directory:
             src_relative = self._get_relative_path(event.src_path)
             dest_relative = self._get_relative_path(event.dest_path)
+            src_ignored = self._should_ignore(event.src_path)
+            dest_ignored = self._should_ignore(event.dest_path)
 
-            if not self._should_ignore(event.src_path) and not self._should_ignore(event.dest_path):
+            if not src_ignored and not dest_ignored:
                 logger.debug(f"文件移动: {src_relative} -> {dest_relative}")
-                # 处理为删除旧文件 + 创建新文件
+                self.callback(dest_relative, 'moved', src_relative)
+            elif not dest_ignored:
+                # 编辑器原子保存：临时文件重命名为目标文件
+                logger.debug(f"文件写入: {src_relative} -> {dest_relative}")
+                self.callback(dest_relative, 'modified')
+            elif not src_ignored:
+                logger.debug(f"文件移出: {src_relative} -> {dest_relative}")
                 self.callback(src_relative, 'deleted')
-                self.callback(dest_relative, 'created')
 
 
 class FileWatcher:
     """文件监听器"""
 
-    def __init__(self, project_root: Path):
+    def __init__(self, project_root: Path, ignore_matcher: Optional[IgnoreMatcher] = None):
         """
         初始化文件监听器
 
         Args:
             project_root: 项目根目录
+            ignore_matcher: 忽略规则匹配器，与初始扫描共用
         """
         self.project_root = project_root
+        self.ignore_matcher = ignore_matcher
         self.observer = Observer()
         self.event_handler: Optional[CanifyFileEventHandler] = None
         self.is_watching = False
 
-    def start(self, callback: Callable[[str, str], None]) -> None:
+    def start(self, callback: Callable[..., None]) -> None:
         """
         开始监听文件变更
 
@@ -116,7 +134,7 @@ class FileWatcher:
             logger.warning("文件监听器已经在运行")
             return
 
-        self.event_handler = CanifyFileEventHandler(callback, self.project_root)
+        self.event_handler = CanifyFileEventHandler(callback, self.project_root, self.ignore_matcher)
         self.observer.schedule(
             self.event_handler,
             str(self.project_root),
@@ -0,0 +1,159 @@
+"""
+影响分析器
+
+回答“删除或修改这些实体会影响什么”：直接引用它们的位置会变成悬空引用，
+沿引用关系反向传递可以得到所有直接或间接依赖它们的实体，以及需要重新验证的文件。
+
+分析结果按数据库写入代数缓存，任何写事务结束后缓存整体失效。
+"""
+
+import logging
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import asdict, dataclass, field, replace
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from ..storage import SymbolTableManager
+
+logger = logging.getLogger(__name__)
+
+# 缓存的分析结果数量上限
+IMPACT_CACHE_SIZE = 256
+
+# 缓存键：(项目ID, 排序后的起始实体ID, 最大遍历层数)
+ImpactKey = Tuple[int, Tuple[str, ...], Optional[int]]
+
+
+@dataclass
+class ImpactReport:
+    """影响分析结果"""
+
+    entity_ids: List[str]
+    max_depth: Optional[int] = None
+
+    # 直接引用起始实体的位置，起始实体被删除后这些引用会悬空
+    direct_references: List[Dict[str, Any]] = field(default_factory=list)
+    # 直接引用起始实体的实体
+    dependent_entities: List[str] = field(default_factory=list)
+    # 直接或间接引用起始实体的实体
+    impacted_entities: List[str] = field(default_factory=list)
+    # 含有指向起始实体或受影响实体的引用的文件（位置文件）
+    impacted_files: List[str] = field(default_factory=list)
+
+    generation: int = 0
+    cached: bool = False
+    elapsed_seconds: float = 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        """转换为可序列化的字典"""
+        return asdict(self)
+
+
+class ImpactAnalyzer:
+    """影响分析器"""
+
+    def __init__(self, symbol_table: SymbolTableManager, cache_size: int = IMPACT_CACHE_SIZE):
+        """
+        初始化影响分析器
+
+        Args:
+            symbol_table: 符号表管理器
+            cache_size: 缓存的分析结果数量上限
+        """
+        self.symbol_table = symbol_table
+        self.cache_size = cache_size
+
+        self._lock = threading.Lock()
+        self._cache: "OrderedDict[ImpactKey, ImpactReport]" = OrderedDict()
+        self._cache_generation = -1
+
+        # 统计信息
+        self.hits = 0
+        self.misses = 0
+
+    def analyze(
+        self,
+        project_id: int,
+        entity_ids: Iterable[str],
+        max_depth: Optional[int] = None
+    ) -> ImpactReport:
+        """
+        分析实体的影响范围
+
+        Args:
+            project_id: 项目ID
+            entity_ids: 起始实体ID
+            max_depth: 反向依赖的最大遍历层数，None 表示不限制
+
+        Returns:
+            影响分析结果
+        """
+        roots = tuple(sorted(set(entity_ids)))
+        key: ImpactKey = (project_id, roots, max_depth)
+
+        generation = self.symbol_table.db_manager.write_generation
+        with self._lock:
+            if self._cache_generation != generation:
+                self._cache.clear()
+                self._cache_generation = generation
+            report = self._cache.get(key)
+            if report is not None:
+                self._cache.move_to_end(key)
+                self.hits += 1
+                return replace(report, cached=True)
+            self.misses += 1
+
+        start = time.perf_counter()
+        report = self._compute(project_id, roots, max_depth)
+        report.generation = generation
+        report.elapsed_seconds = time.perf_counter() - start
+
+        with self._lock:
+            # 计算期间有新的写入时结果可能已过期，不缓存
+            if self._cache_generation == generation == self.symbol_table.db_manager.write_generation:
+                self._cache[key] = report
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+
+        logger.debug(
+            f"影响分析: {len(roots)} 个实体, {len(report.impacted_entities)} 个受影响实体, "
+            f"{len(report.impacted_files)} 个受影响文件, 耗时 {report.elapsed_seconds:.4f}s"
+        )
+        return report
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        获取分析器统计信息
+
+        Returns:
+            统计信息字典
+        """
+        with self._lock:
+            return {
+                "generation": self._cache_generation,
+                "cached_reports": len(self._cache),
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+    def _compute(self, project_id: int, roots: Tuple[str, ...], max_depth: Optional[int]) -> ImpactReport:
+        """执行影响分析"""
+        direct = self.symbol_table.get_referrers(project_id, roots)
+        impacted = self.symbol_table.get_transitive_referrers(project_id, roots, max_depth)
+
+        files = {summary.location_file for summary in direct}
+        if impacted:
+            files.update(summary.location_file for summary in self.symbol_table.get_referrers(project_id, impacted))
+
+        return ImpactReport(
+            entity_ids=list(roots),
+            max_depth=max_depth,
+            direct_references=[summary._asdict() for summary in direct],
+            dependent_entities=sorted({
+                summary.source_entity_id for summary in direct
+                if summary.source_entity_id is not None and summary.source_entity_id not in roots
+            }),
+            impacted_entities=sorted(impacted),
+            impacted_files=sorted(files),
+        )
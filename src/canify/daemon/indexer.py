@@ -0,0 +1,526 @@
+"""
+项目索引器
+
+负责将项目文件解析结果写入符号表，包括初始全量扫描和单个文件的增量更新。
+全量扫描可以使用进程池并行解析文件，主进程按批次在大事务中批量入库。
+"""
+
+import logging
+import os
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from functools import partial
+from itertools import chain
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from ..discovery.file_walker import (
+    FILE_KIND_MARKDOWN, INDEXED_FILE_KINDS, FileWalker
+)
+from ..discovery.ignore_matcher import IgnoreMatcher
+from ..storage import BlobStore, DatabaseManager, SymbolTableManager, SpecStorageManager
+from ..storage.symbol_table import BulkInsertStats
+from ..storage.file_symbols import FileSymbols
+from ..storage.storage_writer import StorageWriter
+from .file_processor import FileProcessor, RestoreFunc, find_duplicate_declarations
+
+logger = logging.getLogger(__name__)
+
+# 文件数少于该值时不启动进程池，避免进程启动开销超过解析本身
+MIN_FILES_FOR_PARALLEL_SCAN = 64
+
+# 工作进程内的文件处理器，由 _init_scan_worker 创建
+_worker_processor: Optional[FileProcessor] = None
+
+
+def _init_scan_worker(project_root: str) -> None:
+    """扫描工作进程初始化函数"""
+    global _worker_processor
+    # 全量扫描中每个文件只解析一次，工作进程不缓存解析结果
+    _worker_processor = FileProcessor(Path(project_root), cache_size=0)
+
+
+def _process_in_worker(task: Tuple[str, Optional[str]]) -> FileSymbols:
+    """在扫描工作进程中解析单个文件，task 为 (文件路径, 已入库的内容哈希)"""
+    return _worker_processor.process(*task)  # type: ignore[union-attr]
+
+
+@dataclass
+class ScanStats:
+    """扫描统计信息"""
+
+    files: int = 0
+    unchanged_files: int = 0
+    restored_files: int = 0
+    deleted_files: int = 0
+    failed_files: int = 0
+    declarations: int = 0
+    references: int = 0
+    workers: int = 1
+    elapsed_seconds: float = 0.0
+
+    # 批量写入统计
+    rows_inserted: int = 0
+    insert_seconds: float = 0.0
+
+    @property
+    def files_per_second(self) -> float:
+        """扫描吞吐量（文件/秒）"""
+        if self.elapsed_seconds <= 0:
+            return 0.0
+        return self.files / self.elapsed_seconds
+
+    def to_dict(self) -> Dict[str, Any]:
+        """转换为可序列化的字典"""
+        result = asdict(self)
+        result["files_per_second"] = round(self.files_per_second, 1)
+        return result
+
+
+class ProjectIndexer:
+    """项目索引器"""
+
+    def __init__(
+        self,
+        project_root: Path,
+        db_manager: DatabaseManager,
+        symbol_table: SymbolTableManager,
+        spec_storage: SpecStorageManager,
+        scan_workers: Optional[int] = None,
+        batch_size: int = 500,
+        writer: Optional[StorageWriter] = None,
+        ignore_matcher: Optional[IgnoreMatcher] = None,
+        blob_store: Optional[BlobStore] = None
+    ):
+        """
+        初始化项目索引器
+
+        Args:
+            project_root: 项目根目录
+            db_manager: 数据库管理器
+            symbol_table: 符号表管理器
+            spec_storage: spec 存储管理器
+            scan_workers: 扫描工作进程数，None 表示使用 CPU 核数，1 表示在当前进程中串行解析
+            batch_size: 批量入库时每批包含的文件数
+            writer: 存储写入器，提供时所有写操作都交给写入线程执行
+            ignore_matcher: 忽略规则匹配器，None 时按项目根目录创建
+            blob_store: 文件符号存储，提供时保存解析结果，文件内容变回已保存的版本时直接恢复
+        """
+        self.project_root = project_root
+        self.db_manager = db_manager
+        self.symbol_table = symbol_table
+        self.spec_storage = spec_storage
+        self.scan_workers = scan_workers
+        self.batch_size = batch_size
+        self.writer = writer
+        self.ignore_matcher = ignore_matcher if ignore_matcher is not None else IgnoreMatcher(project_root)
+        self.blob_store = blob_store
+        self.processor = FileProcessor(project_root)
+
+    def scan(self, project_id: int, incremental: bool = False) -> ScanStats:
+        """
+        对项目目录执行扫描并入库
+
+        增量模式下复用已持久化的符号表：先比较文件的修改时间和大小，
+        不一致时再比较内容哈希，只重新解析新增和变更的文件，并清理已删除的文件。
+        变更文件的内容在文件符号存储中有保存的解析结果时（例如切换回之前的分支）直接恢复。
+
+        Args:
+            project_id: 项目ID
+            incremental: 是否增量扫描
+
+        Returns:
+            扫描统计信息
+        """
+        start_time = time.perf_counter()
+        stats = ScanStats()
+
+        restored: List[FileSymbols] = []
+        restore: Optional[RestoreFunc] = None
+        if incremental:
+            tasks = self._collect_changed_files(project_id, stats)
+            restore = self._restore_func(project_id)
+            if restore is not None and self._resolve_worker_count(len(tasks)) > 1:
+                # 工作进程不访问数据库，先在主进程中恢复已保存的解析结果
+                restored, tasks = self._try_restore(tasks, restore)
+        else:
+            tasks = [(file_path, None) for file_path, _ in self._discover_files()]
+
+        workers = self._resolve_worker_count(len(tasks))
+        stats.workers = workers
+
+        if workers > 1:
+            chunksize = max(1, min(64, len(tasks) // (workers * 4)))
+            with ProcessPoolExecutor(
+                max_workers=workers,
+                initializer=_init_scan_worker,
+                initargs=(str(self.project_root),)
+            ) as pool:
+                results = pool.map(_process_in_worker, tasks, chunksize=chunksize)
+                self._load_results(project_id, chain(restored, results), stats)
+        else:
+            results = (self.processor.process(*task, restore=restore) for task in tasks)
+            self._load_results(project_id, chain(restored, results), stats)
+
+        stats.elapsed_seconds = time.perf_counter() - start_time
+        return stats
+
+    def _collect_changed_files(self, project_id: int, stats: ScanStats) -> List[Tuple[str, Optional[str]]]:
+        """
+        比较磁盘文件与 files 表，找出需要重新处理的文件并删除已不存在的文件
+
+        Args:
+            project_id: 项目ID
+            stats: 扫描统计信息（输出）
+
+        Returns:
+            (文件路径, 已入库的内容哈希) 列表
+        """
+        stored_states = self.symbol_table.get_file_states(project_id)
+        tasks: List[Tuple[str, Optional[str]]] = []
+
+        for file_path, stat in self._discover_files():
+            state = stored_states.pop(file_path, None)
+            if state is None:
+                tasks.append((file_path, None))
+            elif state["status"] != 'parsed':
+                # 上次处理出错（例如重复声明）的文件总是重新解析
+                tasks.append((file_path, None))
+            elif state["mtime_ns"] == stat.st_mtime_ns and state["file_size"] == stat.st_size:
+                stats.unchanged_files += 1
+            else:
+                tasks.append((file_path, state["file_hash"] or None))
+
+        # files 表中剩余的记录对应已删除的文件
+        if stored_states:
+            def delete_files() -> None:
+                for file_path in stored_states:
+                    self.symbol_table.delete_file(project_id, file_path)
+            self._submit(delete_files).result()
+            stats.deleted_files = len(stored_states)
+
+        logger.info(
+            f"增量扫描: {len(tasks)} 个文件需要处理, {stats.unchanged_files} 个未变化, "
+            f"{stats.deleted_files} 个已删除"
+        )
+        return tasks
+
+    def update_file(self, project_id: int, file_path: str) -> FileSymbols:
+        """
+        解析单个文件并更新符号表
+
+        Args:
+            project_id: 项目ID
+            file_path: 文件路径（相对于项目根目录）
+
+        Returns:
+            文件符号数据
+        """
+        symbols, future = self.submit_update(project_id, file_path)
+        future.result()
+        return symbols
+
+    def submit_update(self, project_id: int, file_path: str) -> Tuple[FileSymbols, Future]:
+        """
+        在当前线程解析文件，将入库操作提交给写入器
+
+        文件内容与已入库的内容哈希一致时（例如只修改了时间戳，或格式化后内容未变）
+        不解析，入库操作只刷新文件系统状态；内容在文件符号存储中有保存的解析结果时直接恢复。
+
+        Args:
+            project_id: 项目ID
+            file_path: 文件路径（相对于项目根目录）
+
+        Returns:
+            (文件符号数据, 入库完成的 Future)
+        """
+        record = self.symbol_table.get_file_record(project_id, file_path)
+        # 上次处理出错的文件总是重新解析
+        known_hash = (record["file_hash"] or None) if record and record["status"] == 'parsed' else None
+        symbols = self.processor.process(file_path, known_hash, restore=self._restore_func(project_id))
+        return symbols, self._submit(partial(self.apply, project_id, symbols))
+
+    def delete_file(self, project_id: int, file_path: str) -> None:
+        """
+        从符号表中删除文件的所有符号
+
+        Args:
+            project_id: 项目ID
+            file_path: 文件路径（相对于项目根目录）
+        """
+        self.submit_delete(project_id, file_path).result()
+
+    def submit_delete(self, project_id: int, file_path: str) -> Future:
+        """
+        将删除文件符号的操作提交给写入器
+
+        Args:
+            project_id: 项目ID
+            file_path: 文件路径（相对于项目根目录）
+
+        Returns:
+            删除完成的 Future
+        """
+        return self._submit(partial(self.symbol_table.delete_file, project_id, file_path))
+
+    def _restore_func(self, project_id: int) -> Optional[RestoreFunc]:
+        """构建从文件符号存储恢复解析结果的函数，没有文件符号存储时返回None"""
+        if self.blob_store is None or not self.blob_store.has_blobs(project_id):
+            return None
+        return partial(self.blob_store.load, project_id)
+
+    def _try_restore(
+        self,
+        tasks: List[Tuple[str, Optional[str]]],
+        restore: RestoreFunc
+    ) -> Tuple[List[FileSymbols], List[Tuple[str, Optional[str]]]]:
+        """
+        在当前进程中读取待处理的文件，跳过内容未变化的文件并恢复已保存的解析结果
+
+        Args:
+            tasks: (文件路径, 已入库的内容哈希) 列表
+            restore: 恢复解析结果的函数
+
+        Returns:
+            (无需解析的文件符号数据, 仍需解析的任务)
+        """
+        restored: List[FileSymbols] = []
+        remaining: List[Tuple[str, Optional[str]]] = []
+        for task in tasks:
+            symbols = self.processor.try_restore(*task, restore)
+            if symbols is None:
+                remaining.append(task)
+            else:
+                restored.append(symbols)
+        return restored, remaining
+
+    def _save_blobs(self, project_id: int, symbols_list: List[FileSymbols]) -> None:
+        """将入库的解析结果保存到文件符号存储"""
+        if self.blob_store is not None:
+            self.blob_store.put_many(project_id, symbols_list)
+
+    def _submit(self, operation: Callable[[], Any]) -> Future:
+        """提交写操作，没有写入器时在当前线程的事务中执行"""
+        if self.writer is not None:
+            return self.writer.submit(operation)
+
+        future: Future = Future()
+        try:
+            with self.db_manager.transaction():
+                future.set_result(operation())
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
+    def apply(
+        self,
+        project_id: int,
+        symbols: FileSymbols,
+        known_entities: Optional[Dict[str, str]] = None
+    ) -> None:
+        """
+        将文件解析结果写入符号表
+
+        Markdown 文件写入实体声明、引用和依赖，Python 文件写入模式，spec 文件写入
+        spec 规则和依赖；其他文件直接跳过。文件原有的符号在同一个事务中被整体替换，
+        读取方不会看到文件暂时没有符号的中间状态。
+
+        Args:
+            project_id: 项目ID
+            symbols: 文件符号数据
+            known_entities: 已知实体ID到声明位置文件的映射，批量入库时用于代替逐个查询数据库
+        """
+        file_path = symbols.file_path
+
+        if symbols.kind not in INDEXED_FILE_KINDS:
+            logger.debug(f"跳过不需要索引的文件: {file_path}")
+            return
+
+        if symbols.error is not None:
+            self.symbol_table.update_file_status(project_id, file_path, 'error', symbols.error)
+            return
+
+        if symbols.unchanged:
+            # 内容未变化，只刷新文件系统状态
+            self.symbol_table.update_file_metadata(
+                project_id, file_path, symbols.file_hash, symbols.mtime_ns, symbols.file_size
+            )
+            return
+
+        if symbols.kind == FILE_KIND_MARKDOWN:
+            self._store_entities(project_id, symbols, known_entities)
+        else:
+            self._store_file(project_id, symbols)
+
+    def _store_entities(
+        self,
+        project_id: int,
+        symbols: FileSymbols,
+        known_entities: Optional[Dict[str, str]]
+    ) -> None:
+        """写入 Markdown 文件的实体声明、引用和依赖"""
+        file_path = symbols.file_path
+
+        # 在插入前检查重复声明
+        if known_entities is not None:
+            lookup = known_entities.get
+        else:
+            lookup = self._lookup_entity_location(project_id)
+        duplicate_errors = find_duplicate_declarations(symbols, lookup)
+
+        if not duplicate_errors:
+            self.symbol_table.replace_file_symbols(project_id, symbols)
+            self._save_blobs(project_id, [symbols])
+            if known_entities is not None:
+                for row in symbols.declarations:
+                    known_entities[row[0]] = row[5]
+            logger.debug(f"文件更新完成: {file_path} ({len(symbols.declarations)} 声明, {len(symbols.references)} 引用)")
+            return
+
+        # 有重复错误，只清理符号但不插入新符号
+        for error_message in duplicate_errors:
+            logger.error(error_message)
+        with self.db_manager.transaction():
+            self.symbol_table.update_file_metadata(
+                project_id, file_path, symbols.file_hash, symbols.mtime_ns, symbols.file_size
+            )
+            self.symbol_table.delete_symbols_by_file(project_id, file_path)
+            self.symbol_table.update_file_status(project_id, file_path, 'error', "\n".join(duplicate_errors))
+        logger.warning(f"文件有重复声明，跳过符号插入: {file_path}")
+
+    def _store_file(self, project_id: int, symbols: FileSymbols) -> None:
+        """写入 Python 文件的实体模式或 spec 文件的 spec 规则和依赖"""
+        self.symbol_table.replace_file_symbols(project_id, symbols)
+        self._save_blobs(project_id, [symbols])
+
+    def _lookup_entity_location(self, project_id: int):
+        """构建按实体ID查询声明位置文件的函数"""
+        return partial(self.symbol_table.get_entity_location, project_id)
+
+    def _load_results(self, project_id: int, results: Iterable[FileSymbols], stats: ScanStats) -> None:
+        """
+        按批次将解析结果写入符号表
+
+        每个批次作为一个写操作，可以批量写入的文件合并写入；
+        批量写入失败时退回到逐个文件写入，单个文件失败不影响其他文件。
+
+        Args:
+            project_id: 项目ID
+            results: 文件解析结果
+            stats: 扫描统计信息（输出）
+        """
+        known_entities = self.symbol_table.get_entity_locations(project_id)
+
+        for batch in self._batched(results):
+            future = self._submit(partial(self._apply_batch, project_id, batch, known_entities))
+            error = future.exception()
+            if error is None:
+                bulk_stats = future.result()
+                stats.rows_inserted += bulk_stats.rows
+                stats.insert_seconds += bulk_stats.elapsed_seconds
+            else:
+                # 回滚的批次留在 known_entities 中的实体只指向其自身所在文件，不会被误判为重复
+                logger.warning(f"批量写入失败，逐个文件写入: {error}")
+                self._submit(partial(self._apply_each, project_id, batch, known_entities)).result()
+
+            for symbols in batch:
+                if symbols.unchanged:
+                    stats.unchanged_files += 1
+                    continue
+
+                stats.files += 1
+                if symbols.restored:
+                    stats.restored_files += 1
+                if symbols.error is not None:
+                    stats.failed_files += 1
+                else:
+                    stats.declarations += len(symbols.declarations)
+                    stats.references += len(symbols.references)
+
+            logger.debug(f"已入库 {stats.files} 个文件")
+
+    def _apply_batch(
+        self,
+        project_id: int,
+        batch: List[FileSymbols],
+        known_entities: Dict[str, str]
+    ) -> BulkInsertStats:
+        """
+        写入一个批次：解析成功且没有重复声明的文件批量写入，其余文件逐个写入
+
+        Args:
+            project_id: 项目ID
+            batch: 文件解析结果
+            known_entities: 已知实体ID到声明位置文件的映射（会被更新）
+
+        Returns:
+            批量写入统计
+        """
+        bulk: List[FileSymbols] = []
+        single: List[FileSymbols] = []
+        for symbols in batch:
+            if symbols.error is not None or symbols.unchanged or symbols.kind not in INDEXED_FILE_KINDS:
+                single.append(symbols)
+                continue
+            if symbols.kind == FILE_KIND_MARKDOWN:
+                if find_duplicate_declarations(symbols, known_entities.get):
+                    single.append(symbols)
+                    continue
+                for row in symbols.declarations:
+                    known_entities[row[0]] = row[5]
+            bulk.append(symbols)
+
+        bulk_stats = self.symbol_table.bulk_insert_symbols(project_id, bulk)
+        self._save_blobs(project_id, bulk)
+
+        self._apply_each(project_id, single, known_entities)
+        return bulk_stats
+
+    def _apply_each(self, project_id: int, batch: List[FileSymbols], known_entities: Dict[str, str]) -> None:
+        """逐个文件写入，每个文件在自己的保存点中执行"""
+        for symbols in batch:
+            try:
+                with self.db_manager.transaction():
+                    self.apply(project_id, symbols, known_entities)
+            except Exception as e:
+                logger.error(f"写入文件符号失败 {symbols.file_path}: {e}")
+                symbols.error = str(e)
+
+    def _batched(self, results: Iterable[FileSymbols]) -> Iterator[List[FileSymbols]]:
+        """将解析结果按 batch_size 分批"""
+        batch: List[FileSymbols] = []
+        for symbols in results:
+            batch.append(symbols)
+            if len(batch) >= self.batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    def _discover_files(self) -> List[Tuple[str, os.stat_result]]:
+        """
+        查找项目中需要索引的文件
+
+        Returns:
+            (相对于项目根目录的文件路径, 文件状态) 列表
+        """
+        walker = FileWalker(self.project_root, kinds=INDEXED_FILE_KINDS, ignore_matcher=self.ignore_matcher)
+        files = [(walked.relative_path, walked.stat()) for walked in walker.walk()]
+        logger.debug(f"文件遍历: {walker.get_stats()}")
+        return files
+
+    def _resolve_worker_count(self, file_count: int) -> int:
+        """
+        根据配置和文件数量确定实际使用的工作进程数
+
+        Args:
+            file_count: 待扫描文件数
+
+        Returns:
+            工作进程数
+        """
+        workers = self.scan_workers if self.scan_workers is not None else (os.cpu_count() or 1)
+        if workers <= 1 or file_count < MIN_FILES_FOR_PARALLEL_SCAN:
+            return 1
+        return min(workers, file_count)
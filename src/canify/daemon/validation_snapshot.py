@@ -0,0 +1,208 @@
+"""
+验证快照
+
+保存最近一次验证得到的按文件、按实体组织的诊断结果，并随文件事件增量维护。
+每次更新都会递增代数（generation），validate 请求直接读取快照而无需重新验证。
+"""
+
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from ..models import ValidationResult, ValidationError
+
+logger = logging.getLogger(__name__)
+
+
+class ValidationSnapshot:
+    """验证快照"""
+
+    def __init__(self):
+        """初始化验证快照"""
+        self._lock = threading.RLock()
+        self._file_results: Dict[str, ValidationResult] = {}
+        self._entity_diagnostics: Dict[str, Dict[str, List[ValidationError]]] = {}
+        self._spec_results: Dict[Tuple[str, str], ValidationResult] = {}
+        # spec 文件的缓存结果最近一次失效时的代数，早于该代数开始的执行结果不再缓存
+        self._spec_invalidated: Dict[str, int] = {}
+        self._specs_reset_generation = 0
+
+        self.generation = 0
+        self.updated_at: Optional[float] = None
+
+    @property
+    def is_ready(self) -> bool:
+        """快照是否已完成首次全量验证"""
+        return self.generation > 0
+
+    def replace(self, results: Dict[str, ValidationResult]) -> int:
+        """
+        用全量验证结果替换快照
+
+        Args:
+            results: 文件路径到验证结果的映射
+
+        Returns:
+            新的代数
+        """
+        with self._lock:
+            self._file_results.clear()
+            self._entity_diagnostics.clear()
+            self._spec_results.clear()
+            self._spec_invalidated.clear()
+            self._specs_reset_generation = self.generation + 1
+            return self.update(results)
+
+    def update(
+        self,
+        results: Dict[str, ValidationResult],
+        removed_files: Iterable[str] = (),
+        stale_spec_files: Iterable[str] = ()
+    ) -> int:
+        """
+        增量更新快照
+
+        Args:
+            results: 重新验证的文件的验证结果
+            removed_files: 已删除的文件
+            stale_spec_files: 需要丢弃缓存执行结果的 spec 文件
+
+        Returns:
+            新的代数
+        """
+        with self._lock:
+            for file_path in removed_files:
+                self._file_results.pop(file_path, None)
+                self._entity_diagnostics.pop(file_path, None)
+
+            for file_path, result in results.items():
+                self._file_results[file_path] = result
+                self._entity_diagnostics[file_path] = self._group_by_entity(result)
+
+            self.generation += 1
+
+            stale = set(stale_spec_files)
+            if stale:
+                self._spec_results = {
+                    key: value for key, value in self._spec_results.items() if key[0] not in stale
+                }
+                for file_path in stale:
+                    self._spec_invalidated[file_path] = self.generation
+
+            self.updated_at = time.time()
+            return self.generation
+
+    def collect(self, path_filter: Optional[Callable[[str], bool]] = None) -> Tuple[ValidationResult, int]:
+        """
+        合并快照中的验证结果
+
+        Args:
+            path_filter: 文件路径过滤函数，None 表示所有文件
+
+        Returns:
+            (合并后的验证结果, 快照代数)
+        """
+        with self._lock:
+            result = ValidationResult.success_result()
+            for file_path in sorted(self._file_results):
+                if path_filter is None or path_filter(file_path):
+                    result.merge(self._file_results[file_path])
+            return result, self.generation
+
+    def get_file_result(self, file_path: str) -> Optional[ValidationResult]:
+        """
+        获取单个文件的验证结果
+
+        Args:
+            file_path: 文件路径
+
+        Returns:
+            验证结果，文件不在快照中时返回None
+        """
+        with self._lock:
+            return self._file_results.get(file_path)
+
+    def get_entity_diagnostics(self, entity_id: str) -> List[ValidationError]:
+        """
+        获取与实体相关的诊断
+
+        Args:
+            entity_id: 实体ID
+
+        Returns:
+            诊断列表
+        """
+        with self._lock:
+            diagnostics: List[ValidationError] = []
+            for by_entity in self._entity_diagnostics.values():
+                diagnostics.extend(by_entity.get(entity_id, []))
+            return diagnostics
+
+    def get_spec_result(self, file_path: str, rule_id: str) -> Optional[ValidationResult]:
+        """
+        获取缓存的 spec 规则执行结果
+
+        Args:
+            file_path: spec 文件路径
+            rule_id: 规则ID
+
+        Returns:
+            执行结果，未缓存时返回None
+        """
+        with self._lock:
+            return self._spec_results.get((file_path, rule_id))
+
+    def set_spec_result(
+        self,
+        file_path: str,
+        rule_id: str,
+        result: ValidationResult,
+        generation: Optional[int] = None
+    ) -> bool:
+        """
+        缓存 spec 规则执行结果，直到 spec 文件或其读取的实体发生变化
+
+        Args:
+            file_path: spec 文件路径
+            rule_id: 规则ID
+            result: 执行结果
+            generation: 开始执行时的快照代数；执行期间 spec 文件的结果已失效时不缓存，
+                None 表示总是缓存
+
+        Returns:
+            是否已缓存
+        """
+        with self._lock:
+            if generation is not None and (
+                generation < self._specs_reset_generation
+                or generation < self._spec_invalidated.get(file_path, 0)
+            ):
+                return False
+            self._spec_results[(file_path, rule_id)] = result
+            return True
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        获取快照统计信息
+
+        Returns:
+            统计信息字典
+        """
+        with self._lock:
+            return {
+                "generation": self.generation,
+                "updated_at": self.updated_at,
+                "files": len(self._file_results),
+                "files_with_errors": sum(1 for result in self._file_results.values() if result.errors),
+                "cached_spec_results": len(self._spec_results),
+            }
+
+    @staticmethod
+    def _group_by_entity(result: ValidationResult) -> Dict[str, List[ValidationError]]:
+        """按相关实体分组诊断"""
+        by_entity: Dict[str, List[ValidationError]] = {}
+        for diagnostic in [*result.errors, *result.warnings]:
+            if diagnostic.entity_id:
+                by_entity.setdefault(diagnostic.entity_id, []).append(diagnostic)
+        return by_entity
@@ -0,0 +1,171 @@
+"""
+文件遍历器
+
+基于 os.scandir 遍历项目目录，在进入目录之前剪除被忽略的目录（默认忽略规则、
+.gitignore 和 .canifyignore，见 ignore_matcher）以及虚拟环境，只产出需要解析的
+文件并按类型分类。项目扫描、lint 和 spec 发现共用同一个遍历器。
+"""
+
+import logging
+import os
+from pathlib import Path
+from typing import Any, Dict, FrozenSet, Iterable, Iterator, List, Optional
+
+from .ignore_matcher import IgnoreMatcher
+
+logger = logging.getLogger(__name__)
+
+# 文件类型
+FILE_KIND_MARKDOWN = 'markdown'
+FILE_KIND_PYTHON = 'python'
+FILE_KIND_SPEC = 'spec'
+FILE_KIND_YAML = 'yaml'
+
+ALL_FILE_KINDS: FrozenSet[str] = frozenset({
+    FILE_KIND_MARKDOWN, FILE_KIND_PYTHON, FILE_KIND_SPEC, FILE_KIND_YAML
+})
+
+# 项目索引解析的文件类型，其他 YAML 文件不包含符号
+INDEXED_FILE_KINDS: FrozenSet[str] = frozenset({
+    FILE_KIND_MARKDOWN, FILE_KIND_PYTHON, FILE_KIND_SPEC
+})
+
+# 含有该文件的目录是虚拟环境，无论目录名是什么
+VIRTUALENV_MARKER = 'pyvenv.cfg'
+
+
+def classify_file(name: str) -> Optional[str]:
+    """
+    根据文件名判断文件类型
+
+    扩展名和 spec_ 前缀区分大小写，与之前的后缀匹配和 spec_*.yaml 通配一致。
+
+    Args:
+        name: 文件名
+
+    Returns:
+        文件类型，不需要解析的文件返回None
+    """
+    if name.endswith('.md'):
+        return FILE_KIND_MARKDOWN
+    if name.endswith('.py'):
+        return FILE_KIND_PYTHON
+    if name.endswith(('.yaml', '.yml')):
+        return FILE_KIND_SPEC if name.startswith('spec_') else FILE_KIND_YAML
+    return None
+
+
+class WalkedFile:
+    """遍历得到的文件"""
+
+    __slots__ = ('path', 'relative_path', 'kind', '_entry')
+
+    def __init__(self, entry: os.DirEntry, relative_path: str, kind: str):
+        self.path = Path(entry.path)
+        self.relative_path = relative_path
+        self.kind = kind
+        self._entry = entry
+
+    def stat(self) -> os.stat_result:
+        """文件状态，首次调用时读取并缓存"""
+        return self._entry.stat()
+
+    def __repr__(self) -> str:
+        return f"WalkedFile({self.relative_path!r}, {self.kind!r})"
+
+
+class FileWalker:
+    """文件遍历器"""
+
+    def __init__(
+        self,
+        root: Path,
+        kinds: Optional[Iterable[str]] = None,
+        ignore_matcher: Optional[IgnoreMatcher] = None
+    ):
+        """
+        初始化文件遍历器
+
+        Args:
+            root: 遍历的根目录
+            kinds: 需要的文件类型，None 表示所有类型
+            ignore_matcher: 忽略规则匹配器，None 时按根目录创建
+        """
+        self.root = Path(root)
+        self.kinds: FrozenSet[str] = frozenset(kinds) if kinds is not None else ALL_FILE_KINDS
+        self.ignore_matcher = ignore_matcher if ignore_matcher is not None else IgnoreMatcher(self.root)
+
+        # 统计信息（最近一次遍历）
+        self.directories_visited = 0
+        self.directories_pruned = 0
+        self.files_yielded = 0
+
+    def walk(self) -> Iterator[WalkedFile]:
+        """
+        遍历根目录，不跟随目录的符号链接
+
+        Yields:
+            需要的类型的文件
+        """
+        self.directories_visited = 0
+        self.directories_pruned = 0
+        self.files_yielded = 0
+
+        stack: List[str] = ['']
+        while stack:
+            relative_dir = stack.pop()
+            directory = os.path.join(self.root, relative_dir) if relative_dir else str(self.root)
+            try:
+                with os.scandir(directory) as iterator:
+                    entries = list(iterator)
+            except OSError as e:
+                logger.warning(f"无法读取目录 {directory}: {e}")
+                continue
+
+            if relative_dir and any(entry.name == VIRTUALENV_MARKER for entry in entries):
+                self.directories_pruned += 1
+                continue
+            self.directories_visited += 1
+
+            for entry in entries:
+                relative_path = os.path.join(relative_dir, entry.name) if relative_dir else entry.name
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        if self.ignore_matcher.is_ignored_entry(relative_path, is_dir=True):
+                            self.directories_pruned += 1
+                        else:
+                            stack.append(relative_path)
+                        continue
+
+                    kind = classify_file(entry.name)
+                    if kind is None or kind not in self.kinds or not entry.is_file():
+                        continue
+                    if self.ignore_matcher.is_ignored_entry(relative_path, is_dir=False):
+                        continue
+                except OSError:
+                    continue
+
+                self.files_yielded += 1
+                yield WalkedFile(entry, relative_path, kind)
+
+    def files(self) -> List[Path]:
+        """
+        遍历根目录并返回文件的绝对路径
+
+        Returns:
+            文件路径列表
+        """
+        return [walked.path for walked in self.walk()]
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        获取最近一次遍历的统计信息
+
+        Returns:
+            统计信息字典
+        """
+        return {
+            "directories_visited": self.directories_visited,
+            "directories_pruned": self.directories_pruned,
+            "files": self.files_yielded,
+        }
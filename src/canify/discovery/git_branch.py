@@ -0,0 +1,71 @@
+"""
+Git 分支检测
+
+直接读取 .git/HEAD 获取项目当前所在的分支，不依赖 git 命令。
+工作树（worktree）和子模块中 .git 是指向实际 git 目录的文件，同样支持。
+"""
+
+import logging
+from pathlib import Path
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+# HEAD 指向分支时的前缀
+HEAD_REF_PREFIX = "ref: "
+BRANCH_REF_PREFIX = "refs/heads/"
+
+# 游离 HEAD 使用提交哈希的前若干位作为分支名
+DETACHED_HEAD_LENGTH = 12
+
+
+def find_git_dir(project_root: Path) -> Optional[Path]:
+    """
+    查找项目的 git 目录
+
+    Args:
+        project_root: 项目根目录
+
+    Returns:
+        git 目录路径，项目不在 git 版本库中时返回None
+    """
+    for directory in (project_root, *project_root.parents):
+        dot_git = directory / ".git"
+        if dot_git.is_dir():
+            return dot_git
+        if dot_git.is_file():
+            try:
+                content = dot_git.read_text(encoding="utf-8").strip()
+            except OSError:
+                return None
+            if content.startswith("gitdir:"):
+                git_dir = Path(content[len("gitdir:"):].strip())
+                return git_dir if git_dir.is_absolute() else (directory / git_dir).resolve()
+            return None
+    return None
+
+
+def read_current_branch(project_root: Path) -> Optional[str]:
+    """
+    读取项目当前所在的分支
+
+    Args:
+        project_root: 项目根目录
+
+    Returns:
+        分支名；游离 HEAD 时返回提交哈希的前缀；不在 git 版本库中或无法读取时返回None
+    """
+    git_dir = find_git_dir(Path(project_root).absolute())
+    if git_dir is None:
+        return None
+
+    try:
+        head = (git_dir / "HEAD").read_text(encoding="utf-8").strip()
+    except OSError as e:
+        logger.debug(f"读取 git HEAD 失败 {git_dir}: {e}")
+        return None
+
+    if head.startswith(HEAD_REF_PREFIX):
+        ref = head[len(HEAD_REF_PREFIX):].strip()
+        return ref[len(BRANCH_REF_PREFIX):] if ref.startswith(BRANCH_REF_PREFIX) else ref
+    return head[:DETACHED_HEAD_LENGTH] or None
@@ -0,0 +1,336 @@
+"""
+忽略规则匹配器
+
+按 gitignore 语义读取项目中各级目录的 .gitignore 和 .canifyignore 文件。
+每个模式只编译一次为正则表达式，每个目录生效的规则列表（上级目录的规则加上
+本目录的规则）按目录缓存。优先级：.canifyignore > .gitignore > 默认忽略规则，
+深层目录的规则优先于浅层目录，同一文件中后出现的规则优先。
+"""
+
+import logging
+import os
+import re
+import threading
+from pathlib import Path
+from typing import Any, Dict, FrozenSet, Iterable, List, Pattern, Tuple
+
+logger = logging.getLogger(__name__)
+
+# 忽略文件，按优先级从低到高排列
+GITIGNORE_FILE = '.gitignore'
+CANIFYIGNORE_FILE = '.canifyignore'
+IGNORE_FILE_NAMES: Tuple[str, ...] = (GITIGNORE_FILE, CANIFYIGNORE_FILE)
+
+# 默认忽略的目录：版本库、依赖、虚拟环境、缓存和构建输出
+DEFAULT_IGNORED_DIRECTORIES: FrozenSet[str] = frozenset({
+    '.git', '.hg', '.svn',
+    'node_modules', 'bower_components', 'site-packages',
+    '.venv', 'venv', '.tox', '.nox', '.eggs',
+    '__pycache__', '.mypy_cache', '.pytest_cache', '.ruff_cache',
+    'build', 'dist', '.idea', '.vscode', '.canify',
+})
+
+DEFAULT_IGNORE_PATTERNS: Tuple[str, ...] = tuple(
+    f"{name}/" for name in sorted(DEFAULT_IGNORED_DIRECTORIES)
+) + ('*.egg-info/',)
+
+
+def is_ignore_file(file_path: str) -> bool:
+    """
+    判断文件是否是忽略规则文件
+
+    Args:
+        file_path: 文件路径
+
+    Returns:
+        是否是 .gitignore 或 .canifyignore
+    """
+    return os.path.basename(file_path) in IGNORE_FILE_NAMES
+
+
+class IgnoreRule:
+    """编译后的单条忽略规则"""
+
+    __slots__ = ('pattern', 'base', 'negated', 'dir_only', 'basename_only', 'regex')
+
+    def __init__(self, pattern: str, base: str, negated: bool, dir_only: bool, basename_only: bool):
+        """
+        初始化忽略规则
+
+        Args:
+            pattern: 去掉 ! 前缀和结尾 / 的模式
+            base: 规则所在目录（相对于根目录，根目录为空字符串）
+            negated: 是否是 ! 开头的反向规则
+            dir_only: 是否只匹配目录
+            basename_only: 模式不含 /，只匹配文件名
+        """
+        self.pattern = pattern
+        self.base = base
+        self.negated = negated
+        self.dir_only = dir_only
+        self.basename_only = basename_only
+        self.regex: Pattern[str] = re.compile(_translate(pattern))
+
+    def matches(self, relative_path: str, is_dir: bool) -> bool:
+        """
+        判断路径是否匹配该规则
+
+        Args:
+            relative_path: 相对于根目录的路径，以 / 分隔
+            is_dir: 路径是否是目录
+
+        Returns:
+            是否匹配
+        """
+        if self.dir_only and not is_dir:
+            return False
+
+        if self.base:
+            if not relative_path.startswith(self.base + '/'):
+                return False
+            relative_path = relative_path[len(self.base) + 1:]
+
+        if self.basename_only:
+            relative_path = relative_path.rsplit('/', 1)[-1]
+        return self.regex.fullmatch(relative_path) is not None
+
+    def __repr__(self) -> str:
+        prefix = '!' if self.negated else ''
+        suffix = '/' if self.dir_only else ''
+        return f"IgnoreRule({prefix}{self.pattern}{suffix} @ {self.base or '.'})"
+
+
+def _translate(pattern: str) -> str:
+    """将 gitignore 通配符模式转换为正则表达式"""
+    parts: List[str] = []
+    i, n = 0, len(pattern)
+    while i < n:
+        c = pattern[i]
+        if c == '*':
+            if pattern.startswith('**', i) and (i == 0 or pattern[i - 1] == '/'):
+                end = i + 2
+                if end == n:
+                    # 结尾的 **：匹配其下的所有内容
+                    parts.append('.*')
+                    i = end
+                    continue
+                if pattern[end] == '/':
+                    # **/：匹配零个或多个目录
+                    parts.append('(?:.*/)?')
+                    i = end + 1
+                    continue
+            while i < n and pattern[i] == '*':
+                i += 1
+            parts.append('[^/]*')
+            continue
+        if c == '?':
+            parts.append('[^/]')
+        elif c == '[':
+            start = i + 1
+            if start < n and pattern[start] in '!^':
+                start += 1
+            if start < n and pattern[start] == ']':
+                start += 1
+            end = pattern.find(']', start)
+            if end < 0:
+                parts.append(re.escape(c))
+            else:
+                content = pattern[i + 1:end].replace('\\', '\\\\')
+                if content.startswith('!'):
+                    content = '^' + content[1:]
+                parts.append(f"[{content}]")
+                i = end
+        elif c == '\\' and i + 1 < n:
+            i += 1
+            parts.append(re.escape(pattern[i]))
+        else:
+            parts.append(re.escape(c))
+        i += 1
+    return ''.join(parts)
+
+
+def parse_ignore_lines(lines: Iterable[str], base: str = '') -> List[IgnoreRule]:
+    """
+    解析忽略文件的内容
+
+    Args:
+        lines: 忽略文件的各行
+        base: 忽略文件所在目录（相对于根目录）
+
+    Returns:
+        忽略规则列表
+    """
+    rules: List[IgnoreRule] = []
+    for line in lines:
+        line = line.rstrip('\r\n')
+        if not line or line.startswith('#'):
+            continue
+
+        # 去掉未转义的结尾空格
+        while line.endswith(' ') and not line.endswith('\\ '):
+            line = line[:-1]
+        if not line:
+            continue
+
+        negated = False
+        if line.startswith('!'):
+            negated = True
+            line = line[1:]
+        elif line.startswith(('\\!', '\\#')):
+            line = line[1:]
+
+        dir_only = line.endswith('/')
+        line = line.rstrip('/')
+        if not line:
+            continue
+
+        # 含有 / 的模式相对于忽略文件所在目录，否则匹配任意层级的文件名
+        basename_only = '/' not in line
+        line = line.lstrip('/')
+
+        try:
+            rules.append(IgnoreRule(line, base, negated, dir_only, basename_only))
+        except re.error as e:
+            logger.warning(f"忽略规则无效 '{line}': {e}")
+    return rules
+
+
+class IgnoreMatcher:
+    """忽略规则匹配器"""
+
+    def __init__(self, root: Path, use_defaults: bool = True):
+        """
+        初始化忽略规则匹配器
+
+        Args:
+            root: 根目录，路径都相对于该目录
+            use_defaults: 是否启用默认忽略规则
+        """
+        self.root = Path(root)
+        self.use_defaults = use_defaults
+        self._lock = threading.RLock()
+
+        self._default_rules: Tuple[IgnoreRule, ...] = tuple(
+            parse_ignore_lines(DEFAULT_IGNORE_PATTERNS) if use_defaults else ()
+        )
+        self._rules_by_directory: Dict[str, Tuple[IgnoreRule, ...]] = {}
+        self._ignored_directories: Dict[str, bool] = {}
+
+        # 统计信息
+        self.reloads = 0
+
+    def reload(self) -> None:
+        """丢弃缓存的规则，下次匹配时重新读取忽略文件"""
+        with self._lock:
+            self._rules_by_directory.clear()
+            self._ignored_directories.clear()
+            self.reloads += 1
+        logger.info("忽略规则已重新加载")
+
+    def is_ignored(self, relative_path: str, is_dir: bool = False) -> bool:
+        """
+        判断路径是否被忽略，上级目录被忽略时其中的所有路径都被忽略
+
+        Args:
+            relative_path: 相对于根目录的路径
+            is_dir: 路径是否是目录
+
+        Returns:
+            是否被忽略
+        """
+        relative_path = self._normalize(relative_path)
+        if not relative_path:
+            return False
+
+        parent = relative_path.rpartition('/')[0]
+        if parent and self._is_directory_ignored(parent):
+            return True
+        if is_dir:
+            return self._is_directory_ignored(relative_path)
+        return self.is_ignored_entry(relative_path, is_dir=False)
+
+    def is_ignored_entry(self, relative_path: str, is_dir: bool) -> bool:
+        """
+        判断路径本身是否被忽略，不检查上级目录
+
+        供已经剪除了被忽略目录的遍历使用。
+
+        Args:
+            relative_path: 相对于根目录的路径
+            is_dir: 路径是否是目录
+
+        Returns:
+            是否被忽略
+        """
+        relative_path = self._normalize(relative_path)
+        rules = self._rules_for(relative_path.rpartition('/')[0])
+        for rule in reversed(rules):
+            if rule.matches(relative_path, is_dir):
+                return not rule.negated
+        return False
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        获取匹配器统计信息
+
+        Returns:
+            统计信息字典
+        """
+        with self._lock:
+            return {
+                "directories_cached": len(self._rules_by_directory),
+                "ignored_directories": sum(1 for ignored in self._ignored_directories.values() if ignored),
+                "reloads": self.reloads,
+            }
+
+    def _is_directory_ignored(self, directory: str) -> bool:
+        """判断目录（含上级目录）是否被忽略，结果按目录缓存"""
+        with self._lock:
+            cached = self._ignored_directories.get(directory)
+        if cached is not None:
+            return cached
+
+        parent = directory.rpartition('/')[0]
+        ignored = (parent and self._is_directory_ignored(parent)) or self.is_ignored_entry(directory, is_dir=True)
+
+        with self._lock:
+            self._ignored_directories[directory] = bool(ignored)
+        return bool(ignored)
+
+    def _rules_for(self, directory: str) -> Tuple[IgnoreRule, ...]:
+        """目录中的路径适用的规则：上级目录的规则加上本目录忽略文件中的规则"""
+        with self._lock:
+            rules = self._rules_by_directory.get(directory)
+        if rules is not None:
+            return rules
+
+        if directory:
+            inherited = self._rules_for(directory.rpartition('/')[0])
+        else:
+            inherited = self._default_rules
+        rules = inherited + tuple(self._read_directory_rules(directory))
+
+        with self._lock:
+            self._rules_by_directory[directory] = rules
+        return rules
+
+    def _read_directory_rules(self, directory: str) -> List[IgnoreRule]:
+        """读取目录中的忽略文件"""
+        rules: List[IgnoreRule] = []
+        for name in IGNORE_FILE_NAMES:
+            path = self.root / directory / name if directory else self.root / name
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    rules.extend(parse_ignore_lines(f, directory))
+            except FileNotFoundError:
+                continue
+            except (OSError, UnicodeDecodeError) as e:
+                logger.warning(f"无法读取忽略文件 {path}: {e}")
+        return rules
+
+    @staticmethod
+    def _normalize(relative_path: str) -> str:
+        """统一为以 / 分隔、不带首尾 / 的相对路径"""
+        if os.sep != '/':
+            relative_path = relative_path.replace(os.sep, '/')
+        return relative_path.strip('/')
@@ -7,7 +7,8 @@ Spec 文件发现器
 import logging
 from pathlib import Path
 from typing import List, Iterator
-from glob import glob
+
+from .file_walker import FileWalker, FILE_KIND_SPEC
 
 logger = logging.getLogger(__name__)
 
@@ -31,13 +32,7 @@ class SpecDiscoverer:
         Returns:
             spec 文件路径列表
         """
-        spec_files = []
-
-        # 使用 glob 模式匹配所有 spec_*.yaml 文件
-        pattern = str(self.project_root / "**" / "spec_*.yaml")
-
-        for file_path in glob(pattern, recursive=True):
-            spec_files.append(Path(file_path))
+        spec_files = list(self.discover_spec_files_iter())
 
         logger.info(f"发现 {len(spec_files)} 个 spec 文件")
         return spec_files
@@ -49,10 +44,9 @@ class SpecDiscoverer:
         Yields:
             spec 文件路径
         """
-        pattern = str(self.project_root / "**" / "spec_*.yaml")
-
-        for file_path in glob(pattern, recursive=True):
-            yield Path(file_path)
+        walker = FileWalker(self.project_root, kinds=(FILE_KIND_SPEC,))
+        for walked in walker.walk():
+            yield walked.path
 
     def get_spec_file_count(self) -> int:
         """
@@ -61,5 +55,4 @@ class SpecDiscoverer:
         Returns:
             spec 文件数量
         """
-        pattern = str(self.project_root / "**" / "spec_*.yaml")
-        return len(glob(pattern, recursive=True))
\ No newline at end of file
+        return sum(1 for _ in self.discover_spec_files_iter())
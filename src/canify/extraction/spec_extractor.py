@@ -52,12 +52,31 @@ class SpecExtractor:
         Args:
             file_path: spec 文件路径
 
+        Returns:
+            SpecificationRule 对象列表
+        """
+        try:
+            content = Path(file_path).read_text(encoding='utf-8')
+        except Exception as e:
+            logger.error(f"读取 spec 文件 {file_path} 失败: {e}")
+            return []
+
+        return self.extract_specs_from_content(content, file_path)
+
+    def extract_specs_from_content(self, content: str, file_path: Path) -> List[SpecificationRule]:
+        """
+        从已读取的文件内容中提取 spec 规则
+
+        Args:
+            content: spec 文件内容
+            file_path: spec 文件路径
+
         Returns:
             SpecificationRule 对象列表
         """
         try:
             # 解析文件
-            raw_rules = self.parser.parse_file(file_path)
+            raw_rules = self.parser.parse(content, file_path)
 
             # 转换为 SpecificationRule 对象
             specs = []
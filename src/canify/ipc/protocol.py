@@ -93,6 +93,10 @@ class RPCMethods:
     LINT = "lint"
     VERIFY = "verify"
 
+    # 查询相关
+    IMPACT_ANALYSIS = "impact_analysis"
+    SEARCH_ENTITIES = "search_entities"
+
 
 class ErrorCodes:
     """错误码定义"""
@@ -23,6 +23,10 @@ class EntityReference(BaseModel):
         ...,
         description="被引用的目标实体ID"
     )
+    target_entity_type: Optional[str] = Field(
+        None,
+        description="写入符号表时解析出的目标实体类型，目标不存在或引用未经解析时为None"
+    )
     context_text: str = Field(..., description="引用上下文文本")
     reference_type: str = Field(
         default="link",
@@ -8,6 +8,7 @@ import logging
 from pathlib import Path
 from typing import Dict, List, Any, Optional
 
+from ..discovery.file_walker import FileWalker, FILE_KIND_MARKDOWN, FILE_KIND_PYTHON, FILE_KIND_SPEC
 from .entity_declaration_parser import EntityDeclarationParser
 from .entity_reference_parser import EntityReferenceParser
 from .entity_schema_parser import EntitySchemaParser
@@ -155,19 +156,10 @@ class SymbolExtractor:
         Returns:
             相关文件路径列表
         """
-        files = []
-
-        # 查找 Markdown 文件
-        files.extend(directory_path.rglob("*.md"))
-
-        # 查找 Python 文件
-        files.extend(directory_path.rglob("*.py"))
-
-        # 查找规范文件
-        files.extend(directory_path.rglob("spec_*.yaml"))
-        files.extend(directory_path.rglob("spec_*.yml"))
-
-        return files
+        walker = FileWalker(
+            directory_path, kinds=(FILE_KIND_MARKDOWN, FILE_KIND_PYTHON, FILE_KIND_SPEC)
+        )
+        return walker.files()
 
     def _calculate_statistics(self, symbols: Dict[str, Any]) -> Dict[str, int]:
         """
@@ -7,5 +7,6 @@ Canify 存储模块
 from .database import DatabaseManager
 from .symbol_table import SymbolTableManager
 from .spec_storage import SpecStorageManager
+from .blob_store import BlobStore
 
-__all__ = ["DatabaseManager", "SymbolTableManager", "SpecStorageManager"]
\ No newline at end of file
+__all__ = ["DatabaseManager", "SymbolTableManager", "SpecStorageManager", "BlobStore"]
\ No newline at end of file
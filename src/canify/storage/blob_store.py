@@ -0,0 +1,297 @@
+"""
+文件符号存储
+
+按内容哈希保存文件的解析结果（声明、引用、模式和 spec 规则），并记录每个分支中
+文件路径对应的内容。切换分支后文件内容变回某个已保存的版本时，直接恢复当时的
+解析结果，不必重新解析。
+
+声明和引用行中含有文件位置，同样的内容出现在不同路径时解析结果不同，
+因此存储键同时包含文件路径和内容哈希。既不被当前文件也不被任何分支引用的
+解析结果由 gc 清理。
+
+解析结果以 JSON 保存（spec 规则使用 model_dump），不使用 pickle：数据库文件
+可能随项目提交到版本库，读取时不能执行其中的任何代码。格式版本不符或无法
+解码的数据视为未保存，重新解析后覆盖。
+"""
+
+import json
+import logging
+import zlib
+from typing import Any, Dict, Iterable, List, Optional
+
+from ..models import SpecificationRule
+from .database import DatabaseManager
+from .file_symbols import FileSymbols, pack_text, unpack_text
+
+logger = logging.getLogger(__name__)
+
+# 保存格式的版本，格式变化时递增，旧版本的数据视为未保存
+PAYLOAD_VERSION = 1
+
+
+class BlobStore:
+    """文件符号存储管理器"""
+
+    def __init__(self, db_manager: DatabaseManager):
+        """
+        初始化文件符号存储
+
+        Args:
+            db_manager: 数据库管理器实例
+        """
+        self.db_manager = db_manager
+
+        # 统计信息
+        self.hits = 0
+        self.misses = 0
+
+    def put_many(self, project_id: int, symbols_list: Iterable[FileSymbols]) -> int:
+        """
+        保存解析成功的文件符号数据，由存储恢复或内容未变化的数据不重复写入
+
+        重新解析的内容说明已保存的数据缺失或无法解码，直接覆盖。
+
+        Args:
+            project_id: 项目ID
+            symbols_list: 文件符号数据
+
+        Returns:
+            新保存的数量
+        """
+        rows = [
+            (project_id, symbols.file_path, symbols.file_hash, _pack_symbols(symbols))
+            for symbols in symbols_list
+            if symbols.file_hash and symbols.error is None and not symbols.unchanged and not symbols.restored
+        ]
+        if not rows:
+            return 0
+
+        with self.db_manager.transaction() as conn:
+            cursor = conn.executemany(
+                """
+                INSERT OR REPLACE INTO symbol_blobs (project_id, file_path, blob_id, payload)
+                VALUES (?, ?, ?, ?)
+                """,
+                rows
+            )
+        return cursor.rowcount
+
+    def load(self, project_id: int, file_path: str, blob_id: str) -> Optional[FileSymbols]:
+        """
+        恢复保存的文件符号数据
+
+        Args:
+            project_id: 项目ID
+            file_path: 文件路径（相对于项目根目录）
+            blob_id: 文件内容哈希
+
+        Returns:
+            文件符号数据（不含文件系统状态），未保存时返回None
+        """
+        conn = self.db_manager.connect()
+        row = conn.execute(
+            "SELECT payload FROM symbol_blobs WHERE project_id = ? AND file_path = ? AND blob_id = ?",
+            (project_id, file_path, blob_id)
+        ).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+
+        symbols = _unpack_symbols(file_path, blob_id, row["payload"])
+        if symbols is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        return symbols
+
+    def has_blobs(self, project_id: int) -> bool:
+        """
+        检查项目是否保存过解析结果
+
+        Args:
+            project_id: 项目ID
+
+        Returns:
+            是否有保存的解析结果
+        """
+        conn = self.db_manager.connect()
+        return conn.execute("SELECT 1 FROM symbol_blobs WHERE project_id = ? LIMIT 1", (project_id,)).fetchone() is not None
+
+    def record_branch(self, project_id: int, branch: str, file_paths: Optional[Iterable[str]] = None) -> int:
+        """
+        将当前已解析文件的内容哈希记录为分支的文件映射
+
+        Args:
+            project_id: 项目ID
+            branch: 分支名
+            file_paths: 只刷新这些文件的映射，None 表示替换该分支的全部映射
+
+        Returns:
+            记录的文件数
+        """
+        path_filter = ""
+        params: List[str] = []
+        if file_paths is not None:
+            path_filter = " AND file_path IN (SELECT value FROM json_each(?))"
+            params = [json.dumps(sorted(set(file_paths)))]
+
+        with self.db_manager.transaction() as conn:
+            conn.execute(
+                f"DELETE FROM branch_files WHERE project_id = ? AND branch = ?{path_filter}",
+                (project_id, branch, *params)
+            )
+            cursor = conn.execute(
+                f"""
+                INSERT INTO branch_files (project_id, branch, file_path, blob_id)
+                SELECT project_id, ?, file_path, file_hash
+                FROM files
+                WHERE project_id = ? AND status = 'parsed' AND file_hash != ''{path_filter}
+                """,
+                (branch, project_id, *params)
+            )
+        logger.debug(f"已记录分支文件映射: {branch}, {cursor.rowcount} 个文件")
+        return cursor.rowcount
+
+    def get_branch_files(self, project_id: int, branch: str) -> Dict[str, str]:
+        """
+        获取分支的文件映射
+
+        Args:
+            project_id: 项目ID
+            branch: 分支名
+
+        Returns:
+            文件路径到内容哈希的映射
+        """
+        conn = self.db_manager.connect()
+        cursor = conn.execute(
+            "SELECT file_path, blob_id FROM branch_files WHERE project_id = ? AND branch = ?",
+            (project_id, branch)
+        )
+        return {row["file_path"]: row["blob_id"] for row in cursor}
+
+    def list_branches(self, project_id: int) -> List[str]:
+        """
+        列出记录了文件映射的分支
+
+        Args:
+            project_id: 项目ID
+
+        Returns:
+            分支名列表
+        """
+        conn = self.db_manager.connect()
+        cursor = conn.execute(
+            "SELECT DISTINCT branch FROM branch_files WHERE project_id = ? ORDER BY branch",
+            (project_id,)
+        )
+        return [row["branch"] for row in cursor]
+
+    def forget_branch(self, project_id: int, branch: str) -> None:
+        """
+        删除分支的文件映射，其独有的解析结果在下次 gc 时清理
+
+        Args:
+            project_id: 项目ID
+            branch: 分支名
+        """
+        with self.db_manager.transaction() as conn:
+            conn.execute("DELETE FROM branch_files WHERE project_id = ? AND branch = ?", (project_id, branch))
+
+    def gc(self, project_id: int) -> int:
+        """
+        删除既不被当前文件也不被任何分支引用的解析结果
+
+        Args:
+            project_id: 项目ID
+
+        Returns:
+            删除的数量
+        """
+        with self.db_manager.transaction() as conn:
+            cursor = conn.execute(
+                """
+                DELETE FROM symbol_blobs
+                WHERE project_id = ?
+                  AND NOT EXISTS (
+                      SELECT 1 FROM files f
+                      WHERE f.project_id = symbol_blobs.project_id
+                        AND f.file_path = symbol_blobs.file_path
+                        AND f.file_hash = symbol_blobs.blob_id
+                  )
+                  AND NOT EXISTS (
+                      SELECT 1 FROM branch_files bf
+                      WHERE bf.project_id = symbol_blobs.project_id
+                        AND bf.file_path = symbol_blobs.file_path
+                        AND bf.blob_id = symbol_blobs.blob_id
+                  )
+                """,
+                (project_id,)
+            )
+        if cursor.rowcount:
+            logger.info(f"已清理未被引用的文件符号: {cursor.rowcount} 个")
+        return cursor.rowcount
+
+    def get_stats(self, project_id: int) -> Dict[str, Any]:
+        """
+        获取文件符号存储统计信息
+
+        Args:
+            project_id: 项目ID
+
+        Returns:
+            统计信息字典
+        """
+        conn = self.db_manager.connect()
+        blobs, payload_bytes = conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(LENGTH(payload)), 0) FROM symbol_blobs WHERE project_id = ?",
+            (project_id,)
+        ).fetchone()
+        return {
+            "blobs": blobs,
+            "payload_bytes": payload_bytes,
+            "branches": self.list_branches(project_id),
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+def _pack_symbols(symbols: FileSymbols) -> bytes:
+    """将文件符号数据编码为压缩的 JSON，文件系统状态不保存"""
+    data = {
+        "version": PAYLOAD_VERSION,
+        "kind": symbols.kind,
+        "declarations": [
+            [*row[:3], unpack_text(row[3]), unpack_text(row[4]), *row[5:]]
+            for row in symbols.declarations
+        ],
+        "references": [[*row[:2], unpack_text(row[2]), *row[3:]] for row in symbols.references],
+        "schemas": [list(row) for row in symbols.schemas],
+        "specs": [spec.model_dump() for spec in symbols.specs],
+    }
+    return zlib.compress(json.dumps(data, ensure_ascii=False).encode("utf-8"))
+
+
+def _unpack_symbols(file_path: str, blob_id: str, payload: bytes) -> Optional[FileSymbols]:
+    """还原 _pack_symbols 保存的文件符号数据，格式版本不符或无法解码时返回None"""
+    try:
+        data = json.loads(zlib.decompress(payload).decode("utf-8"))
+        if data.get("version") != PAYLOAD_VERSION:
+            return None
+        return FileSymbols(
+            file_path=file_path,
+            kind=data["kind"],
+            declarations=[
+                (*row[:3], pack_text(row[3]), pack_text(row[4]), *row[5:])
+                for row in data["declarations"]
+            ],
+            references=[(*row[:2], pack_text(row[2]), *row[3:]) for row in data["references"]],
+            schemas=[tuple(row) for row in data["schemas"]],
+            specs=[SpecificationRule.model_validate(spec) for spec in data["specs"]],
+            file_hash=blob_id,
+            restored=True,
+        )
+    except (zlib.error, ValueError, KeyError, TypeError, AttributeError) as e:
+        logger.debug(f"无法解码保存的文件符号 {file_path}@{blob_id[:12]}: {e}")
+        return None
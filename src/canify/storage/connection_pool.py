@@ -0,0 +1,178 @@
+"""
+只读连接池
+
+为短生命周期的线程（例如每个 IPC 请求一个的处理线程）提供有界的只读连接。
+连接按需创建，数量不超过池大小，用完后归还而不是关闭，因此不会随请求数量
+反复打开连接、执行 PRAGMA，也不会遗留未关闭的文件描述符。
+连接长期存活，sqlite3 模块按连接缓存的预编译语句在请求之间得以复用。
+
+写操作仍然使用各线程自己的连接（见 DatabaseManager.transaction）。
+"""
+
+import logging
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, List
+
+logger = logging.getLogger(__name__)
+
+# 默认池大小
+DEFAULT_POOL_SIZE = 4
+
+# 每个连接缓存的预编译语句数量
+STATEMENT_CACHE_SIZE = 256
+
+
+class ConnectionPool:
+    """只读连接池"""
+
+    def __init__(self, db_path: Path, size: int = DEFAULT_POOL_SIZE, timeout: float = 30.0):
+        """
+        初始化连接池
+
+        Args:
+            db_path: 数据库文件路径
+            size: 最多同时打开的连接数
+            timeout: 借出连接时最多等待多久（秒）
+        """
+        self.db_path = db_path
+        self.size = max(1, size)
+        self.timeout = timeout
+
+        self._condition = threading.Condition()
+        self._idle: List[sqlite3.Connection] = []
+        self._open = 0
+        self._in_use = 0
+        self._closed = False
+
+        # 统计信息
+        self.checkouts = 0
+        self.waits = 0
+        self.max_in_use = 0
+
+    def checkout(self) -> sqlite3.Connection:
+        """
+        借出一个只读连接，池中连接都在使用且已达上限时等待归还
+
+        Returns:
+            SQLite连接对象
+
+        Raises:
+            TimeoutError: 等待超时
+            sqlite3.ProgrammingError: 连接池已关闭
+        """
+        deadline = time.monotonic() + self.timeout
+        with self._condition:
+            waited = False
+            while True:
+                # 关闭后不再打开新连接，否则没有人会关闭它
+                if self._closed:
+                    raise sqlite3.ProgrammingError("连接池已关闭")
+                if self._idle or self._open < self.size:
+                    break
+                if not waited:
+                    self.waits += 1
+                    waited = True
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise TimeoutError(f"等待数据库连接超时: {self.size} 个连接都在使用")
+                self._condition.wait(remaining)
+
+            if self._idle:
+                conn = self._idle.pop()
+            else:
+                # 先占位再在锁外打开连接
+                self._open += 1
+                conn = None
+
+            self._in_use += 1
+            self.checkouts += 1
+            self.max_in_use = max(self.max_in_use, self._in_use)
+
+        if conn is None:
+            try:
+                conn = self._create_connection()
+            except BaseException:
+                with self._condition:
+                    self._open -= 1
+                    self._in_use -= 1
+                    self._condition.notify()
+                raise
+        return conn
+
+    def checkin(self, conn: sqlite3.Connection) -> None:
+        """
+        归还连接
+
+        Args:
+            conn: checkout 借出的连接
+        """
+        if conn.in_transaction:
+            conn.rollback()
+
+        with self._condition:
+            self._in_use -= 1
+            if self._closed:
+                self._open -= 1
+                conn.close()
+            else:
+                self._idle.append(conn)
+            self._condition.notify()
+
+    @contextmanager
+    def connection(self) -> Iterator[sqlite3.Connection]:
+        """
+        借出连接，退出时自动归还
+
+        Yields:
+            SQLite连接对象
+        """
+        conn = self.checkout()
+        try:
+            yield conn
+        finally:
+            self.checkin(conn)
+
+    def close(self) -> None:
+        """关闭所有空闲连接，使用中的连接在归还时关闭"""
+        with self._condition:
+            self._closed = True
+            for conn in self._idle:
+                conn.close()
+            self._open -= len(self._idle)
+            self._idle.clear()
+            self._condition.notify_all()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        获取连接池统计信息
+
+        Returns:
+            统计信息字典
+        """
+        with self._condition:
+            return {
+                "size": self.size,
+                "open": self._open,
+                "in_use": self._in_use,
+                "idle": len(self._idle),
+                "max_in_use": self.max_in_use,
+                "checkouts": self.checkouts,
+                "waits": self.waits,
+            }
+
+    def _create_connection(self) -> sqlite3.Connection:
+        """打开只读连接，WAL 模式记录在数据库文件中，无需再次设置"""
+        conn = sqlite3.connect(
+            f"{self.db_path.resolve().as_uri()}?mode=ro",
+            uri=True,
+            check_same_thread=False,
+            cached_statements=STATEMENT_CACHE_SIZE,
+            isolation_level=None  # 自动提交：不隐式开启事务，每条查询都读取最新提交的数据
+        )
+        conn.row_factory = sqlite3.Row
+        logger.debug(f"连接池打开只读连接: {self.db_path}")
+        return conn
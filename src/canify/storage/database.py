@@ -4,24 +4,38 @@ Canify 数据库管理模块
 负责SQLite数据库的初始化、连接管理和模式创建。
 """
 
+import json
 import sqlite3
 import logging
 import threading
+from contextlib import contextmanager
+from datetime import datetime
 from pathlib import Path
-from typing import Optional
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from .connection_pool import DEFAULT_POOL_SIZE, ConnectionPool
+from .file_symbols import search_text
 
 logger = logging.getLogger(__name__)
 
+# PRAGMA auto_vacuum 的取值
+AUTO_VACUUM_MODES = {0: "none", 1: "full", 2: "incremental"}
+AUTO_VACUUM_INCREMENTAL = 2
+
+# WAL 检查点模式
+CHECKPOINT_MODES = ("PASSIVE", "FULL", "RESTART", "TRUNCATE")
+
 
 class DatabaseManager:
     """数据库管理器"""
 
-    def __init__(self, db_path: Optional[Path] = None):
+    def __init__(self, db_path: Optional[Path] = None, pool_size: int = DEFAULT_POOL_SIZE):
         """
         初始化数据库管理器
 
         Args:
             db_path: 数据库文件路径，如果为None则使用默认路径
+            pool_size: 只读连接池大小，见 reader
         """
         if db_path is None:
             # 默认数据库路径：用户主目录下的 .canify/canify.db
@@ -36,14 +50,29 @@ class DatabaseManager:
         # 使用线程本地存储，每个线程有自己的连接
         self._local = threading.local()
 
+        # 短生命周期线程的只读连接池
+        self.pool = ConnectionPool(self.db_path, pool_size)
+
+        # 写入代数：每个最外层事务结束（提交或回滚）时递增，派生数据的缓存据此失效
+        self._generation_lock = threading.Lock()
+        self.write_generation = 0
+
     def connect(self) -> sqlite3.Connection:
         """
         连接到数据库，如果不存在则创建
-        使用线程本地存储，确保每个线程有自己的连接
+        使用线程本地存储，确保每个线程有自己的连接；
+        当前线程在 reader 范围内且不在事务中时返回借出的只读连接
 
         Returns:
             SQLite连接对象
         """
+        reader = getattr(self._local, 'reader', None)
+        if reader is not None and getattr(self._local, 'transaction_depth', 0) == 0:
+            return reader
+        return self._thread_connection()
+
+    def _thread_connection(self) -> sqlite3.Connection:
+        """获取当前线程自己的读写连接，不存在时创建"""
         if not hasattr(self._local, 'connection') or self._local.connection is None:
             self._local.connection = sqlite3.connect(self.db_path)
             self._local.connection.row_factory = sqlite3.Row
@@ -51,6 +80,9 @@ class DatabaseManager:
             # 启用外键约束
             self._local.connection.execute("PRAGMA foreign_keys = ON")
 
+            # 新数据库启用增量整理模式，必须在切换到 WAL 模式之前设置（已有数据库见 enable_incremental_vacuum）
+            self._local.connection.execute("PRAGMA auto_vacuum = INCREMENTAL")
+
             # 启用WAL模式提高并发性能
             self._local.connection.execute("PRAGMA journal_mode = WAL")
 
@@ -58,9 +90,162 @@ class DatabaseManager:
 
         return self._local.connection
 
+    @contextmanager
+    def reader(self) -> Iterator[sqlite3.Connection]:
+        """
+        在当前线程上使用连接池中的只读连接
+
+        范围内的读操作（connect）使用借出的连接，退出时归还；写事务仍使用线程自己的连接，
+        如果是在范围内才打开的，退出时一并关闭，短生命周期的线程因此不会遗留连接。
+        嵌套调用复用外层借出的连接。
+
+        Yields:
+            SQLite连接对象
+        """
+        if getattr(self._local, 'reader', None) is not None:
+            yield self._local.reader
+            return
+
+        had_connection = getattr(self._local, 'connection', None) is not None
+        conn = self.pool.checkout()
+        self._local.reader = conn
+        try:
+            yield conn
+        finally:
+            self._local.reader = None
+            self.pool.checkin(conn)
+            if not had_connection:
+                self.close()
+
+    @contextmanager
+    def transaction(self) -> Iterator[sqlite3.Connection]:
+        """
+        在当前线程的连接上开启事务，支持嵌套
+
+        最外层使用 BEGIN/COMMIT；嵌套调用使用 SAVEPOINT，
+        内层失败只回滚到自己的保存点，多个写操作因此可以合并为一次提交。
+        回滚时丢弃该层注册的提交回调，最外层提交后按注册顺序执行提交回调（见 on_commit）。
+
+        Yields:
+            SQLite连接对象
+        """
+        conn = self._thread_connection()
+        depth = getattr(self._local, 'transaction_depth', 0)
+        savepoint = f"canify_sp_{depth}"
+
+        if depth == 0:
+            self._local.commit_log = []
+            if not conn.in_transaction:
+                conn.execute("BEGIN")
+        else:
+            conn.execute(f"SAVEPOINT {savepoint}")
+        commit_mark = len(self._local.commit_log)
+        self._local.transaction_depth = depth + 1
+
+        try:
+            yield conn
+        except BaseException:
+            self._local.transaction_depth = depth
+            if depth == 0:
+                conn.rollback()
+            else:
+                conn.execute(f"ROLLBACK TO {savepoint}")
+                conn.execute(f"RELEASE {savepoint}")
+            del self._local.commit_log[commit_mark:]
+            if depth == 0:
+                # 事务期间内存中的派生数据可能已被读取
+                self._bump_generation()
+            raise
+        else:
+            self._local.transaction_depth = depth
+            if depth == 0:
+                conn.commit()
+                self._run_commit_callbacks()
+                self._bump_generation()
+            else:
+                conn.execute(f"RELEASE {savepoint}")
+
+    def on_commit(self, callback: Callable[[], None]) -> None:
+        """
+        注册提交回调，当前线程的最外层事务提交后执行
+
+        用于让内存中的派生数据只反映已提交的数据：其他线程的读操作不会看到
+        尚未提交、之后可能回滚的写入。所在保存点或事务回滚时回调被丢弃。
+        不在事务中时写操作已经提交，回调立即执行。
+
+        Args:
+            callback: 提交回调
+        """
+        if getattr(self._local, 'transaction_depth', 0) > 0:
+            self._local.commit_log.append(callback)
+        else:
+            callback()
+
+    def in_transaction(self) -> bool:
+        """
+        当前线程是否在事务中
+
+        Returns:
+            是否在事务中
+        """
+        return getattr(self._local, 'transaction_depth', 0) > 0
+
+    def _run_commit_callbacks(self) -> None:
+        """按注册顺序执行提交回调"""
+        commit_log, self._local.commit_log = self._local.commit_log, []
+        for callback in commit_log:
+            try:
+                callback()
+            except Exception as e:
+                logger.error(f"执行提交回调失败: {e}")
+
+    def _bump_generation(self) -> None:
+        """递增写入代数"""
+        with self._generation_lock:
+            self.write_generation += 1
+
+    def get_or_create_file_ids(
+        self,
+        conn: sqlite3.Connection,
+        project_id: int,
+        file_paths: List[str]
+    ) -> Dict[str, int]:
+        """
+        批量获取文件记录ID，不存在的文件记录一并创建
+
+        路径列表以一个 JSON 参数传入，不受 SQLite 参数个数上限的限制。
+
+        Args:
+            conn: 数据库连接
+            project_id: 项目ID
+            file_paths: 文件路径列表
+
+        Returns:
+            文件路径到文件ID的映射
+        """
+        if not file_paths:
+            return {}
+
+        payload = json.dumps(file_paths, ensure_ascii=False)
+        conn.execute(
+            """
+            INSERT OR IGNORE INTO files (project_id, file_path, file_hash, last_modified, status)
+            SELECT ?, value, '', ?, 'parsing' FROM json_each(?)
+            """,
+            (project_id, datetime.now().isoformat(), payload)
+        )
+        cursor = conn.execute(
+            """
+            SELECT id, file_path FROM files
+            WHERE project_id = ? AND file_path IN (SELECT value FROM json_each(?))
+            """,
+            (project_id, payload)
+        )
+        return {row["file_path"]: row["id"] for row in cursor}
+
     def initialize_schema(self) -> None:
         """初始化数据库模式"""
-        conn = self.connect()
+        conn = self._thread_connection()
 
         try:
             # 创建项目元数据表
@@ -81,6 +266,8 @@ class DatabaseManager:
                     file_path TEXT NOT NULL,
                     file_hash TEXT NOT NULL,
                     last_modified TIMESTAMP NOT NULL,
+                    mtime_ns INTEGER,
+                    file_size INTEGER,
                     parsed_at TIMESTAMP,
                     status TEXT NOT NULL DEFAULT 'pending',
                     error_message TEXT,
@@ -122,6 +309,8 @@ class DatabaseManager:
                     location_file TEXT NOT NULL,
                     location_line INTEGER NOT NULL,
                     location_column INTEGER NOT NULL,
+                    target_declaration_id INTEGER, -- 写入时解析的目标声明，悬空引用为 NULL
+                    target_entity_type TEXT,
                     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                     FOREIGN KEY (project_id) REFERENCES projects(id) ON DELETE CASCADE,
                     FOREIGN KEY (file_id) REFERENCES files(id) ON DELETE CASCADE
@@ -186,9 +375,65 @@ class DatabaseManager:
                 )
             """)
 
+            # 创建 spec 规则标签表，每个规则的每个标签一行，随规则级联删除
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS spec_rule_tags (
+                    spec_id INTEGER NOT NULL,
+                    project_id INTEGER NOT NULL,
+                    rule_id TEXT NOT NULL,
+                    tag TEXT NOT NULL,
+                    FOREIGN KEY (spec_id) REFERENCES spec_rules(id) ON DELETE CASCADE,
+                    PRIMARY KEY (spec_id, tag)
+                )
+            """)
+
+            # 创建文件符号存储表，按内容哈希保存文件的解析结果，切换分支时无需重新解析
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS symbol_blobs (
+                    project_id INTEGER NOT NULL,
+                    file_path TEXT NOT NULL,
+                    blob_id TEXT NOT NULL, -- 文件内容哈希
+                    payload BLOB NOT NULL, -- 压缩后的文件符号数据
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    FOREIGN KEY (project_id) REFERENCES projects(id) ON DELETE CASCADE,
+                    PRIMARY KEY (project_id, file_path, blob_id)
+                )
+            """)
+
+            # 创建分支文件表，记录每个分支中文件路径对应的内容哈希
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS branch_files (
+                    project_id INTEGER NOT NULL,
+                    branch TEXT NOT NULL,
+                    file_path TEXT NOT NULL,
+                    blob_id TEXT NOT NULL,
+                    FOREIGN KEY (project_id) REFERENCES projects(id) ON DELETE CASCADE,
+                    PRIMARY KEY (project_id, branch, file_path)
+                )
+            """)
+
+            # 创建实体全文搜索表，rowid 与 entity_declarations.id 一致；
+            # trigram 分词支持任意子串匹配
+            conn.execute("""
+                CREATE VIRTUAL TABLE IF NOT EXISTS entity_search USING fts5(
+                    project_id UNINDEXED,
+                    entity_id,
+                    entity_type UNINDEXED,
+                    name,
+                    field_values, -- 原始数据中所有字段值拼接成的文本
+                    tokenize = 'trigram'
+                )
+            """)
+
+            # 升级旧版本数据库
+            self._migrate_schema(conn)
+
             # 创建索引
             self._create_indexes(conn)
 
+            # 创建维护引用解析结果和搜索索引的触发器
+            self._create_triggers(conn)
+
             conn.commit()
             logger.info("数据库模式初始化完成")
 
@@ -197,6 +442,100 @@ class DatabaseManager:
             logger.error(f"数据库模式初始化失败: {e}")
             raise
 
+    def _migrate_schema(self, conn: sqlite3.Connection) -> None:
+        """为旧版本数据库补充新增的列"""
+        self._ensure_column(conn, "files", "mtime_ns", "INTEGER")
+        self._ensure_column(conn, "files", "file_size", "INTEGER")
+
+        # 引用的解析结果是后来加入的，新增列时一次性解析已有引用
+        added = self._ensure_column(conn, "entity_references", "target_declaration_id", "INTEGER")
+        self._ensure_column(conn, "entity_references", "target_entity_type", "TEXT")
+        if added:
+            conn.execute("""
+                UPDATE entity_references
+                SET (target_declaration_id, target_entity_type) = (
+                    SELECT ed.id, ed.entity_type FROM entity_declarations ed
+                    WHERE ed.project_id = entity_references.project_id
+                      AND ed.entity_id = entity_references.target_entity_id
+                )
+            """)
+
+        # 标签改由 spec_rule_tags 表索引，JSON 文本列上的索引不再使用
+        conn.execute("DROP INDEX IF EXISTS idx_spec_rules_tags")
+
+        # 标签表是后来加入的，从 spec_rules.tags 回填
+        has_tags = conn.execute("SELECT 1 FROM spec_rule_tags LIMIT 1").fetchone()
+        if has_tags is None:
+            cursor = conn.execute("""
+                INSERT OR IGNORE INTO spec_rule_tags (spec_id, project_id, rule_id, tag)
+                SELECT sr.id, sr.project_id, sr.rule_id, je.value
+                FROM spec_rules sr, json_each(sr.tags) je
+                WHERE sr.tags IS NOT NULL AND json_valid(sr.tags)
+            """)
+            if cursor.rowcount > 0:
+                logger.info(f"数据库升级: 回填 {cursor.rowcount} 个 spec 规则标签")
+
+        # 全文搜索表是后来加入的，从实体声明回填
+        has_search = conn.execute("SELECT 1 FROM entity_search LIMIT 1").fetchone()
+        has_declarations = conn.execute("SELECT 1 FROM entity_declarations LIMIT 1").fetchone()
+        if has_search is None and has_declarations is not None:
+            count = self.rebuild_search_index(conn)
+            logger.info(f"数据库升级: 为 {count} 个实体建立全文搜索索引")
+
+    def rebuild_search_index(self, conn: sqlite3.Connection, project_id: Optional[int] = None) -> int:
+        """
+        由实体声明重建全文搜索索引
+
+        Args:
+            conn: 数据库连接（调用方负责事务）
+            project_id: 只重建该项目的索引，None 表示所有项目
+
+        Returns:
+            索引的实体数量
+        """
+        if project_id is None:
+            conn.execute("DELETE FROM entity_search")
+            cursor = conn.execute(
+                "SELECT id, project_id, entity_id, entity_type, name, raw_data FROM entity_declarations"
+            )
+        else:
+            conn.execute("DELETE FROM entity_search WHERE project_id = ?", (project_id,))
+            cursor = conn.execute(
+                "SELECT id, project_id, entity_id, entity_type, name, raw_data FROM entity_declarations "
+                "WHERE project_id = ?",
+                (project_id,)
+            )
+
+        rows = cursor.fetchall()
+        conn.executemany(
+            """
+            INSERT INTO entity_search (rowid, project_id, entity_id, entity_type, name, field_values)
+            VALUES (?, ?, ?, ?, ?, ?)
+            """,
+            [(*row[:5], search_text(row[5])) for row in rows]
+        )
+        return len(rows)
+
+    def _ensure_column(self, conn: sqlite3.Connection, table: str, column: str, definition: str) -> bool:
+        """
+        如果表中缺少指定列则添加
+
+        Args:
+            conn: 数据库连接
+            table: 表名
+            column: 列名
+            definition: 列定义
+
+        Returns:
+            是否新增了该列
+        """
+        columns = {row["name"] for row in conn.execute(f"PRAGMA table_info({table})")}
+        if column in columns:
+            return False
+        conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+        logger.info(f"数据库升级: {table} 表添加列 {column}")
+        return True
+
     def _create_indexes(self, conn: sqlite3.Connection) -> None:
         """创建数据库索引"""
 
@@ -218,6 +557,11 @@ class DatabaseManager:
         conn.execute("CREATE INDEX IF NOT EXISTS idx_references_source ON entity_references(source_entity_id)")
         conn.execute("CREATE INDEX IF NOT EXISTS idx_references_target ON entity_references(target_entity_id)")
         conn.execute("CREATE INDEX IF NOT EXISTS idx_references_location ON entity_references(location_file, location_line)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_references_target_declaration ON entity_references(target_declaration_id)")
+        conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_references_unresolved ON entity_references(project_id, id) "
+            "WHERE target_declaration_id IS NULL"
+        )
 
         # 依赖关系索引
         conn.execute("CREATE INDEX IF NOT EXISTS idx_dependencies_file ON symbol_dependencies(dependent_file_id)")
@@ -234,7 +578,56 @@ class DatabaseManager:
         conn.execute("CREATE INDEX IF NOT EXISTS idx_spec_rules_file ON spec_rules(file_id)")
         conn.execute("CREATE INDEX IF NOT EXISTS idx_spec_rules_id ON spec_rules(rule_id)")
         conn.execute("CREATE INDEX IF NOT EXISTS idx_spec_rules_env ON spec_rules(env)")
-        conn.execute("CREATE INDEX IF NOT EXISTS idx_spec_rules_tags ON spec_rules(tags)")
+
+        # spec 规则标签索引
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_spec_rule_tags_tag ON spec_rule_tags(project_id, tag)")
+
+    def _create_triggers(self, conn: sqlite3.Connection) -> None:
+        """
+        创建维护引用解析结果和全文搜索索引的触发器
+
+        引用写入时解析目标声明；声明写入时解析指向它的引用，删除时（包括随文件级联删除）
+        将这些引用重新标记为悬空。所有写入路径因此都无需自行维护解析结果。
+        声明删除时同时删除其搜索索引行；写入时的索引行需要解码原始数据，由写入方插入。
+        """
+        conn.execute("""
+            CREATE TRIGGER IF NOT EXISTS trg_references_resolve
+            AFTER INSERT ON entity_references
+            WHEN NEW.target_declaration_id IS NULL
+            BEGIN
+                UPDATE entity_references
+                SET (target_declaration_id, target_entity_type) = (
+                    SELECT id, entity_type FROM entity_declarations
+                    WHERE project_id = NEW.project_id AND entity_id = NEW.target_entity_id
+                )
+                WHERE id = NEW.id;
+            END
+        """)
+        conn.execute("""
+            CREATE TRIGGER IF NOT EXISTS trg_declarations_resolve
+            AFTER INSERT ON entity_declarations
+            BEGIN
+                UPDATE entity_references
+                SET target_declaration_id = NEW.id, target_entity_type = NEW.entity_type
+                WHERE project_id = NEW.project_id AND target_entity_id = NEW.entity_id;
+            END
+        """)
+        conn.execute("""
+            CREATE TRIGGER IF NOT EXISTS trg_declarations_unresolve
+            AFTER DELETE ON entity_declarations
+            BEGIN
+                UPDATE entity_references
+                SET target_declaration_id = NULL, target_entity_type = NULL
+                WHERE target_declaration_id = OLD.id;
+            END
+        """)
+        conn.execute("""
+            CREATE TRIGGER IF NOT EXISTS trg_declarations_search_delete
+            AFTER DELETE ON entity_declarations
+            BEGIN
+                DELETE FROM entity_search WHERE rowid = OLD.id;
+            END
+        """)
 
     def close(self) -> None:
         """关闭数据库连接"""
@@ -260,11 +653,100 @@ class DatabaseManager:
 
     def vacuum(self) -> None:
         """执行数据库整理，回收空间"""
-        conn = self.connect()
+        conn = self._thread_connection()
         conn.execute("VACUUM")
         conn.commit()
         logger.info("数据库整理完成")
 
+    def enable_incremental_vacuum(self) -> bool:
+        """
+        将数据库切换为增量整理模式，删除数据后的空闲页可以分步归还给文件系统
+
+        新数据库在建表前已经启用（见 connect）；已有表的旧数据库需要一次完整的 VACUUM
+        才能切换，期间数据库被锁定，因此不在打开数据库时自动执行，由 'canify db vacuum' 显式调用。
+
+        Returns:
+            是否执行了切换，已是增量整理模式时返回 False
+        """
+        conn = self._thread_connection()
+        if conn.execute("PRAGMA auto_vacuum").fetchone()[0] == AUTO_VACUUM_INCREMENTAL:
+            return False
+
+        logger.info(f"切换数据库为增量整理模式，执行一次完整整理: {self.db_path}")
+        conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        conn.commit()
+        conn.execute("VACUUM")
+        return True
+
+    def checkpoint(self, mode: str = "PASSIVE", busy_timeout: Optional[float] = None) -> Tuple[int, int, int]:
+        """
+        在当前线程的连接上执行 WAL 检查点
+
+        Args:
+            mode: 检查点模式，PASSIVE 不等待读写操作，TRUNCATE 在完成后将 WAL 文件截断为零
+            busy_timeout: 需要等待其他连接时最多等待多久（秒），None 表示使用连接的默认值
+
+        Returns:
+            (是否因其他连接未能完成, WAL 中的帧数, 已写回数据库的帧数)
+        """
+        mode = mode.upper()
+        if mode not in CHECKPOINT_MODES:
+            raise ValueError(f"未知的检查点模式: {mode}")
+
+        conn = self._thread_connection()
+        previous_timeout = None
+        if busy_timeout is not None:
+            previous_timeout = conn.execute("PRAGMA busy_timeout").fetchone()[0]
+            conn.execute(f"PRAGMA busy_timeout = {max(0, int(busy_timeout * 1000))}")
+        try:
+            busy, log_frames, checkpointed = conn.execute(f"PRAGMA wal_checkpoint({mode})").fetchone()
+        finally:
+            if previous_timeout is not None:
+                conn.execute(f"PRAGMA busy_timeout = {previous_timeout}")
+        return busy, log_frames, checkpointed
+
+    def incremental_vacuum(self, pages: int) -> int:
+        """
+        在当前线程的连接上将最多 pages 个空闲页归还给文件系统
+
+        Args:
+            pages: 本次最多回收的页数
+
+        Returns:
+            实际回收的页数
+        """
+        conn = self._thread_connection()
+        before = conn.execute("PRAGMA freelist_count").fetchone()[0]
+        if before == 0:
+            return 0
+        # 逐页回收的 PRAGMA 需要执行到结束，execute 只执行一步，executescript 会执行完整
+        conn.executescript(f"PRAGMA incremental_vacuum({int(pages)});")
+        return before - conn.execute("PRAGMA freelist_count").fetchone()[0]
+
+    def get_file_stats(self) -> Dict[str, Any]:
+        """
+        获取数据库文件的空间使用情况
+
+        Returns:
+            统计信息字典：数据库和 WAL 文件大小、页大小、总页数、空闲页数、整理模式
+        """
+        conn = self.connect()
+        page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+        page_count = conn.execute("PRAGMA page_count").fetchone()[0]
+        freelist_count = conn.execute("PRAGMA freelist_count").fetchone()[0]
+        auto_vacuum = conn.execute("PRAGMA auto_vacuum").fetchone()[0]
+
+        wal_path = Path(f"{self.db_path}-wal")
+        return {
+            "db_size_bytes": self.db_path.stat().st_size if self.db_path.exists() else 0,
+            "wal_size_bytes": wal_path.stat().st_size if wal_path.exists() else 0,
+            "page_size": page_size,
+            "page_count": page_count,
+            "freelist_count": freelist_count,
+            "free_bytes": freelist_count * page_size,
+            "auto_vacuum": AUTO_VACUUM_MODES.get(auto_vacuum, str(auto_vacuum)),
+        }
+
 
 def get_database_manager(db_path: Optional[Path] = None) -> DatabaseManager:
     """
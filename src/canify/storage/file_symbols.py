@@ -0,0 +1,283 @@
+"""
+文件符号数据
+
+单个文件解析结果的紧凑表示。声明、引用和模式都预先转换为数据库行格式的元组，
+既便于在进程之间低成本地传递，也可以直接用于批量写入。
+
+实体的原始数据、源代码和引用文本较长时以 zlib 压缩后的字节存储（见 pack_text），
+行数据在转换为模型对象时才解压。
+"""
+
+import hashlib
+import json
+import zlib
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, NamedTuple, Optional, Set, Tuple, Union
+
+from ..models import EntityDeclaration, EntityReference, Location, SpecificationRule
+
+# 文本列的存储形式：原文，或压缩后的字节
+StoredText = Union[str, bytes]
+
+# (entity_id, entity_type, name, raw_data, source_code, location_file, location_line, location_column)
+DeclarationRow = Tuple[str, str, str, StoredText, StoredText, str, int, int]
+
+# (source_entity_id, target_entity_id, reference_text, location_file, location_line, location_column)
+ReferenceRow = Tuple[Optional[str], str, StoredText, str, int, int]
+
+# (schema_name, entity_type, schema_data, source_code, file_path, line_number)
+SchemaRow = Tuple[str, str, str, str, str, int]
+
+# (depended_symbol_type, depended_symbol_id, dependency_type)
+DependencyRow = Tuple[str, str, str]
+
+# 依赖的符号类型：实体、实体类型对应的模式、实体类型的全部实体
+SYMBOL_ENTITY = 'entity'
+SYMBOL_SCHEMA = 'schema'
+SYMBOL_ENTITY_TYPE = 'entity_type'
+
+# spec 规则的 fixture 可以读取任意实体，用通配符表示依赖所有实体类型
+ANY_ENTITY_TYPE = '*'
+
+# 文本编码后不短于该字节数时压缩存储，更短的文本压缩收益不足
+COMPACT_TEXT_MIN_BYTES = 256
+
+
+class EntitySummary(NamedTuple):
+    """实体声明的投影：不含原始数据和源代码"""
+
+    entity_id: str
+    entity_type: str
+    name: str
+    location_file: str
+    location_line: int
+    location_column: int
+
+
+class ReferenceSummary(NamedTuple):
+    """实体引用的投影：不含引用文本"""
+
+    source_entity_id: Optional[str]
+    target_entity_id: str
+    location_file: str
+    location_line: int
+    location_column: int
+
+
+def pack_text(text: str) -> StoredText:
+    """
+    压缩较长的文本
+
+    Args:
+        text: 文本
+
+    Returns:
+        压缩后更短时返回压缩后的字节，否则返回原文
+    """
+    data = text.encode('utf-8')
+    if len(data) < COMPACT_TEXT_MIN_BYTES:
+        return text
+    packed = zlib.compress(data)
+    return packed if len(packed) < len(data) else text
+
+
+def unpack_text(value: StoredText) -> str:
+    """
+    还原 pack_text 存储的文本
+
+    Args:
+        value: 原文或压缩后的字节
+
+    Returns:
+        文本
+    """
+    if isinstance(value, bytes):
+        return zlib.decompress(value).decode('utf-8')
+    return value
+
+
+def search_text(raw_data: StoredText) -> str:
+    """
+    将实体原始数据中的所有字段值拼接为全文搜索文本
+
+    Args:
+        raw_data: 原始数据的存储形式（JSON 文本，可能经过压缩）
+
+    Returns:
+        每行一个字段值的文本，嵌套的列表和对象逐层展开
+    """
+    values: List[str] = []
+    pending: List[Any] = [json.loads(unpack_text(raw_data))]
+    while pending:
+        value = pending.pop()
+        if isinstance(value, dict):
+            pending.extend(reversed(list(value.values())))
+        elif isinstance(value, list):
+            pending.extend(reversed(value))
+        elif value is not None:
+            values.append(str(value))
+    return "\n".join(values)
+
+
+def content_hash(content: str) -> str:
+    """
+    计算文件内容哈希
+
+    Args:
+        content: 文件内容
+
+    Returns:
+        文件哈希值
+    """
+    return hashlib.sha256(content.encode('utf-8')).hexdigest()
+
+
+def declaration_to_row(declaration: EntityDeclaration) -> DeclarationRow:
+    """将实体声明转换为 entity_declarations 表的行数据"""
+    return (
+        declaration.entity_id,
+        declaration.entity_type,
+        declaration.name,
+        pack_text(json.dumps(declaration.raw_data, ensure_ascii=False)),
+        pack_text(declaration.source_code),
+        str(declaration.location.file_path),
+        declaration.location.start_line,
+        declaration.location.start_column or 1,
+    )
+
+
+def reference_to_row(reference: EntityReference) -> ReferenceRow:
+    """将实体引用转换为 entity_references 表的行数据"""
+    return (
+        reference.source_entity_id,
+        reference.target_entity_id,
+        pack_text(reference.context_text),
+        str(reference.location.file_path),
+        reference.location.start_line,
+        reference.location.start_column or 1,
+    )
+
+
+def row_to_declaration(row: DeclarationRow) -> EntityDeclaration:
+    """将 entity_declarations 表的行数据转换为实体声明"""
+    entity_id, entity_type, name, raw_data, source_code, location_file, line, column = row
+    return EntityDeclaration(
+        location=Location(
+            file_path=Path(location_file),
+            start_line=line,
+            end_line=line,  # 使用相同的行号作为结束行
+            start_column=column
+        ),
+        entity_type=entity_type,
+        entity_id=entity_id,
+        name=name,
+        raw_data=json.loads(unpack_text(raw_data)),
+        source_code=unpack_text(source_code)
+    )
+
+
+def row_to_reference(row: ReferenceRow, target_entity_type: Optional[str] = None) -> EntityReference:
+    """将 entity_references 表的行数据转换为实体引用，target_entity_type 为已解析的目标实体类型"""
+    source_entity_id, target_entity_id, reference_text, location_file, line, column = row
+    return EntityReference(
+        source_entity_id=source_entity_id,
+        target_entity_id=target_entity_id,
+        target_entity_type=target_entity_type,
+        context_text=unpack_text(reference_text),
+        location=Location(
+            file_path=Path(location_file),
+            start_line=line,
+            end_line=line,  # 使用相同的行号作为结束行
+            start_column=column
+        )
+    )
+
+
+def schema_to_row(schema_data: Dict[str, Any]) -> SchemaRow:
+    """将模式数据字典转换为 entity_schemas 表的行数据"""
+    return (
+        schema_data["name"],
+        schema_data["name"],  # entity_type 使用 schema_name (首字母大写)
+        json.dumps(schema_data, ensure_ascii=False),
+        schema_data.get("source_code", ""),
+        schema_data["file_path"],
+        schema_data["line_number"],
+    )
+
+
+@dataclass
+class FileSymbols:
+    """单个文件的解析结果"""
+
+    file_path: str
+    kind: Optional[str] = None  # 文件类型，见 discovery.file_walker.classify_file
+    declarations: List[DeclarationRow] = field(default_factory=list)
+    references: List[ReferenceRow] = field(default_factory=list)
+    schemas: List[SchemaRow] = field(default_factory=list)
+    specs: List[SpecificationRule] = field(default_factory=list)
+    error: Optional[str] = None
+
+    # 文件元数据，用于重启时判断文件是否变化
+    file_hash: str = ""
+    mtime_ns: Optional[int] = None
+    file_size: Optional[int] = None
+
+    # 内容哈希与已入库的一致，未重新解析
+    unchanged: bool = False
+
+    # 由文件符号存储中保存的解析结果恢复，未重新解析
+    restored: bool = False
+
+    @classmethod
+    def from_models(
+        cls,
+        file_path: str,
+        declarations: List[EntityDeclaration],
+        references: List[EntityReference],
+        schemas: Optional[List[Dict[str, Any]]] = None,
+        specs: Optional[List[SpecificationRule]] = None
+    ) -> "FileSymbols":
+        """
+        由解析器产出的模型对象构建文件符号数据
+
+        Args:
+            file_path: 文件路径（相对于项目根目录）
+            declarations: 实体声明列表
+            references: 实体引用列表
+            schemas: 模式数据字典列表
+            specs: spec 规则列表
+
+        Returns:
+            文件符号数据
+        """
+        return cls(
+            file_path=file_path,
+            declarations=[declaration_to_row(d) for d in declarations],
+            references=[reference_to_row(r) for r in references],
+            schemas=[schema_to_row(s) for s in schemas or []],
+            specs=list(specs or []),
+        )
+
+    @property
+    def entity_ids(self) -> List[str]:
+        """文件中声明的实体ID列表"""
+        return [row[0] for row in self.declarations]
+
+    @property
+    def dependencies(self) -> List[DependencyRow]:
+        """
+        文件验证结果所依赖的符号
+
+        - 引用依赖目标实体（存在性和类型）
+        - 实体声明依赖其类型的模式
+        - spec 规则依赖所有实体
+        """
+        dependencies: Set[DependencyRow] = set()
+        for row in self.references:
+            dependencies.add((SYMBOL_ENTITY, row[1], 'reference'))
+        for row in self.declarations:
+            dependencies.add((SYMBOL_SCHEMA, row[1], 'declaration'))
+        if self.specs:
+            dependencies.add((SYMBOL_ENTITY_TYPE, ANY_ENTITY_TYPE, 'spec'))
+        return sorted(dependencies)
@@ -0,0 +1,207 @@
+"""
+数据库维护调度器
+
+daemon 长时间运行时，文件更新不断删除并重新插入符号行：删除留下的空闲页不会
+归还给文件系统，WAL 文件也只会在自动检查点时写回、不会缩小。调度器在数据库
+空闲（一段时间内没有写入）时分步执行维护，每一步有时间预算：
+
+- 增量整理（PRAGMA incremental_vacuum）：每次回收一批空闲页，直到预算用完
+- WAL 检查点：先以 PASSIVE 模式写回，全部写回后以 TRUNCATE 模式截断 WAL 文件
+
+维护在调度器线程自己的连接上执行，每批空闲页一个短事务，不会长时间阻塞写入线程。
+"""
+
+import logging
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from .database import DatabaseManager
+
+logger = logging.getLogger(__name__)
+
+# 最后一次写入之后至少空闲这么久（秒）才开始维护
+DEFAULT_IDLE_SECONDS = 5.0
+
+# 每一步维护的时间预算（秒）
+DEFAULT_STEP_BUDGET = 0.05
+
+# 两次检查之间的间隔（秒）
+DEFAULT_CHECK_INTERVAL = 1.0
+
+# 增量整理每批回收的页数
+VACUUM_PAGES_PER_BATCH = 256
+
+
+class MaintenanceScheduler:
+    """数据库维护调度器"""
+
+    def __init__(
+        self,
+        db_manager: DatabaseManager,
+        idle_seconds: float = DEFAULT_IDLE_SECONDS,
+        step_budget: float = DEFAULT_STEP_BUDGET,
+        check_interval: float = DEFAULT_CHECK_INTERVAL
+    ):
+        """
+        初始化数据库维护调度器
+
+        Args:
+            db_manager: 数据库管理器
+            idle_seconds: 最后一次写入之后至少空闲这么久（秒）才开始维护
+            step_budget: 每一步维护的时间预算（秒）
+            check_interval: 两次检查之间的间隔（秒）
+        """
+        self.db_manager = db_manager
+        self.idle_seconds = idle_seconds
+        self.step_budget = step_budget
+        self.check_interval = check_interval
+
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+        # 写入代数及其最后一次变化的时间，用于判断是否空闲
+        self._seen_generation = db_manager.write_generation
+        self._generation_changed_at = time.monotonic()
+        # 维护完成时的写入代数，之后没有新的写入就无需再维护
+        self._maintained_generation: Optional[int] = None
+
+        # 统计信息
+        self.steps = 0
+        self.checkpoints = 0
+        self.truncations = 0
+        self.pages_vacuumed = 0
+        self.maintenance_seconds = 0.0
+        self.last_step: Optional[Dict[str, Any]] = None
+
+    @property
+    def is_running(self) -> bool:
+        """调度线程是否在运行"""
+        return self._thread is not None
+
+    def start(self) -> None:
+        """启动调度线程"""
+        if self._thread is not None:
+            return
+
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="canify-maintenance", daemon=True)
+        self._thread.start()
+        logger.debug("数据库维护线程启动")
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """
+        停止调度线程，正在执行的一步维护会先完成
+
+        Args:
+            timeout: 等待线程结束的最长时间（秒）
+        """
+        if self._thread is None:
+            return
+
+        self._stop_event.set()
+        self._thread.join(timeout=timeout)
+        self._thread = None
+        logger.debug("数据库维护线程结束")
+
+    def is_idle(self) -> bool:
+        """最后一次写入之后是否已空闲足够长的时间"""
+        generation = self.db_manager.write_generation
+        now = time.monotonic()
+        if generation != self._seen_generation:
+            self._seen_generation = generation
+            self._generation_changed_at = now
+        return now - self._generation_changed_at >= self.idle_seconds
+
+    def run_step(self, budget: Optional[float] = None) -> Dict[str, Any]:
+        """
+        执行一步维护：在时间预算内增量整理，然后执行 WAL 检查点
+
+        Args:
+            budget: 时间预算（秒），None 表示使用 step_budget
+
+        Returns:
+            本步的维护结果
+        """
+        budget = self.step_budget if budget is None else budget
+        generation = self.db_manager.write_generation
+        start_time = time.perf_counter()
+        deadline = start_time + budget
+
+        pages = 0
+        while time.perf_counter() < deadline:
+            freed = self.db_manager.incremental_vacuum(VACUUM_PAGES_PER_BATCH)
+            if freed == 0:
+                break
+            pages += freed
+
+        busy, log_frames, checkpointed = self.db_manager.checkpoint("PASSIVE")
+        truncated = False
+        if not busy and checkpointed == log_frames and self.db_manager.get_file_stats()["wal_size_bytes"] > 0:
+            # 全部写回后截断通常很快；读取方仍在使用 WAL 时最多等到预算用完，之后放弃本次截断
+            busy, _, _ = self.db_manager.checkpoint("TRUNCATE", busy_timeout=max(0.0, deadline - time.perf_counter()))
+            truncated = not busy
+
+        elapsed = time.perf_counter() - start_time
+        file_stats = self.db_manager.get_file_stats()
+        # 未启用增量整理的数据库无法回收空闲页，不因此反复维护
+        reclaimable = file_stats["auto_vacuum"] == "incremental" and file_stats["freelist_count"] > 0
+        done = not reclaimable and not busy and file_stats["wal_size_bytes"] == 0
+
+        step = {
+            "pages_vacuumed": pages,
+            "wal_frames": log_frames,
+            "checkpointed_frames": checkpointed,
+            "truncated": truncated,
+            "done": done,
+            "elapsed_seconds": elapsed,
+        }
+        with self._lock:
+            self.steps += 1
+            self.checkpoints += 1
+            self.truncations += int(truncated)
+            self.pages_vacuumed += pages
+            self.maintenance_seconds += elapsed
+            self.last_step = step
+            if done and self.db_manager.write_generation == generation:
+                self._maintained_generation = generation
+
+        if pages or truncated:
+            logger.debug(
+                f"数据库维护: 回收 {pages} 个空闲页, 检查点 {checkpointed}/{log_frames} 帧"
+                f"{', 已截断 WAL' if truncated else ''}, 耗时 {elapsed * 1000:.1f}ms"
+            )
+        return step
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        获取维护统计信息和数据库文件的空间使用情况
+
+        Returns:
+            统计信息字典
+        """
+        with self._lock:
+            stats: Dict[str, Any] = {
+                "steps": self.steps,
+                "checkpoints": self.checkpoints,
+                "truncations": self.truncations,
+                "pages_vacuumed": self.pages_vacuumed,
+                "maintenance_seconds": round(self.maintenance_seconds, 4),
+                "last_step": self.last_step,
+            }
+        stats.update(self.db_manager.get_file_stats())
+        return stats
+
+    def _run(self) -> None:
+        """调度线程主循环"""
+        try:
+            while not self._stop_event.wait(self.check_interval):
+                if not self.is_idle() or self._maintained_generation == self.db_manager.write_generation:
+                    continue
+                try:
+                    self.run_step()
+                except Exception as e:
+                    logger.warning(f"数据库维护失败: {e}")
+        finally:
+            self.db_manager.close()
@@ -0,0 +1,276 @@
+"""
+项目数据库位置
+
+每个项目使用独立的数据库文件，不同项目的 daemon 不再共享同一个 WAL、写锁和检查点。
+数据库默认位于 ~/.canify/projects/<目录名>-<路径哈希>.db，也可以放在项目内的
+.canify/index.db（该目录默认被忽略，不会被扫描）。
+
+旧版本所有项目共用 ~/.canify/canify.db。daemon 首次使用项目数据库时，
+从旧数据库复制该项目的数据并将其从旧数据库删除，之后无需全量重新扫描。
+
+启用增量整理之前创建的项目数据库由 'canify db vacuum' 显式转换；旧的全局数据库
+只会被逐步迁移清空，不做转换。
+"""
+
+import hashlib
+import logging
+import sqlite3
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import List, Optional
+
+from .database import AUTO_VACUUM_MODES, DatabaseManager
+
+logger = logging.getLogger(__name__)
+
+# 旧版本的全局数据库文件名
+LEGACY_DB_NAME = "canify.db"
+
+# 项目数据库所在目录（相对于 canify 主目录）
+PROJECT_DB_DIR = "projects"
+
+# 项目内数据库路径（相对于项目根目录）
+IN_PROJECT_DB_PATH = Path(".canify") / "index.db"
+
+# 迁移顺序：被引用的表在前
+MIGRATED_TABLES = (
+    "projects",
+    "files",
+    "entity_declarations",
+    "entity_schemas",
+    "spec_rules",
+    "spec_rule_tags",
+    "entity_references",
+    "symbol_dependencies",
+    "symbol_blobs",
+    "branch_files",
+)
+
+
+@dataclass
+class ProjectDatabase:
+    """项目数据库文件信息"""
+
+    db_path: Path
+    project_paths: List[str] = field(default_factory=list)
+    size_bytes: int = 0
+    last_modified: float = 0.0
+    auto_vacuum: Optional[str] = None
+    error: Optional[str] = None
+
+    @property
+    def stale(self) -> bool:
+        """数据库中的项目目录都已不存在；无法读取的数据库不视为过期"""
+        if self.error is not None:
+            return False
+        return not any(Path(project_path).is_dir() for project_path in self.project_paths)
+
+
+def canify_home() -> Path:
+    """canify 主目录"""
+    return Path.home() / ".canify"
+
+
+def legacy_db_path(home: Optional[Path] = None) -> Path:
+    """
+    旧版本全局数据库的路径
+
+    Args:
+        home: canify 主目录，None 表示 ~/.canify
+
+    Returns:
+        数据库文件路径
+    """
+    return (home or canify_home()) / LEGACY_DB_NAME
+
+
+def project_db_key(project_root: Path) -> str:
+    """
+    项目数据库的文件名（不含扩展名）
+
+    Args:
+        project_root: 项目根目录
+
+    Returns:
+        目录名加项目绝对路径哈希，同名目录的不同项目互不冲突
+    """
+    project_path = str(Path(project_root).absolute())
+    digest = hashlib.sha256(project_path.encode('utf-8')).hexdigest()[:12]
+    return f"{Path(project_path).name or 'root'}-{digest}"
+
+
+def project_db_path(project_root: Path, in_project: bool = False, home: Optional[Path] = None) -> Path:
+    """
+    项目数据库的路径
+
+    Args:
+        project_root: 项目根目录
+        in_project: 是否将数据库放在项目内的 .canify 目录
+        home: canify 主目录，None 表示 ~/.canify
+
+    Returns:
+        数据库文件路径
+    """
+    if in_project:
+        return Path(project_root).absolute() / IN_PROJECT_DB_PATH
+    return (home or canify_home()) / PROJECT_DB_DIR / f"{project_db_key(project_root)}.db"
+
+
+def migrate_from_legacy(db_manager: DatabaseManager, project_root: Path, legacy_path: Path) -> int:
+    """
+    将项目的数据从旧的全局数据库迁移到项目数据库
+
+    只在项目数据库中还没有该项目时迁移。按表执行 INSERT ... SELECT 复制该项目的行
+    （保留原有主键，外键关系不变），然后从旧数据库删除该项目。
+
+    Args:
+        db_manager: 项目数据库管理器，数据库模式已初始化
+        project_root: 项目根目录
+        legacy_path: 旧数据库路径
+
+    Returns:
+        复制的行数，没有可迁移的数据时返回0
+    """
+    if not legacy_path.exists() or legacy_path.resolve() == db_manager.db_path.resolve():
+        return 0
+
+    project_path = str(Path(project_root).absolute())
+    conn = db_manager.connect()
+    if conn.execute("SELECT 1 FROM projects WHERE project_path = ?", (project_path,)).fetchone():
+        return 0
+
+    # 先将旧数据库升级到当前模式，两边的列一致
+    legacy = DatabaseManager(legacy_path)
+    try:
+        legacy.initialize_schema()
+        row = legacy.connect().execute(
+            "SELECT id FROM projects WHERE project_path = ?", (project_path,)
+        ).fetchone()
+    finally:
+        legacy.close()
+    if row is None:
+        return 0
+    legacy_project_id = row["id"]
+
+    copied = 0
+    conn.execute("ATTACH DATABASE ? AS legacy", (str(legacy_path),))
+    try:
+        with db_manager.transaction():
+            for table in MIGRATED_TABLES:
+                columns = ", ".join(
+                    column["name"] for column in conn.execute(f"PRAGMA main.table_info({table})")
+                )
+                key = "id" if table == "projects" else "project_id"
+                cursor = conn.execute(
+                    f"INSERT INTO main.{table} ({columns}) SELECT {columns} FROM legacy.{table} WHERE {key} = ?",
+                    (legacy_project_id,)
+                )
+                copied += cursor.rowcount
+            db_manager.rebuild_search_index(conn, legacy_project_id)
+            # 其余表的行随项目级联删除
+            conn.execute("DELETE FROM legacy.projects WHERE id = ?", (legacy_project_id,))
+    finally:
+        conn.execute("DETACH DATABASE legacy")
+
+    logger.info(f"已从 {legacy_path} 迁移项目数据: {project_path}, {copied} 行")
+    return copied
+
+
+def list_project_databases(home: Optional[Path] = None) -> List[ProjectDatabase]:
+    """
+    列出 canify 主目录中的项目数据库（包括旧的全局数据库）
+
+    项目内的数据库随项目目录一起删除，不在此列出。
+
+    Args:
+        home: canify 主目录，None 表示 ~/.canify
+
+    Returns:
+        项目数据库信息列表
+    """
+    home = home or canify_home()
+    paths = sorted((home / PROJECT_DB_DIR).glob("*.db"))
+    if legacy_db_path(home).exists():
+        paths.insert(0, legacy_db_path(home))
+    return [_inspect(path) for path in paths]
+
+
+def gc_project_databases(home: Optional[Path] = None, dry_run: bool = False) -> List[ProjectDatabase]:
+    """
+    删除项目目录已不存在的项目数据库
+
+    Args:
+        home: canify 主目录，None 表示 ~/.canify
+        dry_run: 只列出将被删除的数据库，不实际删除
+
+    Returns:
+        过期的项目数据库信息列表
+    """
+    stale = [database for database in list_project_databases(home) if database.stale]
+    if dry_run:
+        return stale
+
+    for database in stale:
+        for suffix in ("", "-wal", "-shm"):
+            Path(f"{database.db_path}{suffix}").unlink(missing_ok=True)
+        logger.info(f"已删除过期的项目数据库: {database.db_path}")
+    return stale
+
+
+def vacuum_project_databases(home: Optional[Path] = None, dry_run: bool = False) -> List[ProjectDatabase]:
+    """
+    将 canify 主目录中尚未启用增量整理的项目数据库转换为增量整理模式
+
+    每个数据库执行一次完整的 VACUUM，期间该数据库被锁定；正在被 daemon 写入的数据库
+    转换失败时记录在 error 字段中，不影响其他数据库。旧的全局数据库不转换。
+
+    Args:
+        home: canify 主目录，None 表示 ~/.canify
+        dry_run: 只列出需要转换的数据库，不实际转换
+
+    Returns:
+        需要转换的项目数据库信息列表
+    """
+    legacy_path = legacy_db_path(home or canify_home())
+    pending = [
+        database for database in list_project_databases(home)
+        if database.db_path != legacy_path and database.error is None and database.auto_vacuum != "incremental"
+    ]
+    if dry_run:
+        return pending
+
+    for database in pending:
+        db_manager = DatabaseManager(database.db_path)
+        try:
+            db_manager.enable_incremental_vacuum()
+            database.auto_vacuum = "incremental"
+        except sqlite3.Error as e:
+            logger.warning(f"转换项目数据库失败 {database.db_path}: {e}")
+            database.error = str(e)
+        finally:
+            db_manager.close()
+    return pending
+
+
+def _inspect(db_path: Path) -> ProjectDatabase:
+    """以只读方式读取数据库中的项目"""
+    stat = db_path.stat()
+    database = ProjectDatabase(db_path=db_path, size_bytes=stat.st_size, last_modified=stat.st_mtime)
+    for suffix in ("-wal", "-shm"):
+        sidecar = Path(f"{db_path}{suffix}")
+        if sidecar.exists():
+            database.size_bytes += sidecar.stat().st_size
+
+    try:
+        conn = sqlite3.connect(f"{db_path.resolve().as_uri()}?mode=ro", uri=True)
+        try:
+            tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+            if "projects" in tables:
+                database.project_paths = [row[0] for row in conn.execute("SELECT project_path FROM projects ORDER BY id")]
+            auto_vacuum = conn.execute("PRAGMA auto_vacuum").fetchone()[0]
+            database.auto_vacuum = AUTO_VACUUM_MODES.get(auto_vacuum, str(auto_vacuum))
+        finally:
+            conn.close()
+    except sqlite3.Error as e:
+        database.error = str(e)
+    return database
@@ -0,0 +1,226 @@
+"""
+模式注册表
+
+实体模式的进程内缓存，保存解码后的模式字典，按模式名称和实体类型索引。
+模式数据只在写入或加载时解码一次，验证器逐个实体、逐个引用查询模式时
+不再访问数据库，也不再重复执行 json.loads。
+
+与符号索引一样，注册表由 SymbolTableManager 在写事务提交后更新，只反映已提交的模式。
+模式所在文件的模式被替换或文件被删除时，只有该文件的模式失效。
+"""
+
+import json
+import logging
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from .file_symbols import SchemaRow
+
+logger = logging.getLogger(__name__)
+
+class SchemaRegistry:
+    """模式注册表"""
+
+    def __init__(self):
+        """初始化模式注册表"""
+        self._lock = threading.RLock()
+        self.project_id: Optional[int] = None
+
+        self._file_schemas: Dict[str, List[str]] = {}
+        self._schema_files: Dict[str, str] = {}
+        self._by_name: Dict[str, Tuple[str, Dict[str, Any]]] = {}
+        self._by_type: Dict[str, Dict[str, Any]] = {}
+
+        # 统计信息
+        self.decodes = 0
+        self.hits = 0
+
+    def is_loaded_for(self, project_id: int) -> bool:
+        """
+        注册表是否已为指定项目加载
+
+        Args:
+            project_id: 项目ID
+
+        Returns:
+            是否已加载
+        """
+        return self.project_id == project_id
+
+    def load(self, project_id: int, schemas: Iterable[Tuple[str, str, str, str]]) -> None:
+        """
+        用数据库中的全部模式重建注册表
+
+        Args:
+            project_id: 项目ID
+            schemas: (文件路径, 模式名称, 实体类型, 模式数据JSON) 序列
+        """
+        with self._lock:
+            self.reset(project_id)
+            for file_path, schema_name, entity_type, schema_data in schemas:
+                self._set(file_path, schema_name, entity_type, self._decode(schema_data))
+            self._rebuild_types()
+
+        logger.info(f"模式注册表加载完成: {len(self._by_name)} 个模式")
+
+    def reset(self, project_id: int) -> None:
+        """
+        清空注册表并绑定到指定项目
+
+        Args:
+            project_id: 项目ID
+        """
+        with self._lock:
+            self.project_id = project_id
+            self._file_schemas.clear()
+            self._schema_files.clear()
+            self._by_name.clear()
+            self._by_type.clear()
+
+    def add_schemas(self, file_path: str, schemas: List[SchemaRow], replace: bool = False) -> None:
+        """
+        写入文件中的模式
+
+        与 entity_schemas 表的 INSERT OR REPLACE 一致：同名模式覆盖原有模式，
+        即使原有模式属于其他文件。
+
+        Args:
+            file_path: 文件路径
+            schemas: 模式行数据列表
+            replace: 是否先移除该文件原有的全部模式
+        """
+        with self._lock:
+            if replace:
+                self._remove_file(file_path)
+            for row in schemas:
+                self._set(file_path, row[0], row[1], self._decode(row[2]))
+            self._rebuild_types()
+
+    def remove_file(self, file_path: str) -> None:
+        """
+        移除文件中的全部模式
+
+        Args:
+            file_path: 文件路径
+        """
+        with self._lock:
+            if self._remove_file(file_path):
+                self._rebuild_types()
+
+    def has_file(self, file_path: str) -> bool:
+        """
+        文件中是否定义了模式
+
+        Args:
+            file_path: 文件路径
+
+        Returns:
+            是否定义了模式
+        """
+        with self._lock:
+            return file_path in self._file_schemas
+
+    def get_by_name(self, schema_name: str) -> Optional[Dict[str, Any]]:
+        """
+        根据模式名称获取模式
+
+        Args:
+            schema_name: 模式名称
+
+        Returns:
+            模式数据字典（共享对象，调用方不应修改），如果不存在则返回None
+        """
+        with self._lock:
+            entry = self._by_name.get(schema_name)
+            if entry is None:
+                return None
+            self.hits += 1
+            return entry[1]
+
+    def get_by_entity_type(self, entity_type: str) -> Optional[Dict[str, Any]]:
+        """
+        根据实体类型获取模式
+
+        Args:
+            entity_type: 实体类型
+
+        Returns:
+            模式数据字典（共享对象，调用方不应修改），如果不存在则返回None
+        """
+        with self._lock:
+            schema = self._by_type.get(entity_type)
+            if schema is not None:
+                self.hits += 1
+            return schema
+
+    def get_all(self) -> List[Dict[str, Any]]:
+        """
+        获取所有模式
+
+        Returns:
+            模式数据字典列表
+        """
+        with self._lock:
+            return [schema for _, schema in self._by_name.values()]
+
+    def get_entity_types(self) -> List[str]:
+        """
+        获取所有定义了模式的实体类型
+
+        Returns:
+            实体类型列表
+        """
+        with self._lock:
+            return list(self._by_type)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        获取注册表统计信息
+
+        Returns:
+            统计信息字典
+        """
+        with self._lock:
+            return {
+                "loaded": self.project_id is not None,
+                "schemas": len(self._by_name),
+                "entity_types": len(self._by_type),
+                "files": len(self._file_schemas),
+                "decodes": self.decodes,
+                "hits": self.hits,
+            }
+
+    def _decode(self, schema_data: str) -> Dict[str, Any]:
+        """解码模式数据"""
+        self.decodes += 1
+        return json.loads(schema_data)
+
+    def _set(self, file_path: str, schema_name: str, entity_type: str, schema: Dict[str, Any]) -> None:
+        """写入单个模式，调用方需持有锁并在之后重建类型索引"""
+        owner = self._schema_files.get(schema_name)
+        if owner is not None and owner != file_path:
+            names = self._file_schemas[owner]
+            names.remove(schema_name)
+            if not names:
+                del self._file_schemas[owner]
+
+        names = self._file_schemas.setdefault(file_path, [])
+        if schema_name not in names:
+            names.append(schema_name)
+        self._schema_files[schema_name] = file_path
+        self._by_name.pop(schema_name, None)
+        self._by_name[schema_name] = (entity_type, schema)
+
+    def _remove_file(self, file_path: str) -> bool:
+        """移除文件中的全部模式，调用方需持有锁并在之后重建类型索引"""
+        names = self._file_schemas.pop(file_path, None)
+        if not names:
+            return False
+        for schema_name in names:
+            self._schema_files.pop(schema_name, None)
+            self._by_name.pop(schema_name, None)
+        return True
+
+    def _rebuild_types(self) -> None:
+        """按实体类型重建索引，同一类型有多个模式时取最后写入的，调用方需持有锁"""
+        self._by_type = {entity_type: schema for entity_type, schema in self._by_name.values()}
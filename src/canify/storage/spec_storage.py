@@ -7,7 +7,7 @@ Spec 存储管理器
 import json
 import logging
 from pathlib import Path
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Tuple
 import sqlite3
 
 from ..models.spec import SpecificationRule
@@ -37,52 +37,90 @@ class SpecStorageManager:
             file_path: 文件路径
             specs: spec 规则列表
         """
-        conn = self.db_manager.connect()
-
         try:
-            # 获取或创建文件记录
-            cursor = conn.execute("SELECT id FROM files WHERE project_id = ? AND file_path = ?", (project_id, file_path))
-            file_record = cursor.fetchone()
-
-            if file_record:
-                file_id = file_record["id"]
-            else:
-                from datetime import datetime
-                cursor = conn.execute(
-                    """
-                    INSERT INTO files (project_id, file_path, file_hash, last_modified, status)
-                    VALUES (?, ?, ?, ?, 'parsing')
-                    """,
-                    (project_id, file_path, "", datetime.now().isoformat())
+            with self.db_manager.transaction() as conn:
+                file_ids = self.db_manager.get_or_create_file_ids(conn, project_id, [file_path])
+                self.insert_spec_rows(
+                    conn, [self.spec_to_params(project_id, file_ids[file_path], spec) for spec in specs]
                 )
-                file_id = cursor.lastrowid
-
-            for spec in specs:
-                self._store_single_spec(conn, project_id, file_id, spec)
 
-            conn.commit()
             logger.info(f"成功存储 {len(specs)} 个 spec 规则到文件 {file_path}")
 
         except Exception as e:
-            conn.rollback()
             logger.error(f"存储 spec 规则失败: {e}")
             raise
 
-    def _store_single_spec(
-        self,
-        conn: sqlite3.Connection,
-        project_id: int,
-        file_id: int,
-        spec: SpecificationRule
-    ) -> None:
+    def bulk_store_specs(self, project_id: int, specs_by_file: Dict[str, List[SpecificationRule]]) -> int:
         """
-        存储单个 spec 规则
+        在一个事务中批量存储多个文件的 spec 规则，替换这些文件原有的规则
+
+        Args:
+            project_id: 项目 ID
+            specs_by_file: 文件路径到 spec 规则列表的映射
+
+        Returns:
+            写入的规则行数
+        """
+        if not specs_by_file:
+            return 0
+
+        with self.db_manager.transaction() as conn:
+            file_ids = self.db_manager.get_or_create_file_ids(conn, project_id, list(specs_by_file))
+            conn.execute(
+                "DELETE FROM spec_rules WHERE file_id IN (SELECT value FROM json_each(?))",
+                (json.dumps(list(file_ids.values())),)
+            )
+            params = [
+                self.spec_to_params(project_id, file_ids[file_path], spec)
+                for file_path, specs in specs_by_file.items() for spec in specs
+            ]
+            self.insert_spec_rows(conn, params)
+
+        logger.debug(f"批量存储 {len(params)} 个 spec 规则到 {len(specs_by_file)} 个文件")
+        return len(params)
+
+    def insert_spec_rows(self, conn: sqlite3.Connection, params: List[Tuple[Any, ...]]) -> None:
+        """
+        插入或更新 spec 规则行，并写入规则的标签
+
+        被替换的规则行的标签随之级联删除。
 
         Args:
             conn: 数据库连接
+            params: 预先构建的参数元组列表
+        """
+        if not params:
+            return
+
+        conn.executemany("""
+            INSERT OR REPLACE INTO spec_rules
+            (project_id, file_id, rule_id, name, description, env, fixture, test_case, levels, tags, source_code, file_path)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, params)
+
+        rule_ids: Dict[int, List[str]] = {}
+        for row in params:
+            if row[9] is not None:
+                rule_ids.setdefault(row[0], []).append(row[2])
+        for project_id, project_rule_ids in rule_ids.items():
+            conn.execute("""
+                INSERT OR IGNORE INTO spec_rule_tags (spec_id, project_id, rule_id, tag)
+                SELECT sr.id, sr.project_id, sr.rule_id, je.value
+                FROM spec_rules sr, json_each(sr.tags) je
+                WHERE sr.project_id = ? AND sr.rule_id IN (SELECT value FROM json_each(?))
+            """, (project_id, json.dumps(project_rule_ids)))
+
+    def spec_to_params(self, project_id: int, file_id: int, spec: SpecificationRule) -> Tuple[Any, ...]:
+        """
+        构建单个 spec 规则的插入参数
+
+        Args:
             project_id: 项目 ID
             file_id: 文件 ID
             spec: spec 规则
+
+        Returns:
+            参数元组
         """
         # 准备数据
         levels_json = json.dumps(spec.levels)
@@ -101,12 +139,7 @@ class SpecStorageManager:
         ]
         source_code = '\n'.join(source_lines)
 
-        # 插入或更新 spec 规则
-        conn.execute("""
-            INSERT OR REPLACE INTO spec_rules
-            (project_id, file_id, rule_id, name, description, env, fixture, test_case, levels, tags, source_code, file_path)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        """, (
+        return (
             project_id,
             file_id,
             spec.id,
@@ -119,7 +152,7 @@ class SpecStorageManager:
             tags_json,
             source_code,
             str(Path.cwd())  # 当前工作目录作为文件路径
-        ))
+        )
 
     def get_specs_by_project(self, project_id: int) -> List[SpecificationRule]:
         """
@@ -172,34 +205,59 @@ class SpecStorageManager:
             return self._row_to_specification_rule(row)
         return None
 
-    def get_specs_by_tags(self, project_id: int, tags: List[str]) -> List[SpecificationRule]:
+    def get_specs_by_tags(
+        self,
+        project_id: int,
+        tags: List[str],
+        match_all: bool = False,
+        exclude_tags: Optional[List[str]] = None
+    ) -> List[SpecificationRule]:
         """
-        根据标签获取 spec 规则
+        根据标签获取 spec 规则，通过 spec_rule_tags 表的索引查找
 
         Args:
             project_id: 项目 ID
             tags: 标签列表
+            match_all: True 时返回包含全部标签的规则（交集），否则返回包含任一标签的规则（并集）
+            exclude_tags: 排除包含其中任一标签的规则（差集）
 
         Returns:
-            SpecificationRule 对象列表
+            SpecificationRule 对象列表，按规则 ID 排序
         """
-        conn = self.db_manager.connect()
-
-        # 构建标签查询条件
-        tag_conditions = []
-        for tag in tags:
-            tag_conditions.append(f"tags LIKE '%\"{tag}\"%'")
-
-        if not tag_conditions:
+        tags = list(dict.fromkeys(tags))
+        if not tags:
             return []
 
-        tag_where = " OR ".join(tag_conditions)
+        conn = self.db_manager.connect()
+
+        having = "HAVING COUNT(*) = ?" if match_all else ""
+        params: List[Any] = [project_id, json.dumps(tags)]
+        if match_all:
+            params.append(len(tags))
+
+        exclude_where = ""
+        if exclude_tags:
+            exclude_where = """
+                AND sr.id NOT IN (
+                    SELECT spec_id FROM spec_rule_tags
+                    WHERE project_id = ? AND tag IN (SELECT value FROM json_each(?))
+                )
+            """
+            params.extend([project_id, json.dumps(list(exclude_tags))])
 
         cursor = conn.execute(f"""
-            SELECT rule_id, name, description, env, fixture, test_case, levels, tags, source_code
-            FROM spec_rules
-            WHERE project_id = ? AND ({tag_where})
-        """, (project_id,))
+            SELECT sr.rule_id, sr.name, sr.description, sr.env, sr.fixture, sr.test_case,
+                   sr.levels, sr.tags, sr.source_code
+            FROM spec_rules sr
+            WHERE sr.id IN (
+                SELECT spec_id FROM spec_rule_tags
+                WHERE project_id = ? AND tag IN (SELECT value FROM json_each(?))
+                GROUP BY spec_id
+                {having}
+            )
+            {exclude_where}
+            ORDER BY sr.rule_id
+        """, params)
 
         specs = []
         for row in cursor:
@@ -236,30 +294,85 @@ class SpecStorageManager:
 
         return specs
 
-    def delete_specs_by_file(self, project_id: int, file_path: str) -> None:
+    def get_specs_by_file(self, project_id: int, file_path: str) -> List[SpecificationRule]:
         """
-        删除指定文件的所有 spec 规则
+        获取指定文件中定义的 spec 规则
 
         Args:
             project_id: 项目 ID
             file_path: 文件路径
+
+        Returns:
+            SpecificationRule 对象列表
         """
         conn = self.db_manager.connect()
 
-        cursor = conn.execute("SELECT id FROM files WHERE project_id = ? AND file_path = ?", (project_id, file_path))
-        file_record = cursor.fetchone()
+        cursor = conn.execute("""
+            SELECT sr.rule_id, sr.name, sr.description, sr.env, sr.fixture, sr.test_case,
+                   sr.levels, sr.tags, sr.source_code
+            FROM spec_rules sr
+            JOIN files f ON sr.file_id = f.id
+            WHERE f.project_id = ? AND f.file_path = ?
+        """, (project_id, file_path))
 
-        if not file_record:
-            return
+        specs = []
+        for row in cursor:
+            spec = self._row_to_specification_rule(row)
+            if spec:
+                specs.append(spec)
+
+        return specs
 
-        file_id = file_record["id"]
+    def get_specs_with_files(self, project_id: int) -> List[Tuple[str, SpecificationRule]]:
+        """
+        获取项目中所有 spec 规则及其所在文件
+
+        Args:
+            project_id: 项目 ID
 
-        conn.execute("""
-            DELETE FROM spec_rules
-            WHERE project_id = ? AND file_id = ?
-        """, (project_id, file_id))
+        Returns:
+            (文件路径, SpecificationRule 对象) 列表
+        """
+        conn = self.db_manager.connect()
+
+        cursor = conn.execute("""
+            SELECT f.file_path, sr.rule_id, sr.name, sr.description, sr.env, sr.fixture, sr.test_case,
+                   sr.levels, sr.tags, sr.source_code
+            FROM spec_rules sr
+            JOIN files f ON sr.file_id = f.id
+            WHERE sr.project_id = ?
+        """, (project_id,))
+
+        specs = []
+        for row in cursor:
+            spec = self._row_to_specification_rule(row)
+            if spec:
+                specs.append((row["file_path"], spec))
+
+        return specs
+
+    def delete_specs_by_file(self, project_id: int, file_path: str) -> None:
+        """
+        删除指定文件的所有 spec 规则
+
+        Args:
+            project_id: 项目 ID
+            file_path: 文件路径
+        """
+        with self.db_manager.transaction() as conn:
+            cursor = conn.execute("SELECT id FROM files WHERE project_id = ? AND file_path = ?", (project_id, file_path))
+            file_record = cursor.fetchone()
+
+            if not file_record:
+                return
+
+            file_id = file_record["id"]
+
+            conn.execute("""
+                DELETE FROM spec_rules
+                WHERE project_id = ? AND file_id = ?
+            """, (project_id, file_id))
 
-        conn.commit()
         logger.info(f"删除了文件 {file_path} 的所有 spec 规则")
 
     def _row_to_specification_rule(self, row: sqlite3.Row) -> Optional[SpecificationRule]:
@@ -305,16 +418,28 @@ class SpecStorageManager:
         conn = self.db_manager.connect()
 
         cursor = conn.execute("""
-            SELECT DISTINCT tags FROM spec_rules WHERE project_id = ? AND tags IS NOT NULL
+            SELECT DISTINCT tag FROM spec_rule_tags WHERE project_id = ? ORDER BY tag
         """, (project_id,))
 
-        tags = set()
-        for row in cursor:
-            if row['tags']:
-                try:
-                    tag_list = json.loads(row['tags'])
-                    tags.update(tag_list)
-                except json.JSONDecodeError:
-                    continue
-
-        return sorted(list(tags))
\ No newline at end of file
+        return [row['tag'] for row in cursor]
+
+    def count_specs_by_tag(self, project_id: int) -> Dict[str, int]:
+        """
+        统计每个标签下的 spec 规则数量
+
+        Args:
+            project_id: 项目 ID
+
+        Returns:
+            标签到规则数量的映射，按标签排序
+        """
+        conn = self.db_manager.connect()
+
+        cursor = conn.execute("""
+            SELECT tag, COUNT(*) AS spec_count FROM spec_rule_tags
+            WHERE project_id = ?
+            GROUP BY tag
+            ORDER BY tag
+        """, (project_id,))
+
+        return {row['tag']: row['spec_count'] for row in cursor}
@@ -0,0 +1,235 @@
+"""
+存储写入器
+
+由单个后台线程持有写连接，串行执行所有提交给它的写操作。写操作按数量和时间
+合并为有界的批次，每个批次一个事务（一次提交），每个操作在自己的保存点中执行，
+单个操作失败只回滚该操作。读操作仍然使用各自线程的连接。
+"""
+
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+from .database import DatabaseManager
+
+logger = logging.getLogger(__name__)
+
+
+class StorageWriter:
+    """存储写入器"""
+
+    def __init__(
+        self,
+        db_manager: DatabaseManager,
+        max_batch_size: int = 500,
+        max_batch_delay: float = 0.05
+    ):
+        """
+        初始化存储写入器
+
+        Args:
+            db_manager: 数据库管理器
+            max_batch_size: 每个事务最多包含的写操作数
+            max_batch_delay: 批次中第一个写操作最多等待多久（秒）就提交
+        """
+        self.db_manager = db_manager
+        self.max_batch_size = max_batch_size
+        self.max_batch_delay = max_batch_delay
+
+        self._queue: Deque[Tuple[Callable[[], Any], Future]] = deque()
+        self._condition = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._running = False
+
+        # 统计信息
+        self.batches_committed = 0
+        self.operations_committed = 0
+        self.operations_failed = 0
+        self.last_batch_size = 0
+        self.last_commit_latency = 0.0
+        self.max_commit_latency = 0.0
+        self._total_commit_latency = 0.0
+        self.max_queue_depth = 0
+
+    @property
+    def is_running(self) -> bool:
+        """写入线程是否在运行"""
+        return self._running
+
+    def start(self) -> None:
+        """启动写入线程"""
+        if self._running:
+            return
+
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="canify-storage-writer", daemon=True)
+        self._thread.start()
+        logger.debug("存储写入线程启动")
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """
+        停止写入线程，已提交的写操作会先执行完
+
+        Args:
+            timeout: 等待线程结束的最长时间（秒）
+        """
+        if not self._running:
+            return
+
+        with self._condition:
+            self._running = False
+            self._condition.notify_all()
+
+        if self._thread:
+            self._thread.join(timeout=timeout)
+            self._thread = None
+        logger.debug("存储写入线程结束")
+
+    def submit(self, operation: Callable[[], Any]) -> Future:
+        """
+        提交写操作
+
+        写入线程未运行或在写入线程内部调用时直接在当前线程执行。
+
+        Args:
+            operation: 写操作，在写入线程的连接上执行
+
+        Returns:
+            写操作所在事务提交后完成的 Future
+        """
+        future: Future = Future()
+
+        if threading.current_thread() is not self._thread:
+            # 在锁内检查运行状态：stop() 之后入队的操作不会再被写入线程取出
+            with self._condition:
+                if self._running:
+                    self._queue.append((operation, future))
+                    self.max_queue_depth = max(self.max_queue_depth, len(self._queue))
+                    self._condition.notify_all()
+                    return future
+
+        try:
+            with self.db_manager.transaction():
+                future.set_result(operation())
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
+    def execute(self, operation: Callable[[], Any]) -> Any:
+        """
+        提交写操作并等待其提交
+
+        Args:
+            operation: 写操作
+
+        Returns:
+            写操作的返回值
+        """
+        return self.submit(operation).result()
+
+    @property
+    def queue_depth(self) -> int:
+        """等待执行的写操作数"""
+        with self._condition:
+            return len(self._queue)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        获取写入统计信息
+
+        Returns:
+            统计信息字典
+        """
+        with self._condition:
+            average = self._total_commit_latency / self.batches_committed if self.batches_committed else 0.0
+            return {
+                "queue_depth": len(self._queue),
+                "max_queue_depth": self.max_queue_depth,
+                "batches_committed": self.batches_committed,
+                "operations_committed": self.operations_committed,
+                "operations_failed": self.operations_failed,
+                "last_batch_size": self.last_batch_size,
+                "last_commit_latency_ms": round(self.last_commit_latency * 1000, 3),
+                "avg_commit_latency_ms": round(average * 1000, 3),
+                "max_commit_latency_ms": round(self.max_commit_latency * 1000, 3),
+            }
+
+    def _run(self) -> None:
+        """写入线程主循环"""
+        while True:
+            batch = self._next_batch()
+            if batch is None:
+                break
+            if batch:
+                self._commit_batch(batch)
+
+        self.db_manager.close()
+
+    def _next_batch(self) -> Optional[List[Tuple[Callable[[], Any], Future]]]:
+        """
+        取出下一个批次：等到有写操作后，继续收集直到达到数量上限或时间上限
+
+        Returns:
+            写操作批次，写入器已停止且队列为空时返回None
+        """
+        with self._condition:
+            while not self._queue:
+                if not self._running:
+                    return None
+                self._condition.wait(timeout=1)
+
+            deadline = time.monotonic() + self.max_batch_delay
+            while len(self._queue) < self.max_batch_size and self._running:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._condition.wait(timeout=remaining)
+
+            size = min(len(self._queue), self.max_batch_size)
+            return [self._queue.popleft() for _ in range(size)]
+
+    def _commit_batch(self, batch: List[Tuple[Callable[[], Any], Future]]) -> None:
+        """在一个事务中执行批次，提交后再完成各操作的 Future"""
+        outcomes: List[Tuple[Future, bool, Any]] = []
+        start_time = time.perf_counter()
+
+        try:
+            with self.db_manager.transaction():
+                for operation, future in batch:
+                    try:
+                        with self.db_manager.transaction():
+                            outcomes.append((future, True, operation()))
+                    except Exception as e:
+                        logger.error(f"写操作失败: {e}")
+                        outcomes.append((future, False, e))
+        except Exception as e:
+            logger.error(f"批次提交失败: {e}")
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            with self._condition:
+                self.operations_failed += len(batch)
+            return
+
+        latency = time.perf_counter() - start_time
+        failed = 0
+        for future, succeeded, value in outcomes:
+            if succeeded:
+                future.set_result(value)
+            else:
+                future.set_exception(value)
+                failed += 1
+
+        with self._condition:
+            self.batches_committed += 1
+            self.operations_committed += len(outcomes) - failed
+            self.operations_failed += failed
+            self.last_batch_size = len(batch)
+            self.last_commit_latency = latency
+            self.max_commit_latency = max(self.max_commit_latency, latency)
+            self._total_commit_latency += latency
+
+        logger.debug(f"提交写批次: {len(batch)} 个操作, 耗时 {latency * 1000:.1f}ms")
@@ -0,0 +1,475 @@
+"""
+符号索引
+
+符号表的进程内索引，SQLite 仍然是持久化存储。索引保存声明和引用的行数据，
+按实体ID、引用目标、文件和实体类型组织，验证器逐个查询实体时不再访问数据库。
+
+索引由 SymbolTableManager 在写事务提交后更新（见 DatabaseManager.on_commit），
+因此只反映已提交的数据，其他线程的读操作不会看到之后可能回滚的写入。
+
+目标实体不存在的引用（悬空引用）随声明的加入和移除增量维护，
+查询悬空引用及其数量时不需要遍历所有引用。
+"""
+
+import logging
+import threading
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from ..models import EntityDeclaration, EntityReference
+from .file_symbols import (
+    DeclarationRow, EntitySummary, ReferenceRow, ReferenceSummary, row_to_declaration, row_to_reference
+)
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class IndexedFile:
+    """索引中单个文件的符号"""
+
+    declarations: List[DeclarationRow] = field(default_factory=list)
+    references: List[ReferenceRow] = field(default_factory=list)
+
+
+class SymbolIndex:
+    """符号索引"""
+
+    def __init__(self):
+        """初始化符号索引"""
+        self._lock = threading.RLock()
+        self.project_id: Optional[int] = None
+
+        self._files: Dict[str, IndexedFile] = {}
+        self._declarations: Dict[str, DeclarationRow] = {}
+        self._declaration_files: Dict[str, str] = {}
+        self._references_by_target: Dict[str, List[ReferenceRow]] = {}
+        self._entities_by_type: Dict[str, Set[str]] = {}
+
+        # 没有声明的引用目标（按出现顺序）及指向它们的引用总数
+        self._unresolved_targets: Dict[str, None] = {}
+        self._unresolved_count = 0
+
+        # 实体声明对象缓存，实体所在文件更新时失效
+        self._models: Dict[str, EntityDeclaration] = {}
+
+    def is_loaded_for(self, project_id: int) -> bool:
+        """
+        索引是否已为指定项目加载
+
+        Args:
+            project_id: 项目ID
+
+        Returns:
+            是否已加载
+        """
+        return self.project_id == project_id
+
+    def load(
+        self,
+        project_id: int,
+        declarations: Iterable[Tuple[str, DeclarationRow]],
+        references: Iterable[Tuple[str, ReferenceRow]]
+    ) -> None:
+        """
+        用数据库中的全部符号重建索引
+
+        Args:
+            project_id: 项目ID
+            declarations: (文件路径, 声明行) 序列
+            references: (文件路径, 引用行) 序列
+        """
+        files: Dict[str, IndexedFile] = {}
+        for file_path, row in declarations:
+            files.setdefault(file_path, IndexedFile()).declarations.append(row)
+        for file_path, row in references:
+            files.setdefault(file_path, IndexedFile()).references.append(row)
+
+        with self._lock:
+            self.reset(project_id)
+            for file_path, entry in files.items():
+                self._add(file_path, entry)
+
+        logger.info(
+            f"符号索引加载完成: {len(self._declarations)} 个实体, "
+            f"{sum(len(refs) for refs in self._references_by_target.values())} 个引用"
+        )
+
+    def reset(self, project_id: int) -> None:
+        """
+        清空索引并绑定到指定项目
+
+        Args:
+            project_id: 项目ID
+        """
+        with self._lock:
+            self.project_id = project_id
+            self._files.clear()
+            self._declarations.clear()
+            self._declaration_files.clear()
+            self._references_by_target.clear()
+            self._entities_by_type.clear()
+            self._unresolved_targets.clear()
+            self._unresolved_count = 0
+            self._models.clear()
+
+    def add_file(
+        self,
+        file_path: str,
+        declarations: List[DeclarationRow],
+        references: List[ReferenceRow]
+    ) -> None:
+        """
+        加入文件的符号，替换该文件原有的符号
+
+        Args:
+            file_path: 文件路径
+            declarations: 声明行列表
+            references: 引用行列表
+        """
+        with self._lock:
+            self._remove(file_path)
+            self._add(file_path, IndexedFile(list(declarations), list(references)))
+
+    def remove_file(self, file_path: str) -> None:
+        """
+        移除文件的符号
+
+        Args:
+            file_path: 文件路径
+        """
+        with self._lock:
+            self._remove(file_path)
+
+    def get_declaration(self, entity_id: str) -> Optional[EntityDeclaration]:
+        """
+        根据实体ID获取实体声明
+
+        Args:
+            entity_id: 实体ID
+
+        Returns:
+            实体声明对象，如果不存在则返回None
+        """
+        with self._lock:
+            model = self._models.get(entity_id)
+            if model is None:
+                row = self._declarations.get(entity_id)
+                if row is None:
+                    return None
+                model = self._models[entity_id] = row_to_declaration(row)
+            return model
+
+    def get_declaration_file(self, entity_id: str) -> Optional[str]:
+        """
+        获取实体声明所在的位置文件
+
+        Args:
+            entity_id: 实体ID
+
+        Returns:
+            位置文件，实体不存在时返回None
+        """
+        with self._lock:
+            row = self._declarations.get(entity_id)
+            return row[5] if row else None
+
+    def get_entity_type(self, entity_id: str) -> Optional[str]:
+        """
+        获取实体的类型
+
+        Args:
+            entity_id: 实体ID
+
+        Returns:
+            实体类型，实体不存在时返回None
+        """
+        with self._lock:
+            row = self._declarations.get(entity_id)
+            return row[1] if row else None
+
+    def get_entity_types(self, entity_ids: Iterable[str]) -> Dict[str, str]:
+        """
+        批量获取实体类型
+
+        Args:
+            entity_ids: 实体ID
+
+        Returns:
+            实体ID到实体类型的映射，不存在的实体不在映射中
+        """
+        with self._lock:
+            declarations = self._declarations
+            return {
+                entity_id: declarations[entity_id][1]
+                for entity_id in entity_ids
+                if entity_id in declarations
+            }
+
+    def get_entity_locations(self) -> Dict[str, str]:
+        """
+        获取所有实体声明所在的位置文件
+
+        Returns:
+            实体ID到位置文件的映射
+        """
+        with self._lock:
+            return {entity_id: row[5] for entity_id, row in self._declarations.items()}
+
+    def get_entity_summaries(self) -> List[EntitySummary]:
+        """
+        获取所有实体的投影，不解码原始数据
+
+        Returns:
+            实体投影列表
+        """
+        with self._lock:
+            return [
+                EntitySummary(row[0], row[1], row[2], row[5], row[6], row[7])
+                for row in self._declarations.values()
+            ]
+
+    def get_reference_summaries(self) -> List[ReferenceSummary]:
+        """
+        获取所有引用的投影，不解压引用文本
+
+        Returns:
+            引用投影列表
+        """
+        with self._lock:
+            return [
+                ReferenceSummary(row[0], row[1], row[3], row[4], row[5])
+                for entry in self._files.values() for row in entry.references
+            ]
+
+    def get_declaration_rows(self) -> List[DeclarationRow]:
+        """
+        获取所有声明行的快照，调用方逐行转换为模型对象，不写入模型缓存
+
+        Returns:
+            声明行列表
+        """
+        with self._lock:
+            return list(self._declarations.values())
+
+    def get_reference_rows(self, dangling_only: bool = False) -> List[ReferenceRow]:
+        """
+        获取所有引用行的快照
+
+        Args:
+            dangling_only: 只返回目标实体不存在的引用
+
+        Returns:
+            引用行列表
+        """
+        with self._lock:
+            if dangling_only:
+                return [
+                    row for target_entity_id in self._unresolved_targets
+                    for row in self._references_by_target[target_entity_id]
+                ]
+            return [row for entry in self._files.values() for row in entry.references]
+
+    def count_unresolved(self) -> int:
+        """
+        获取悬空引用的数量
+
+        Returns:
+            目标实体不存在的引用数量
+        """
+        with self._lock:
+            return self._unresolved_count
+
+    def get_referrers(self, target_entity_id: str) -> List[ReferenceSummary]:
+        """
+        获取引用特定实体的所有引用的投影，不解压引用文本
+
+        Args:
+            target_entity_id: 目标实体ID
+
+        Returns:
+            引用投影列表
+        """
+        with self._lock:
+            return [
+                ReferenceSummary(row[0], row[1], row[3], row[4], row[5])
+                for row in self._references_by_target.get(target_entity_id, ())
+            ]
+
+    def get_transitive_referrers(self, entity_ids: Iterable[str], max_depth: Optional[int] = None) -> Set[str]:
+        """
+        沿引用关系反向广度优先遍历，获取直接或间接引用指定实体的实体
+
+        Args:
+            entity_ids: 起始实体ID
+            max_depth: 最大遍历层数，None 表示不限制
+
+        Returns:
+            引用方实体ID集合，不包含起始实体
+        """
+        with self._lock:
+            roots = set(entity_ids)
+            seen = set(roots)
+            frontier = list(roots)
+            depth = 0
+            while frontier and (max_depth is None or depth < max_depth):
+                depth += 1
+                next_frontier = []
+                for target_entity_id in frontier:
+                    for row in self._references_by_target.get(target_entity_id, ()):
+                        source_entity_id = row[0]
+                        if source_entity_id is not None and source_entity_id not in seen:
+                            seen.add(source_entity_id)
+                            next_frontier.append(source_entity_id)
+                frontier = next_frontier
+            return seen - roots
+
+    def get_entities_by_type(self, entity_type: str) -> List[EntityDeclaration]:
+        """
+        获取指定类型的所有实体声明
+
+        Args:
+            entity_type: 实体类型
+
+        Returns:
+            实体声明列表
+        """
+        with self._lock:
+            entity_ids = sorted(self._entities_by_type.get(entity_type, ()))
+            return [self.get_declaration(entity_id) for entity_id in entity_ids]
+
+    def get_references_by_target(self, target_entity_id: str) -> List[EntityReference]:
+        """
+        获取引用特定实体的所有引用
+
+        Args:
+            target_entity_id: 目标实体ID
+
+        Returns:
+            实体引用列表
+        """
+        with self._lock:
+            rows = list(self._references_by_target.get(target_entity_id, ()))
+            target_entity_type = self.get_entity_type(target_entity_id)
+        return [row_to_reference(row, target_entity_type) for row in rows]
+
+    def get_entities_by_file(self, file_path: str) -> List[EntityDeclaration]:
+        """
+        获取文件中声明的实体
+
+        Args:
+            file_path: 文件路径
+
+        Returns:
+            实体声明列表
+        """
+        with self._lock:
+            entry = self._files.get(file_path)
+            if entry is None:
+                return []
+            return [
+                self.get_declaration(row[0]) for row in entry.declarations
+                if self._declaration_files.get(row[0]) == file_path
+            ]
+
+    def get_references_by_file(self, file_path: str) -> List[EntityReference]:
+        """
+        获取文件中的实体引用
+
+        Args:
+            file_path: 文件路径
+
+        Returns:
+            实体引用列表
+        """
+        with self._lock:
+            entry = self._files.get(file_path)
+            rows = [(row, self.get_entity_type(row[1])) for row in entry.references] if entry else []
+        return [row_to_reference(row, target_entity_type) for row, target_entity_type in rows]
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        获取索引统计信息
+
+        Returns:
+            统计信息字典
+        """
+        with self._lock:
+            return {
+                "loaded": self.project_id is not None,
+                "files": len(self._files),
+                "entities": len(self._declarations),
+                "references": sum(len(refs) for refs in self._references_by_target.values()),
+                "unresolved_references": self._unresolved_count,
+                "entity_types": len(self._entities_by_type),
+                "cached_models": len(self._models),
+            }
+
+    def _add(self, file_path: str, entry: IndexedFile) -> None:
+        """加入文件符号，调用方需持有锁"""
+        if not entry.declarations and not entry.references:
+            return
+
+        self._files[file_path] = entry
+        for row in entry.declarations:
+            entity_id, entity_type = row[0], row[1]
+            self._unlink_declaration(entity_id)
+            self._declarations[entity_id] = row
+            self._declaration_files[entity_id] = file_path
+            self._entities_by_type.setdefault(entity_type, set()).add(entity_id)
+            self._mark_resolved(entity_id)
+        for row in entry.references:
+            self._references_by_target.setdefault(row[1], []).append(row)
+            if row[1] not in self._declarations:
+                self._unresolved_targets[row[1]] = None
+                self._unresolved_count += 1
+
+    def _remove(self, file_path: str) -> Optional[IndexedFile]:
+        """移除文件符号，调用方需持有锁"""
+        entry = self._files.pop(file_path, None)
+        if entry is None:
+            return None
+
+        for row in entry.declarations:
+            # 同一实体ID被其他文件重新声明时保留后者
+            if self._declaration_files.get(row[0]) == file_path:
+                self._unlink_declaration(row[0])
+        for row in entry.references:
+            references = self._references_by_target.get(row[1])
+            if references is None:
+                continue
+            try:
+                references.remove(row)
+            except ValueError:
+                continue
+            if row[1] not in self._declarations:
+                self._unresolved_count -= 1
+            if not references:
+                del self._references_by_target[row[1]]
+                self._unresolved_targets.pop(row[1], None)
+        return entry
+
+    def _unlink_declaration(self, entity_id: str) -> None:
+        """从各映射中移除实体声明，调用方需持有锁"""
+        row = self._declarations.pop(entity_id, None)
+        self._declaration_files.pop(entity_id, None)
+        self._models.pop(entity_id, None)
+        if row is None:
+            return
+        entity_ids = self._entities_by_type.get(row[1])
+        if entity_ids is not None:
+            entity_ids.discard(entity_id)
+            if not entity_ids:
+                del self._entities_by_type[row[1]]
+
+        # 指向该实体的引用变为悬空引用
+        references = self._references_by_target.get(entity_id)
+        if references:
+            self._unresolved_targets[entity_id] = None
+            self._unresolved_count += len(references)
+
+    def _mark_resolved(self, entity_id: str) -> None:
+        """实体被声明后，指向它的引用不再是悬空引用，调用方需持有锁"""
+        if entity_id in self._unresolved_targets:
+            del self._unresolved_targets[entity_id]
+            self._unresolved_count -= len(self._references_by_target.get(entity_id, ()))
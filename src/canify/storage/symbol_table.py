@@ -1,34 +1,182 @@
 """
 符号表管理器
 
-负责符号表的持久化存储、查询和增量更新。
+负责符号表的持久化存储、查询和增量更新。加载了进程内符号索引的项目，
+按实体ID、引用目标、文件和实体类型的查询直接由索引回答，模式查询由模式注册表回答。
 """
 
 import json
-import hashlib
 import logging
+import time
+from dataclasses import asdict, dataclass
 from datetime import datetime
 from pathlib import Path
-from typing import List, Dict, Any, Optional, Tuple
+from typing import List, Dict, Any, Callable, Iterable, Iterator, Optional, Set, Tuple
 import sqlite3
 
 from ..models import EntityDeclaration, EntityReference, Location
 from .database import DatabaseManager
+from .file_symbols import (
+    DeclarationRow, DependencyRow, EntitySummary, FileSymbols, ReferenceSummary, SchemaRow,
+    content_hash, row_to_declaration, row_to_reference, schema_to_row, search_text, unpack_text
+)
+from .schema_registry import SchemaRegistry
+from .spec_storage import SpecStorageManager
+from .symbol_index import SymbolIndex
 
 logger = logging.getLogger(__name__)
 
+# 迭代读取实体和引用时每次查询的行数
+ITER_CHUNK_SIZE = 1000
+
+# trigram 分词的最短可索引词长，更短的搜索词退化为 LIKE 扫描
+SEARCH_MIN_TERM_LENGTH = 3
+
+# 按文件归属的符号表及其文件ID列，替换文件符号时先按文件清理
+FILE_SCOPED_TABLES: Tuple[Tuple[str, str], ...] = (
+    ("symbol_dependencies", "dependent_file_id"),
+    ("entity_references", "file_id"),
+    ("entity_declarations", "file_id"),
+    ("entity_schemas", "file_id"),
+    ("spec_rules", "file_id"),
+)
+
+
+@dataclass
+class BulkInsertStats:
+    """批量写入的行数统计"""
+
+    files: int = 0
+    declarations: int = 0
+    references: int = 0
+    dependencies: int = 0
+    schemas: int = 0
+    specs: int = 0
+    elapsed_seconds: float = 0.0
+
+    @property
+    def rows(self) -> int:
+        """写入的符号行总数"""
+        return self.declarations + self.references + self.dependencies + self.schemas + self.specs
+
+    def add(self, other: "BulkInsertStats") -> None:
+        """累加另一次批量写入的统计"""
+        self.files += other.files
+        self.declarations += other.declarations
+        self.references += other.references
+        self.dependencies += other.dependencies
+        self.schemas += other.schemas
+        self.specs += other.specs
+        self.elapsed_seconds += other.elapsed_seconds
+
+    def to_dict(self) -> Dict[str, Any]:
+        """转换为可序列化的字典"""
+        result = asdict(self)
+        result["rows"] = self.rows
+        result["rows_per_second"] = round(self.rows / self.elapsed_seconds, 1) if self.elapsed_seconds > 0 else 0.0
+        return result
+
 
 class SymbolTableManager:
     """符号表管理器"""
 
-    def __init__(self, db_manager: DatabaseManager):
+    def __init__(self, db_manager: DatabaseManager, spec_storage: Optional[SpecStorageManager] = None):
         """
         初始化符号表管理器
 
         Args:
             db_manager: 数据库管理器实例
+            spec_storage: spec 存储管理器，替换文件符号时用于写入 spec 规则，None 时自动创建
         """
         self.db_manager = db_manager
+        self.spec_storage = spec_storage if spec_storage is not None else SpecStorageManager(db_manager)
+        self.index = SymbolIndex()
+        self.schemas = SchemaRegistry()
+
+        # 批量写入的累计统计
+        self.bulk_stats = BulkInsertStats()
+
+    def load_index(self, project_id: int) -> None:
+        """
+        从数据库加载项目的符号索引和模式注册表，之后的写入会同步更新两者
+
+        Args:
+            project_id: 项目ID
+        """
+        conn = self.db_manager.connect()
+        declarations = conn.execute(
+            """
+            SELECT f.file_path, ed.entity_id, ed.entity_type, ed.name, ed.raw_data, ed.source_code,
+                   ed.location_file, ed.location_line, ed.location_column
+            FROM entity_declarations ed
+            JOIN files f ON ed.file_id = f.id
+            WHERE ed.project_id = ?
+            ORDER BY ed.id
+            """,
+            (project_id,)
+        )
+        references = conn.execute(
+            """
+            SELECT f.file_path, er.source_entity_id, er.target_entity_id, er.reference_text,
+                   er.location_file, er.location_line, er.location_column
+            FROM entity_references er
+            JOIN files f ON er.file_id = f.id
+            WHERE er.project_id = ?
+            ORDER BY er.id
+            """,
+            (project_id,)
+        )
+        self.index.load(
+            project_id,
+            [(row[0], tuple(row[1:])) for row in declarations.fetchall()],
+            [(row[0], tuple(row[1:])) for row in references.fetchall()]
+        )
+
+        schemas = conn.execute(
+            """
+            SELECT f.file_path, es.schema_name, es.entity_type, es.schema_data
+            FROM entity_schemas es
+            JOIN files f ON es.file_id = f.id
+            WHERE es.project_id = ?
+            ORDER BY es.id
+            """,
+            (project_id,)
+        )
+        self.schemas.load(project_id, [tuple(row) for row in schemas.fetchall()])
+
+    def _index_remove_file(self, project_id: int, file_path: str) -> None:
+        """在事务提交后从索引中移除文件的符号"""
+        if not self.index.is_loaded_for(project_id):
+            return
+        self.db_manager.on_commit(lambda: self.index.remove_file(file_path))
+
+    def _index_add_file(self, project_id: int, symbols: FileSymbols) -> None:
+        """在事务提交后将文件的符号加入索引"""
+        if not self.index.is_loaded_for(project_id):
+            return
+        file_path = symbols.file_path
+        self.db_manager.on_commit(
+            lambda: self.index.add_file(file_path, symbols.declarations, symbols.references)
+        )
+
+    def _update_schemas(self, project_id: int, update: Callable[[SchemaRegistry], None]) -> None:
+        """在事务提交后更新模式注册表"""
+        if not self.schemas.is_loaded_for(project_id):
+            return
+        self.db_manager.on_commit(lambda: update(self.schemas))
+
+    def _use_index(self, project_id: int) -> bool:
+        """
+        读操作是否由符号索引回答
+
+        索引只反映已提交的数据。当前线程在写事务中时，本事务的写入尚未进入索引，
+        改为查询能看到这些写入的事务连接。
+        """
+        return self.index.is_loaded_for(project_id) and not self.db_manager.in_transaction()
+
+    def _use_schemas(self, project_id: int) -> bool:
+        """读操作是否由模式注册表回答，规则同 _use_index"""
+        return self.schemas.is_loaded_for(project_id) and not self.db_manager.in_transaction()
 
     def get_or_create_project(self, project_path: Path) -> int:
         """
@@ -53,11 +201,11 @@ class SymbolTableManager:
             return result["id"]
 
         # 创建新项目
-        cursor = conn.execute(
-            "INSERT INTO projects (project_path) VALUES (?)",
-            (str(project_path.absolute()),)
-        )
-        conn.commit()
+        with self.db_manager.transaction() as conn:
+            cursor = conn.execute(
+                "INSERT INTO projects (project_path) VALUES (?)",
+                (str(project_path.absolute()),)
+            )
 
         logger.info("创建项目记录: %s", project_path)
         return cursor.lastrowid  # type: ignore
@@ -69,20 +217,22 @@ class SymbolTableManager:
         Args:
             project_id: 项目ID
         """
-        conn = self.db_manager.connect()
         try:
             logger.warning(f"正在清除项目ID {project_id} 的所有数据...")
-            conn.execute("DELETE FROM entity_declarations WHERE project_id = ?", (project_id,))
-            conn.execute("DELETE FROM entity_references WHERE project_id = ?", (project_id,))
-            conn.execute("DELETE FROM entity_schemas WHERE project_id = ?", (project_id,))
-            conn.execute("DELETE FROM files WHERE project_id = ?", (project_id,))
-            # 注意：spec_definitions 和 symbol_dependencies 也可能需要清理
-            # conn.execute("DELETE FROM spec_definitions WHERE project_id = ?", (project_id,))
-            # conn.execute("DELETE FROM symbol_dependencies WHERE project_id = ?", (project_id,))
-            conn.commit()
+            with self.db_manager.transaction() as conn:
+                conn.execute("DELETE FROM entity_declarations WHERE project_id = ?", (project_id,))
+                conn.execute("DELETE FROM entity_references WHERE project_id = ?", (project_id,))
+                conn.execute("DELETE FROM entity_schemas WHERE project_id = ?", (project_id,))
+                conn.execute("DELETE FROM files WHERE project_id = ?", (project_id,))
+                # 注意：spec_definitions 和 symbol_dependencies 也可能需要清理
+                # conn.execute("DELETE FROM spec_definitions WHERE project_id = ?", (project_id,))
+                # conn.execute("DELETE FROM symbol_dependencies WHERE project_id = ?", (project_id,))
+                if self.index.is_loaded_for(project_id):
+                    self.db_manager.on_commit(lambda: self.index.reset(project_id))
+                if self.schemas.is_loaded_for(project_id):
+                    self.db_manager.on_commit(lambda: self.schemas.reset(project_id))
             logger.info(f"项目ID {project_id} 的数据已清除。")
         except Exception as e:
-            conn.rollback()
             logger.error(f"清除项目数据失败: {e}")
             raise
 
@@ -120,20 +270,18 @@ class SymbolTableManager:
             status: 新的状态 (e.g., 'error', 'parsed')
             error_message: 相关的错误信息
         """
-        conn = self.db_manager.connect()
         try:
-            conn.execute(
-                """
-                UPDATE files 
-                SET status = ?, error_message = ?, parsed_at = ?
-                WHERE project_id = ? AND file_path = ?
-                """,
-                (status, error_message, datetime.now().isoformat(), project_id, file_path)
-            )
-            conn.commit()
+            with self.db_manager.transaction() as conn:
+                conn.execute(
+                    """
+                    UPDATE files 
+                    SET status = ?, error_message = ?, parsed_at = ?
+                    WHERE project_id = ? AND file_path = ?
+                    """,
+                    (status, error_message, datetime.now().isoformat(), project_id, file_path)
+                )
             logger.info(f"文件状态已更新: {file_path} -> {status}")
         except Exception as e:
-            conn.rollback()
             logger.error(f"更新文件状态失败: {e}")
             raise
 
@@ -147,7 +295,87 @@ class SymbolTableManager:
         Returns:
             文件哈希值
         """
-        return hashlib.sha256(content.encode('utf-8')).hexdigest()
+        return content_hash(content)
+
+    def get_file_states(self, project_id: int) -> Dict[str, Dict[str, Any]]:
+        """
+        获取项目中所有文件的变更检测信息
+
+        Args:
+            project_id: 项目ID
+
+        Returns:
+            文件路径到 {file_hash, mtime_ns, file_size, status} 的映射
+        """
+        conn = self.db_manager.connect()
+        cursor = conn.execute(
+            """
+            SELECT file_path, file_hash, mtime_ns, file_size, status
+            FROM files
+            WHERE project_id = ?
+            """,
+            (project_id,)
+        )
+        return {
+            row["file_path"]: {
+                "file_hash": row["file_hash"],
+                "mtime_ns": row["mtime_ns"],
+                "file_size": row["file_size"],
+                "status": row["status"],
+            }
+            for row in cursor
+        }
+
+    def update_file_metadata(
+        self,
+        project_id: int,
+        file_path: str,
+        file_hash: str,
+        mtime_ns: Optional[int],
+        file_size: Optional[int]
+    ) -> None:
+        """
+        记录文件的内容哈希和文件系统状态，文件记录不存在时创建
+
+        Args:
+            project_id: 项目ID
+            file_path: 文件路径
+            file_hash: 内容哈希
+            mtime_ns: 修改时间（纳秒）
+            file_size: 文件大小（字节）
+        """
+        with self.db_manager.transaction() as conn:
+            file_id = self._get_or_create_file_id(conn, project_id, file_path)
+            conn.execute(
+                """
+                UPDATE files
+                SET file_hash = ?, mtime_ns = ?, file_size = ?, last_modified = ?
+                WHERE id = ?
+                """,
+                (file_hash, mtime_ns, file_size, datetime.now().isoformat(), file_id)
+            )
+
+    def delete_file(self, project_id: int, file_path: str) -> None:
+        """
+        删除文件记录，级联删除其所有声明、引用、模式、spec 规则和依赖关系
+
+        Args:
+            project_id: 项目ID
+            file_path: 文件路径
+        """
+        try:
+            with self.db_manager.transaction() as conn:
+                conn.execute(
+                    "DELETE FROM files WHERE project_id = ? AND file_path = ?",
+                    (project_id, file_path)
+                )
+                self._index_remove_file(project_id, file_path)
+                self._update_schemas(project_id, lambda registry: registry.remove_file(file_path))
+            logger.debug(f"删除文件记录: {file_path}")
+
+        except Exception as e:
+            logger.error(f"删除文件记录失败: {e}")
+            raise
 
     def delete_symbols_by_file(self, project_id: int, file_path: str) -> None:
         """
@@ -157,53 +385,69 @@ class SymbolTableManager:
             project_id: 项目ID
             file_path: 文件路径
         """
-        conn = self.db_manager.connect()
-
         try:
-            # 获取文件ID
-            cursor = conn.execute(
-                "SELECT id FROM files WHERE project_id = ? AND file_path = ?",
-                (project_id, file_path)
-            )
-            file_record = cursor.fetchone()
+            with self.db_manager.transaction() as conn:
+                # 获取文件ID
+                cursor = conn.execute(
+                    "SELECT id FROM files WHERE project_id = ? AND file_path = ?",
+                    (project_id, file_path)
+                )
+                file_record = cursor.fetchone()
 
-            if not file_record:
-                return
+                if not file_record:
+                    return
 
-            file_id = file_record["id"]
+                file_id = file_record["id"]
 
-            # 删除依赖关系
-            conn.execute(
-                "DELETE FROM symbol_dependencies WHERE dependent_file_id = ?",
-                (file_id,)
-            )
+                # 删除依赖关系
+                conn.execute(
+                    "DELETE FROM symbol_dependencies WHERE dependent_file_id = ?",
+                    (file_id,)
+                )
 
-            # 删除实体引用
-            conn.execute(
-                "DELETE FROM entity_references WHERE file_id = ?",
-                (file_id,)
-            )
+                # 删除实体引用
+                conn.execute(
+                    "DELETE FROM entity_references WHERE file_id = ?",
+                    (file_id,)
+                )
 
-            # 删除实体声明
-            conn.execute(
-                "DELETE FROM entity_declarations WHERE file_id = ?",
-                (file_id,)
-            )
+                # 删除实体声明
+                conn.execute(
+                    "DELETE FROM entity_declarations WHERE file_id = ?",
+                    (file_id,)
+                )
 
-            # 更新文件状态
-            conn.execute(
-                "UPDATE files SET status = 'pending', parsed_at = NULL WHERE id = ?",
-                (file_id,)
-            )
+                # 更新文件状态
+                conn.execute(
+                    "UPDATE files SET status = 'pending', parsed_at = NULL WHERE id = ?",
+                    (file_id,)
+                )
+
+                self._index_remove_file(project_id, file_path)
 
-            conn.commit()
             logger.debug(f"删除文件 {file_path} 的所有符号")
 
         except Exception as e:
-            conn.rollback()
             logger.error(f"删除文件符号失败: {e}")
             raise
 
+    def delete_dependencies_by_file(self, project_id: int, file_path: str) -> None:
+        """
+        删除指定文件的符号依赖关系
+
+        Args:
+            project_id: 项目ID
+            file_path: 文件路径
+        """
+        with self.db_manager.transaction() as conn:
+            conn.execute(
+                """
+                DELETE FROM symbol_dependencies
+                WHERE dependent_file_id = (SELECT id FROM files WHERE project_id = ? AND file_path = ?)
+                """,
+                (project_id, file_path)
+            )
+
     def insert_symbols(
         self,
         project_id: int,
@@ -220,145 +464,637 @@ class SymbolTableManager:
             declarations: 实体声明列表
             references: 实体引用列表
         """
-        conn = self.db_manager.connect()
+        self.insert_file_symbols(
+            project_id, FileSymbols.from_models(file_path, declarations, references)
+        )
 
+    def insert_file_symbols(self, project_id: int, symbols: FileSymbols) -> None:
+        """
+        插入单个文件的声明和引用（行格式）
+
+        Args:
+            project_id: 项目ID
+            symbols: 文件符号数据
+        """
         try:
-            # 获取或创建文件记录
-            file_record = self.get_file_record(project_id, file_path)
-            if file_record:
-                file_id = file_record["id"]
-            else:
-                cursor = conn.execute(
-                    """
-                    INSERT INTO files (project_id, file_path, file_hash, last_modified, status)
-                    VALUES (?, ?, ?, ?, 'parsing')
-                    """,
-                    (project_id, file_path, "", datetime.now().isoformat())
-                )
-                file_id = cursor.lastrowid
+            with self.db_manager.transaction() as conn:
+                file_id = self._get_or_create_file_id(conn, project_id, symbols.file_path)
 
-            # 插入实体声明
-            for declaration in declarations:
-                conn.execute(
+                # 插入实体声明
+                conn.executemany(
                     """
                     INSERT INTO entity_declarations (
                         project_id, file_id, entity_id, entity_type, name,
                         raw_data, source_code, location_file, location_line, location_column
                     ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
                     """,
-                    (
-                        project_id, file_id, declaration.entity_id, declaration.entity_type,
-                        declaration.name, json.dumps(declaration.raw_data, ensure_ascii=False),
-                        declaration.source_code, str(declaration.location.file_path),
-                        declaration.location.start_line, declaration.location.start_column or 1
-                    )
+                    [(project_id, file_id, *row) for row in symbols.declarations]
                 )
+                self._insert_search_rows(conn, project_id, symbols.declarations)
 
-            # 插入实体引用
-            for reference in references:
-                conn.execute(
+                # 插入实体引用
+                conn.executemany(
                     """
                     INSERT INTO entity_references (
                         project_id, file_id, source_entity_id, target_entity_id,
                         reference_text, location_file, location_line, location_column
                     ) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
                     """,
-                    (
-                        project_id, file_id, reference.source_entity_id,
-                        reference.target_entity_id, reference.context_text,
-                        str(reference.location.file_path), reference.location.start_line,
-                        reference.location.start_column or 1
-                    )
+                    [(project_id, file_id, *row) for row in symbols.references]
                 )
 
-            # 更新文件状态
+                # 插入依赖关系
+                self._insert_dependency_rows(conn, project_id, file_id, symbols.dependencies)
+
+                # 更新文件状态
+                conn.execute(
+                    "UPDATE files SET status = 'parsed', parsed_at = ? WHERE id = ?",
+                    (datetime.now().isoformat(), file_id)
+                )
+
+                self._index_add_file(project_id, symbols)
+
+            logger.debug(
+                f"插入 {len(symbols.declarations)} 个实体声明和 {len(symbols.references)} 个实体引用到文件 {symbols.file_path}"
+            )
+
+        except Exception as e:
+            logger.error(f"插入符号失败: {e}")
+            raise
+
+    def replace_file_symbols(self, project_id: int, symbols: FileSymbols) -> None:
+        """
+        原子地替换单个文件的全部符号
+
+        在一个事务中删除文件原有的声明、引用、依赖、模式和 spec 规则，写入新的符号，
+        并更新文件元数据和状态，只提交一次。其他连接只会看到替换前或替换后的状态，
+        不会看到文件暂时没有符号的中间状态。
+
+        Args:
+            project_id: 项目ID
+            symbols: 文件符号数据
+        """
+        try:
+            with self.db_manager.transaction() as conn:
+                file_ids = self.db_manager.get_or_create_file_ids(conn, project_id, [symbols.file_path])
+                stats = self._replace_rows(conn, project_id, [symbols], file_ids)
+
+            logger.debug(f"替换文件符号: {symbols.file_path} ({stats.rows} 行)")
+
+        except Exception as e:
+            logger.error(f"替换文件符号失败 {symbols.file_path}: {e}")
+            raise
+
+    def bulk_insert_symbols(self, project_id: int, files: List[FileSymbols]) -> BulkInsertStats:
+        """
+        在一个事务中批量写入多个文件的符号
+
+        文件ID一次性解析，声明、引用、依赖、模式和 spec 规则各用一次 executemany 写入，
+        参数元组预先构建。这些文件已有的符号先被删除；
+        文件元数据一并更新，文件状态标记为已解析。
+
+        Args:
+            project_id: 项目ID
+            files: 文件符号数据列表
+
+        Returns:
+            本次写入的行数统计
+        """
+        if not files:
+            return BulkInsertStats()
+
+        start_time = time.perf_counter()
+        with self.db_manager.transaction() as conn:
+            file_ids = self.db_manager.get_or_create_file_ids(
+                conn, project_id, [symbols.file_path for symbols in files]
+            )
+            stats = self._replace_rows(conn, project_id, files, file_ids)
+
+        stats.elapsed_seconds = time.perf_counter() - start_time
+        self.bulk_stats.add(stats)
+
+        logger.debug(
+            f"批量写入 {stats.files} 个文件: {stats.rows} 行, 耗时 {stats.elapsed_seconds * 1000:.1f}ms"
+        )
+        return stats
+
+    def _replace_rows(
+        self,
+        conn: sqlite3.Connection,
+        project_id: int,
+        files: List[FileSymbols],
+        file_ids: Dict[str, int]
+    ) -> BulkInsertStats:
+        """
+        在当前事务中用新的符号替换文件原有的符号
+
+        Args:
+            conn: 数据库连接
+            project_id: 项目ID
+            files: 文件符号数据列表
+            file_ids: 文件路径到文件ID的映射
+
+        Returns:
+            写入的行数统计
+        """
+        id_list = json.dumps([file_ids[symbols.file_path] for symbols in files])
+        for table, column in FILE_SCOPED_TABLES:
             conn.execute(
-                "UPDATE files SET status = 'parsed', parsed_at = ? WHERE id = ?",
-                (datetime.now().isoformat(), file_id)
+                f"DELETE FROM {table} WHERE {column} IN (SELECT value FROM json_each(?))",
+                (id_list,)
+            )
+
+        declaration_params = [
+            (project_id, file_ids[symbols.file_path], *row)
+            for symbols in files for row in symbols.declarations
+        ]
+        reference_params = [
+            (project_id, file_ids[symbols.file_path], *row)
+            for symbols in files for row in symbols.references
+        ]
+        dependency_params = [
+            (project_id, file_ids[symbols.file_path], *row)
+            for symbols in files for row in symbols.dependencies
+        ]
+        schema_params = [
+            (project_id, file_ids[symbols.file_path], *row)
+            for symbols in files for row in symbols.schemas
+        ]
+        spec_params = [
+            self.spec_storage.spec_to_params(project_id, file_ids[symbols.file_path], spec)
+            for symbols in files for spec in symbols.specs
+        ]
+
+        conn.executemany(
+            """
+            INSERT INTO entity_declarations (
+                project_id, file_id, entity_id, entity_type, name,
+                raw_data, source_code, location_file, location_line, location_column
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """,
+            declaration_params
+        )
+        self._insert_search_rows(conn, project_id, [row for symbols in files for row in symbols.declarations])
+        conn.executemany(
+            """
+            INSERT INTO entity_references (
+                project_id, file_id, source_entity_id, target_entity_id,
+                reference_text, location_file, location_line, location_column
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            """,
+            reference_params
+        )
+        conn.executemany(
+            """
+            INSERT INTO symbol_dependencies (
+                project_id, dependent_file_id, depended_symbol_type, depended_symbol_id, dependency_type
+            ) VALUES (?, ?, ?, ?, ?)
+            """,
+            dependency_params
+        )
+        conn.executemany(
+            """
+            INSERT OR REPLACE INTO entity_schemas (
+                project_id, file_id, schema_name, entity_type,
+                schema_data, source_code, file_path, line_number
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            """,
+            schema_params
+        )
+        self.spec_storage.insert_spec_rows(conn, spec_params)
+
+        # 更新文件元数据和状态
+        now = datetime.now().isoformat()
+        conn.executemany(
+            """
+            UPDATE files
+            SET file_hash = ?, mtime_ns = ?, file_size = ?, last_modified = ?,
+                status = 'parsed', parsed_at = ?, error_message = NULL
+            WHERE id = ?
+            """,
+            [
+                (symbols.file_hash, symbols.mtime_ns, symbols.file_size, now, now, file_ids[symbols.file_path])
+                for symbols in files
+            ]
+        )
+
+        for symbols in files:
+            self._index_add_file(project_id, symbols)
+
+        def replace_schemas(registry: SchemaRegistry) -> None:
+            for symbols in files:
+                if symbols.schemas or registry.has_file(symbols.file_path):
+                    registry.add_schemas(symbols.file_path, symbols.schemas, replace=True)
+        self._update_schemas(project_id, replace_schemas)
+
+        return BulkInsertStats(
+            files=len(files),
+            declarations=len(declaration_params),
+            references=len(reference_params),
+            dependencies=len(dependency_params),
+            schemas=len(schema_params),
+            specs=len(spec_params),
+        )
+
+    def _insert_search_rows(self, conn: sqlite3.Connection, project_id: int, declarations: List[DeclarationRow]) -> None:
+        """为刚写入的实体声明建立全文搜索索引行，删除由触发器处理"""
+        conn.executemany(
+            """
+            INSERT INTO entity_search (rowid, project_id, entity_id, entity_type, name, field_values)
+            SELECT id, project_id, entity_id, entity_type, name, ?
+            FROM entity_declarations
+            WHERE project_id = ? AND entity_id = ?
+            """,
+            [(search_text(row[3]), project_id, row[0]) for row in declarations]
+        )
+
+    def insert_dependencies(self, project_id: int, file_path: str, dependencies: List[DependencyRow]) -> None:
+        """
+        插入文件的符号依赖关系
+
+        Args:
+            project_id: 项目ID
+            file_path: 文件路径
+            dependencies: 依赖关系（行格式）
+        """
+        if not dependencies:
+            return
+
+        try:
+            with self.db_manager.transaction() as conn:
+                file_id = self._get_or_create_file_id(conn, project_id, file_path)
+                self._insert_dependency_rows(conn, project_id, file_id, dependencies)
+
+        except Exception as e:
+            logger.error(f"插入依赖关系失败: {e}")
+            raise
+
+    def _insert_dependency_rows(
+        self,
+        conn: sqlite3.Connection,
+        project_id: int,
+        file_id: int,
+        dependencies: List[DependencyRow]
+    ) -> None:
+        """在给定连接上插入依赖关系行"""
+        conn.executemany(
+            """
+            INSERT INTO symbol_dependencies (
+                project_id, dependent_file_id, depended_symbol_type, depended_symbol_id, dependency_type
+            ) VALUES (?, ?, ?, ?, ?)
+            """,
+            [(project_id, file_id, *row) for row in dependencies]
+        )
+
+    def get_dependent_files(self, project_id: int, symbols: Iterable[Tuple[str, str]]) -> Set[str]:
+        """
+        查询依赖给定符号的文件
+
+        Args:
+            project_id: 项目ID
+            symbols: (符号类型, 符号ID) 列表
+
+        Returns:
+            依赖这些符号的文件路径集合
+        """
+        symbols_by_type: Dict[str, Set[str]] = {}
+        for symbol_type, symbol_id in symbols:
+            symbols_by_type.setdefault(symbol_type, set()).add(symbol_id)
+
+        conn = self.db_manager.connect()
+        dependent_files: Set[str] = set()
+        for symbol_type, symbol_ids in symbols_by_type.items():
+            cursor = conn.execute(
+                """
+                SELECT DISTINCT f.file_path
+                FROM symbol_dependencies sd
+                JOIN files f ON sd.dependent_file_id = f.id
+                WHERE sd.project_id = ? AND sd.depended_symbol_type = ?
+                  AND sd.depended_symbol_id IN (SELECT value FROM json_each(?))
+                """,
+                (project_id, symbol_type, json.dumps(sorted(symbol_ids)))
             )
+            dependent_files.update(row["file_path"] for row in cursor)
+
+        return dependent_files
+
+    def get_file_symbol_state(self, project_id: int, file_path: str) -> Dict[str, Dict[str, str]]:
+        """
+        获取文件提供的符号及其内容摘要，用于比较文件更新前后的变化
+
+        Args:
+            project_id: 项目ID
+            file_path: 文件路径
+
+        Returns:
+            {"entities": {实体ID: 实体类型}, "entity_data": {实体ID: 数据摘要},
+             "schemas": {实体类型: 模式数据}}
+        """
+        conn = self.db_manager.connect()
+        state: Dict[str, Dict[str, str]] = {"entities": {}, "entity_data": {}, "schemas": {}}
+
+        cursor = conn.execute(
+            """
+            SELECT ed.entity_id, ed.entity_type, ed.name, ed.raw_data
+            FROM entity_declarations ed
+            JOIN files f ON ed.file_id = f.id
+            WHERE f.project_id = ? AND f.file_path = ?
+            """,
+            (project_id, file_path)
+        )
+        for row in cursor:
+            state["entities"][row["entity_id"]] = row["entity_type"]
+            state["entity_data"][row["entity_id"]] = content_hash(f"{row['name']}\0{unpack_text(row['raw_data'])}")
+
+        cursor = conn.execute(
+            """
+            SELECT es.entity_type, es.schema_data
+            FROM entity_schemas es
+            JOIN files f ON es.file_id = f.id
+            WHERE f.project_id = ? AND f.file_path = ?
+            """,
+            (project_id, file_path)
+        )
+        for row in cursor:
+            state["schemas"][row["entity_type"]] = row["schema_data"]
+
+        return state
+
+    def _get_or_create_file_id(self, conn: sqlite3.Connection, project_id: int, file_path: str) -> int:
+        """
+        获取文件记录ID，不存在时创建
+
+        Args:
+            conn: 数据库连接
+            project_id: 项目ID
+            file_path: 文件路径
+
+        Returns:
+            文件ID
+        """
+        cursor = conn.execute(
+            "SELECT id FROM files WHERE project_id = ? AND file_path = ?",
+            (project_id, file_path)
+        )
+        file_record = cursor.fetchone()
+        if file_record:
+            return file_record["id"]
+
+        cursor = conn.execute(
+            """
+            INSERT INTO files (project_id, file_path, file_hash, last_modified, status)
+            VALUES (?, ?, ?, ?, 'parsing')
+            """,
+            (project_id, file_path, "", datetime.now().isoformat())
+        )
+        return cursor.lastrowid  # type: ignore
+
+    def get_entity_by_id(self, project_id: int, entity_id: str) -> Optional[EntityDeclaration]:
+        """
+        根据实体ID获取实体声明
+
+        Args:
+            project_id: 项目ID
+            entity_id: 实体ID
+
+        Returns:
+            实体声明对象，如果不存在则返回None
+        """
+        if self._use_index(project_id):
+            return self.index.get_declaration(entity_id)
+
+        conn = self.db_manager.connect()
+        cursor = conn.execute(
+            """
+            SELECT entity_id, entity_type, name, raw_data, source_code,
+                   location_file, location_line, location_column
+            FROM entity_declarations
+            WHERE project_id = ? AND entity_id = ?
+            """,
+            (project_id, entity_id)
+        )
+
+        result = cursor.fetchone()
+        if not result:
+            return None
+
+        return self._row_to_entity_declaration(result)
+
+    def get_entities_by_type(self, project_id: int, entity_type: str) -> List[EntityDeclaration]:
+        """
+        根据实体类型获取实体声明列表
+
+        Args:
+            project_id: 项目ID
+            entity_type: 实体类型
+
+        Returns:
+            实体声明列表
+        """
+        if self._use_index(project_id):
+            return self.index.get_entities_by_type(entity_type)
+
+        conn = self.db_manager.connect()
+        cursor = conn.execute(
+            """
+            SELECT entity_id, entity_type, name, raw_data, source_code,
+                   location_file, location_line, location_column
+            FROM entity_declarations
+            WHERE project_id = ? AND entity_type = ?
+            """,
+            (project_id, entity_type)
+        )
+
+        return [self._row_to_entity_declaration(row) for row in cursor.fetchall()]
+
+    def get_all_entities(self, project_id: int) -> List[EntityDeclaration]:
+        """
+        获取项目中的所有实体声明
+
+        实体很多时使用 iter_entities 逐个处理，避免同时持有所有实体对象。
+
+        Args:
+            project_id: 项目ID
+
+        Returns:
+            实体声明列表
+        """
+        return list(self.iter_entities(project_id))
+
+    def iter_entities(
+        self,
+        project_id: int,
+        path_prefix: Optional[str] = None,
+        chunk_size: int = ITER_CHUNK_SIZE
+    ) -> Iterator[EntityDeclaration]:
+        """
+        逐个产出项目中的实体声明
+
+        数据库按主键分块读取，每次最多 chunk_size 行；加载了符号索引时遍历索引中的行。
+        实体对象在产出时才创建，不进入索引的模型缓存，内存占用与实体总数无关。
+
+        Args:
+            project_id: 项目ID
+            path_prefix: 只产出位置文件以该前缀开头的实体，None 表示所有实体
+            chunk_size: 每次查询读取的行数
 
-            conn.commit()
-            logger.debug(f"插入 {len(declarations)} 个实体声明和 {len(references)} 个实体引用到文件 {file_path}")
+        Yields:
+            实体声明
+        """
+        if self._use_index(project_id):
+            for row in self.index.get_declaration_rows():
+                if path_prefix is None or row[5].startswith(path_prefix):
+                    yield row_to_declaration(row)
+            return
 
-        except Exception as e:
-            conn.rollback()
-            logger.error(f"插入符号失败: {e}")
-            raise
+        for row in self._iter_chunks(
+            """
+            SELECT id, entity_id, entity_type, name, raw_data, source_code,
+                   location_file, location_line, location_column
+            FROM entity_declarations
+            WHERE project_id = ? AND id > ? {prefix}
+            ORDER BY id
+            LIMIT ?
+            """,
+            project_id, path_prefix, chunk_size
+        ):
+            yield self._row_to_entity_declaration(row)
 
-    def get_entity_by_id(self, project_id: int, entity_id: str) -> Optional[EntityDeclaration]:
+    def get_entities_by_file(self, project_id: int, file_path: str) -> List[EntityDeclaration]:
         """
-        根据实体ID获取实体声明
+        获取文件中声明的实体
 
         Args:
             project_id: 项目ID
-            entity_id: 实体ID
+            file_path: 文件路径
 
         Returns:
-            实体声明对象，如果不存在则返回None
+            实体声明列表
         """
+        if self._use_index(project_id):
+            return self.index.get_entities_by_file(file_path)
+
         conn = self.db_manager.connect()
         cursor = conn.execute(
             """
-            SELECT entity_id, entity_type, name, raw_data, source_code,
-                   location_file, location_line, location_column
-            FROM entity_declarations
-            WHERE project_id = ? AND entity_id = ?
+            SELECT ed.entity_id, ed.entity_type, ed.name, ed.raw_data, ed.source_code,
+                   ed.location_file, ed.location_line, ed.location_column
+            FROM entity_declarations ed
+            JOIN files f ON ed.file_id = f.id
+            WHERE f.project_id = ? AND f.file_path = ?
             """,
-            (project_id, entity_id)
+            (project_id, file_path)
         )
 
-        result = cursor.fetchone()
-        if not result:
-            return None
-
-        return self._row_to_entity_declaration(result)
+        return [self._row_to_entity_declaration(row) for row in cursor.fetchall()]
 
-    def get_entities_by_type(self, project_id: int, entity_type: str) -> List[EntityDeclaration]:
+    def get_entity_summaries(self, project_id: int) -> List[EntitySummary]:
         """
-        根据实体类型获取实体声明列表
+        获取项目中所有实体的ID、类型、名称和位置，不读取原始数据和源代码
 
         Args:
             project_id: 项目ID
-            entity_type: 实体类型
 
         Returns:
-            实体声明列表
+            实体投影列表
         """
+        if self._use_index(project_id):
+            return self.index.get_entity_summaries()
+
         conn = self.db_manager.connect()
         cursor = conn.execute(
             """
-            SELECT entity_id, entity_type, name, raw_data, source_code,
-                   location_file, location_line, location_column
+            SELECT entity_id, entity_type, name, location_file, location_line, location_column
             FROM entity_declarations
-            WHERE project_id = ? AND entity_type = ?
+            WHERE project_id = ?
             """,
-            (project_id, entity_type)
+            (project_id,)
         )
 
-        return [self._row_to_entity_declaration(row) for row in cursor.fetchall()]
+        return [EntitySummary(*row) for row in cursor.fetchall()]
 
-    def get_all_entities(self, project_id: int) -> List[EntityDeclaration]:
+    def count_entities(self, project_id: int) -> int:
         """
-        获取项目中的所有实体声明
+        统计项目中的实体数量
 
         Args:
             project_id: 项目ID
 
         Returns:
-            实体声明列表
+            实体数量
         """
+        if self._use_index(project_id):
+            return self.index.get_stats()["entities"]
+
         conn = self.db_manager.connect()
         cursor = conn.execute(
-            """
-            SELECT entity_id, entity_type, name, raw_data, source_code,
-                   location_file, location_line, location_column
-            FROM entity_declarations
-            WHERE project_id = ?
-            """,
+            "SELECT COUNT(*) FROM entity_declarations WHERE project_id = ?",
             (project_id,)
         )
+        return cursor.fetchone()[0]
 
-        return [self._row_to_entity_declaration(row) for row in cursor.fetchall()]
+    def search_entities(
+        self,
+        project_id: int,
+        query: str,
+        entity_type: Optional[str] = None,
+        limit: int = 20,
+        offset: int = 0
+    ) -> List[EntitySummary]:
+        """
+        在实体ID、名称和字段值中搜索子串
+
+        查询按空白拆分为多个词，所有词都需要出现（不区分大小写）。不短于 3 个字符的词
+        通过 trigram 全文索引匹配，更短的词在候选行上逐行比较；只有短词时退化为扫描。
+        结果按声明写入顺序返回而不按相关度排序：常见词可能匹配大量实体，
+        按相关度排序需要先计算并排序全部匹配，按写入顺序则取满一页即可停止。
+
+        Args:
+            project_id: 项目ID
+            query: 搜索文本
+            entity_type: 只搜索该类型的实体
+            limit: 返回的最大数量
+            offset: 跳过的结果数量，用于分页
+
+        Returns:
+            实体投影列表
+        """
+        terms = query.split()
+        if not terms:
+            return []
+
+        indexed = [term for term in terms if len(term) >= SEARCH_MIN_TERM_LENGTH]
+        scanned = [term for term in terms if len(term) < SEARCH_MIN_TERM_LENGTH]
+
+        conditions = ["entity_search.project_id = ?"]
+        params: List[Any] = [project_id]
+        if indexed:
+            conditions.append("entity_search MATCH ?")
+            params.append(" AND ".join('"' + term.replace('"', '""') + '"' for term in indexed))
+        for term in scanned:
+            pattern = "%" + term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+            conditions.append(
+                "(entity_search.entity_id LIKE ? ESCAPE '\\' OR entity_search.name LIKE ? ESCAPE '\\' "
+                "OR entity_search.field_values LIKE ? ESCAPE '\\')"
+            )
+            params.extend([pattern] * 3)
+        if entity_type is not None:
+            conditions.append("entity_search.entity_type = ?")
+            params.append(entity_type)
+
+        conn = self.db_manager.connect()
+        cursor = conn.execute(
+            f"""
+            SELECT ed.entity_id, ed.entity_type, ed.name, ed.location_file, ed.location_line, ed.location_column
+            FROM entity_search
+            JOIN entity_declarations ed ON ed.id = entity_search.rowid
+            WHERE {" AND ".join(conditions)}
+            ORDER BY entity_search.rowid
+            LIMIT ? OFFSET ?
+            """,
+            (*params, limit, offset)
+        )
+        return [EntitySummary(*row) for row in cursor.fetchall()]
 
     def get_all_symbols(self, project_id: int) -> List[EntityDeclaration]:
         """
@@ -378,10 +1114,13 @@ class SymbolTableManager:
         Returns:
             实体引用列表
         """
+        if self._use_index(project_id):
+            return self.index.get_references_by_target(target_entity_id)
+
         conn = self.db_manager.connect()
         cursor = conn.execute(
             """
-            SELECT source_entity_id, target_entity_id, reference_text,
+            SELECT source_entity_id, target_entity_id, target_entity_type, reference_text,
                    location_file, location_line, location_column
             FROM entity_references
             WHERE project_id = ? AND target_entity_id = ?
@@ -391,53 +1130,306 @@ class SymbolTableManager:
 
         return [self._row_to_entity_reference(row) for row in cursor.fetchall()]
 
+    def get_referrers(self, project_id: int, target_entity_ids: Iterable[str]) -> List[ReferenceSummary]:
+        """
+        获取引用指定实体的所有引用的投影，不读取引用文本
+
+        Args:
+            project_id: 项目ID
+            target_entity_ids: 目标实体ID
+
+        Returns:
+            引用投影列表
+        """
+        target_entity_ids = sorted(set(target_entity_ids))
+        if self._use_index(project_id):
+            return [
+                summary for target_entity_id in target_entity_ids
+                for summary in self.index.get_referrers(target_entity_id)
+            ]
+
+        conn = self.db_manager.connect()
+        cursor = conn.execute(
+            """
+            SELECT er.source_entity_id, er.target_entity_id, er.location_file, er.location_line, er.location_column
+            FROM json_each(?) t
+            JOIN entity_references er ON er.project_id = ? AND er.target_entity_id = t.value
+            ORDER BY er.target_entity_id, er.id
+            """,
+            (json.dumps(target_entity_ids), project_id)
+        )
+        return [ReferenceSummary(*row) for row in cursor.fetchall()]
+
+    def get_transitive_referrers(
+        self,
+        project_id: int,
+        entity_ids: Iterable[str],
+        max_depth: Optional[int] = None
+    ) -> Set[str]:
+        """
+        获取直接或间接引用指定实体的实体（反向依赖闭包）
+
+        索引已加载时在内存中遍历引用关系，否则使用递归 CTE 在一次查询中求闭包。
+
+        Args:
+            project_id: 项目ID
+            entity_ids: 起始实体ID
+            max_depth: 最大遍历层数，None 表示不限制
+
+        Returns:
+            引用方实体ID集合，不包含起始实体
+        """
+        roots = set(entity_ids)
+        if self._use_index(project_id):
+            return self.index.get_transitive_referrers(roots, max_depth)
+
+        conn = self.db_manager.connect()
+        if max_depth is None:
+            # 只按实体ID去重，引用关系有环时也能终止
+            cursor = conn.execute(
+                """
+                WITH RECURSIVE impacted(entity_id) AS (
+                    SELECT value FROM json_each(?)
+                    UNION
+                    SELECT er.source_entity_id
+                    FROM impacted
+                    JOIN entity_references er ON er.target_entity_id = impacted.entity_id
+                    WHERE er.project_id = ? AND er.source_entity_id IS NOT NULL
+                )
+                SELECT entity_id FROM impacted
+                """,
+                (json.dumps(sorted(roots)), project_id)
+            )
+        else:
+            cursor = conn.execute(
+                """
+                WITH RECURSIVE impacted(entity_id, depth) AS (
+                    SELECT value, 0 FROM json_each(?)
+                    UNION
+                    SELECT er.source_entity_id, impacted.depth + 1
+                    FROM impacted
+                    JOIN entity_references er ON er.target_entity_id = impacted.entity_id
+                    WHERE er.project_id = ? AND er.source_entity_id IS NOT NULL AND impacted.depth < ?
+                )
+                SELECT DISTINCT entity_id FROM impacted
+                """,
+                (json.dumps(sorted(roots)), project_id, max_depth)
+            )
+        return {row[0] for row in cursor.fetchall()} - roots
+
     def get_all_references(self, project_id: int) -> List[EntityReference]:
         """
         获取项目中的所有引用
 
+        引用很多时使用 iter_references 逐个处理，避免同时持有所有引用对象。
+
         Args:
             project_id: 项目ID
 
         Returns:
             实体引用列表
         """
+        return list(self.iter_references(project_id))
+
+    def iter_references(
+        self,
+        project_id: int,
+        path_prefix: Optional[str] = None,
+        chunk_size: int = ITER_CHUNK_SIZE
+    ) -> Iterator[EntityReference]:
+        """
+        逐个产出项目中的引用
+
+        Args:
+            project_id: 项目ID
+            path_prefix: 只产出位置文件以该前缀开头的引用，None 表示所有引用
+            chunk_size: 每次查询读取的行数
+
+        Yields:
+            实体引用
+        """
+        if self._use_index(project_id):
+            for row in self.index.get_reference_rows():
+                if path_prefix is None or row[3].startswith(path_prefix):
+                    yield row_to_reference(row, self.index.get_entity_type(row[1]))
+            return
+
+        for row in self._iter_chunks(
+            """
+            SELECT id, source_entity_id, target_entity_id, target_entity_type, reference_text,
+                   location_file, location_line, location_column
+            FROM entity_references
+            WHERE project_id = ? AND id > ? {prefix}
+            ORDER BY id
+            LIMIT ?
+            """,
+            project_id, path_prefix, chunk_size
+        ):
+            yield self._row_to_entity_reference(row)
+
+    def get_reference_summaries(self, project_id: int) -> List[ReferenceSummary]:
+        """
+        获取项目中所有引用的源实体、目标实体和位置，不读取引用文本
+
+        Args:
+            project_id: 项目ID
+
+        Returns:
+            引用投影列表
+        """
+        if self._use_index(project_id):
+            return self.index.get_reference_summaries()
+
         conn = self.db_manager.connect()
         cursor = conn.execute(
             """
-            SELECT source_entity_id, target_entity_id, reference_text,
-                   location_file, location_line, location_column
+            SELECT source_entity_id, target_entity_id, location_file, location_line, location_column
             FROM entity_references
             WHERE project_id = ?
             """,
             (project_id,)
         )
 
-        return [self._row_to_entity_reference(row) for row in cursor.fetchall()]
+        return [ReferenceSummary(*row) for row in cursor.fetchall()]
 
-    def get_dangling_references(self, project_id: int) -> List[EntityReference]:
+    def get_references_by_file(self, project_id: int, file_path: str) -> List[EntityReference]:
         """
-        获取所有悬空引用（引用了不存在的实体）
+        获取文件中的实体引用
 
         Args:
             project_id: 项目ID
+            file_path: 文件路径
 
         Returns:
-            悬空引用列表
+            实体引用列表
         """
+        if self._use_index(project_id):
+            return self.index.get_references_by_file(file_path)
+
         conn = self.db_manager.connect()
         cursor = conn.execute(
             """
-            SELECT er.source_entity_id, er.target_entity_id, er.reference_text,
+            SELECT er.source_entity_id, er.target_entity_id, er.target_entity_type, er.reference_text,
                    er.location_file, er.location_line, er.location_column
             FROM entity_references er
-            LEFT JOIN entity_declarations ed ON er.target_entity_id = ed.entity_id AND er.project_id = ed.project_id
-            WHERE er.project_id = ? AND ed.id IS NULL
+            JOIN files f ON er.file_id = f.id
+            WHERE f.project_id = ? AND f.file_path = ?
             """,
-            (project_id,)
+            (project_id, file_path)
         )
 
         return [self._row_to_entity_reference(row) for row in cursor.fetchall()]
 
+    def get_dangling_references(self, project_id: int) -> List[EntityReference]:
+        """
+        获取所有悬空引用（引用了不存在的实体）
+
+        引用在写入时解析，悬空引用直接读取解析结果，不需要与声明表连接。
+
+        Args:
+            project_id: 项目ID
+
+        Returns:
+            悬空引用列表
+        """
+        return list(self.iter_dangling_references(project_id))
+
+    def iter_dangling_references(
+        self,
+        project_id: int,
+        chunk_size: int = ITER_CHUNK_SIZE
+    ) -> Iterator[EntityReference]:
+        """
+        逐个产出悬空引用
+
+        Args:
+            project_id: 项目ID
+            chunk_size: 每次查询读取的行数
+
+        Yields:
+            目标实体不存在的引用
+        """
+        if self._use_index(project_id):
+            for row in self.index.get_reference_rows(dangling_only=True):
+                yield row_to_reference(row)
+            return
+
+        for row in self._iter_chunks(
+            """
+            SELECT id, source_entity_id, target_entity_id, target_entity_type, reference_text,
+                   location_file, location_line, location_column
+            FROM entity_references
+            WHERE project_id = ? AND id > ? AND target_declaration_id IS NULL
+            ORDER BY id
+            LIMIT ?
+            """,
+            project_id, None, chunk_size
+        ):
+            yield self._row_to_entity_reference(row)
+
+    def count_dangling_references(self, project_id: int) -> int:
+        """
+        获取悬空引用的数量
+
+        索引已加载时直接读取增量维护的计数，否则只扫描未解析引用的部分索引。
+
+        Args:
+            project_id: 项目ID
+
+        Returns:
+            悬空引用数量
+        """
+        if self._use_index(project_id):
+            return self.index.count_unresolved()
+
+        conn = self.db_manager.connect()
+        cursor = conn.execute(
+            "SELECT COUNT(*) FROM entity_references WHERE project_id = ? AND target_declaration_id IS NULL",
+            (project_id,)
+        )
+        return cursor.fetchone()[0]
+
+    def _iter_chunks(
+        self,
+        query: str,
+        project_id: int,
+        path_prefix: Optional[str],
+        chunk_size: int
+    ) -> Iterator[sqlite3.Row]:
+        """
+        按主键分块执行查询
+
+        查询的第一列是主键，参数依次为项目ID、上一块的最大主键、前缀条件和行数；
+        {prefix} 处插入位置文件前缀条件。每块读取后立即释放游标，
+        遍历过程中不长时间持有读事务。
+
+        Args:
+            query: 查询语句模板
+            project_id: 项目ID
+            path_prefix: 位置文件前缀，None 表示不过滤
+            chunk_size: 每块行数
+
+        Yields:
+            数据库行
+        """
+        conn = self.db_manager.connect()
+        if path_prefix is None:
+            query = query.format(prefix="")
+            extra: Tuple[Any, ...] = ()
+        else:
+            query = query.format(prefix="AND substr(location_file, 1, length(?)) = ?")
+            extra = (path_prefix, path_prefix)
+
+        last_id = 0
+        while True:
+            rows = conn.execute(query, (project_id, last_id, *extra, chunk_size)).fetchall()
+            if not rows:
+                return
+            yield from rows
+            if len(rows) < chunk_size:
+                return
+            last_id = rows[-1][0]
+
     def insert_schema(self, project_id: int, file_path: str, schema_data: Dict[str, Any]) -> None:
         """
         插入实体模式到数据库
@@ -447,46 +1439,110 @@ class SymbolTableManager:
             file_path: 文件路径
             schema_data: 模式数据字典
         """
-        conn = self.db_manager.connect()
+        self.insert_schema_rows(project_id, file_path, [schema_to_row(schema_data)])
+
+    def insert_schema_rows(self, project_id: int, file_path: str, schemas: List[SchemaRow]) -> None:
+        """
+        插入实体模式（行格式）到数据库
 
+        Args:
+            project_id: 项目ID
+            file_path: 文件路径
+            schemas: 模式行数据列表
+        """
         try:
-            # 获取或创建文件记录
-            file_record = self.get_file_record(project_id, file_path)
-            if file_record:
-                file_id = file_record["id"]
-            else:
-                cursor = conn.execute(
+            with self.db_manager.transaction() as conn:
+                file_id = self._get_or_create_file_id(conn, project_id, file_path)
+
+                # 插入实体模式
+                conn.executemany(
                     """
-                    INSERT INTO files (project_id, file_path, file_hash, last_modified, status)
-                    VALUES (?, ?, ?, ?, 'parsing')
+                    INSERT OR REPLACE INTO entity_schemas (
+                        project_id, file_id, schema_name, entity_type,
+                        schema_data, source_code, file_path, line_number
+                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
                     """,
-                    (project_id, file_path, "", datetime.now().isoformat())
-                )
-                file_id = cursor.lastrowid
-
-            # 插入实体模式
-            conn.execute(
-                """
-                INSERT OR REPLACE INTO entity_schemas (
-                    project_id, file_id, schema_name, entity_type,
-                    schema_data, source_code, file_path, line_number
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-                """,
-                (
-                    project_id, file_id, schema_data["name"], schema_data["name"],  # entity_type 使用 schema_name (首字母大写)
-                    json.dumps(schema_data, ensure_ascii=False), schema_data.get("source_code", ""),
-                    schema_data["file_path"], schema_data["line_number"]
+                    [(project_id, file_id, *row) for row in schemas]
                 )
-            )
+                self._update_schemas(project_id, lambda registry: registry.add_schemas(file_path, schemas))
 
-            conn.commit()
-            logger.debug(f"插入实体模式: {schema_data['name']}")
+            logger.debug(f"插入实体模式: {', '.join(row[0] for row in schemas)}")
 
         except Exception as e:
-            conn.rollback()
             logger.error(f"插入实体模式失败: {e}")
             raise
 
+    def get_entity_locations(self, project_id: int) -> Dict[str, str]:
+        """
+        获取项目中所有实体声明所在的位置文件，只读取两列
+
+        Args:
+            project_id: 项目ID
+
+        Returns:
+            实体ID到声明位置文件的映射
+        """
+        if self._use_index(project_id):
+            return self.index.get_entity_locations()
+
+        conn = self.db_manager.connect()
+        cursor = conn.execute(
+            "SELECT entity_id, location_file FROM entity_declarations WHERE project_id = ?",
+            (project_id,)
+        )
+        return {row["entity_id"]: row["location_file"] for row in cursor}
+
+    def get_entity_location(self, project_id: int, entity_id: str) -> Optional[str]:
+        """
+        获取单个实体声明所在的位置文件
+
+        Args:
+            project_id: 项目ID
+            entity_id: 实体ID
+
+        Returns:
+            位置文件，实体不存在时返回None
+        """
+        if self._use_index(project_id):
+            return self.index.get_declaration_file(entity_id)
+
+        conn = self.db_manager.connect()
+        cursor = conn.execute(
+            "SELECT location_file FROM entity_declarations WHERE project_id = ? AND entity_id = ?",
+            (project_id, entity_id)
+        )
+        result = cursor.fetchone()
+        return result["location_file"] if result else None
+
+    def get_entity_types(self, project_id: int, entity_ids: Iterable[str]) -> Dict[str, str]:
+        """
+        批量获取实体类型
+
+        索引已加载时在内存中查找，否则在一次查询中解析所有实体。
+
+        Args:
+            project_id: 项目ID
+            entity_ids: 实体ID
+
+        Returns:
+            实体ID到实体类型的映射，不存在的实体不在映射中
+        """
+        entity_ids = list(set(entity_ids))
+        if not entity_ids:
+            return {}
+        if self._use_index(project_id):
+            return self.index.get_entity_types(entity_ids)
+
+        conn = self.db_manager.connect()
+        cursor = conn.execute(
+            """
+            SELECT entity_id, entity_type FROM entity_declarations
+            WHERE project_id = ? AND entity_id IN (SELECT value FROM json_each(?))
+            """,
+            (project_id, json.dumps(entity_ids))
+        )
+        return {row["entity_id"]: row["entity_type"] for row in cursor}
+
     def get_schema_by_name(self, project_id: int, schema_name: str) -> Optional[Dict[str, Any]]:
         """
         根据模式名称获取实体模式
@@ -498,6 +1554,9 @@ class SymbolTableManager:
         Returns:
             模式数据字典，如果不存在则返回None
         """
+        if self._use_schemas(project_id):
+            return self.schemas.get_by_name(schema_name)
+
         conn = self.db_manager.connect()
         cursor = conn.execute(
             """
@@ -524,6 +1583,9 @@ class SymbolTableManager:
         Returns:
             模式数据字典，如果不存在则返回None
         """
+        if self._use_schemas(project_id):
+            return self.schemas.get_by_entity_type(entity_type)
+
         conn = self.db_manager.connect()
         cursor = conn.execute(
             """
@@ -549,6 +1611,9 @@ class SymbolTableManager:
         Returns:
             模式数据字典列表
         """
+        if self._use_schemas(project_id):
+            return self.schemas.get_all()
+
         conn = self.db_manager.connect()
         cursor = conn.execute(
             """
@@ -570,6 +1635,9 @@ class SymbolTableManager:
         Returns:
             模式名称列表
         """
+        if self._use_schemas(project_id):
+            return self.schemas.get_entity_types()
+
         conn = self.db_manager.connect()
         cursor = conn.execute(
             """
@@ -593,8 +1661,8 @@ class SymbolTableManager:
             entity_type=row["entity_type"],
             entity_id=row["entity_id"],
             name=row["name"],
-            raw_data=json.loads(row["raw_data"]),
-            source_code=row["source_code"]
+            raw_data=json.loads(unpack_text(row["raw_data"])),
+            source_code=unpack_text(row["source_code"])
         )
 
     def _row_to_entity_reference(self, row: sqlite3.Row) -> EntityReference:
@@ -602,7 +1670,8 @@ class SymbolTableManager:
         return EntityReference(
             source_entity_id=row["source_entity_id"],
             target_entity_id=row["target_entity_id"],
-            context_text=row["reference_text"],
+            target_entity_type=row["target_entity_type"],
+            context_text=unpack_text(row["reference_text"]),
             location=Location(
                 file_path=Path(row["location_file"]),
                 start_line=row["location_line"],
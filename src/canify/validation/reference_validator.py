@@ -5,6 +5,7 @@
 """
 
 import logging
+import re
 from typing import List, Optional, Dict, Any
 
 from ..models import EntityReference, EntityDeclaration, ValidationResult, ValidationError, ValidationSeverity
@@ -13,6 +14,9 @@ from ..types import extract_ref_metadata
 
 logger = logging.getLogger(__name__)
 
+# 字段类型中的类型约束：Ref('TypeName') 或 Ref("TypeName")
+REF_CONSTRAINT_PATTERN = re.compile(r"Ref\s*\(\s*['\"]([^'\"]+)['\"]\s*\)")
+
 
 class ReferenceValidator:
     """引用验证器"""
@@ -35,6 +39,10 @@ class ReferenceValidator:
         """
         验证所有引用
 
+        先批量解析引用涉及的源实体和目标实体的类型：给定的实体列表直接提供类型，
+        其余实体通过一次索引查找或一次集合查询解析；之后在内存中逐个检查引用的
+        存在性和类型，每个引用不再单独查询符号表。
+
         Args:
             project_id: 项目ID
             references: 引用列表
@@ -44,151 +52,158 @@ class ReferenceValidator:
             验证结果
         """
         result = ValidationResult.success_result()
+        entity_types = self._resolve_entity_types(project_id, references, entities)
+        schemas: Dict[str, Optional[Dict[str, Any]]] = {}
 
         for reference in references:
+            target_entity_type = reference.target_entity_type or entity_types.get(reference.target_entity_id)
+
             # 基础验证（所有引用）
-            basic_result = self._validate_basic(project_id, reference)
-            result.merge(basic_result)
+            error = self._validate_basic(reference, target_entity_type)
+            if error is not None:
+                result.add_error(error)
 
             # 类型验证（仅字段引用）
-            if reference.source_entity_id is not None:
-                type_result = self._validate_type(project_id, reference, entities)
-                result.merge(type_result)
+            elif reference.source_entity_id is not None:
+                source_entity_type = entity_types.get(reference.source_entity_id)
+                if source_entity_type is not None:
+                    if source_entity_type not in schemas:
+                        schemas[source_entity_type] = self.symbol_table.get_schema_by_entity_type(
+                            project_id, source_entity_type
+                        )
+                    error = self._validate_type(
+                        reference, source_entity_type, target_entity_type, schemas[source_entity_type]
+                    )
+                    if error is not None:
+                        result.add_error(error)
 
             result.total_checks += 1
 
         return result
 
-    def _validate_basic(
+    def _resolve_entity_types(
         self,
         project_id: int,
-        reference: EntityReference
-    ) -> ValidationResult:
+        references: List[EntityReference],
+        entities: List[EntityDeclaration]
+    ) -> Dict[str, str]:
         """
-        基础验证：验证引用格式和目标实体存在
+        批量解析引用涉及的实体类型
 
         Args:
             project_id: 项目ID
-            reference: 引用对象
+            references: 引用列表
+            entities: 已知的实体列表
 
         Returns:
-            验证结果
+            实体ID到实体类型的映射，不存在的实体不在映射中
         """
-        result = ValidationResult.success_result()
+        entity_types = {entity.entity_id: entity.entity_type for entity in entities}
+
+        # 写入时已解析的目标实体类型可以直接使用
+        unresolved = set()
+        for reference in references:
+            if reference.target_entity_type is not None:
+                entity_types.setdefault(reference.target_entity_id, reference.target_entity_type)
+            elif reference.target_entity_id:
+                unresolved.add(reference.target_entity_id)
+            if reference.source_entity_id is not None:
+                unresolved.add(reference.source_entity_id)
+
+        unresolved.difference_update(entity_types)
+        if unresolved:
+            entity_types.update(self.symbol_table.get_entity_types(project_id, unresolved))
+        return entity_types
+
+    def _validate_basic(
+        self,
+        reference: EntityReference,
+        target_entity_type: Optional[str]
+    ) -> Optional[ValidationError]:
+        """
+        基础验证：验证引用格式和目标实体存在
+
+        Args:
+            reference: 引用对象
+            target_entity_type: 目标实体类型，目标实体不存在时为None
 
+        Returns:
+            验证错误，验证通过时返回None
+        """
         # 验证引用格式
         if not reference.target_entity_id:
-            error = ValidationError(
+            return ValidationError(
                 rule_id="reference-format",
                 message="引用目标实体ID不能为空",
                 severity=ValidationSeverity.ERROR,
                 location=reference.location
             )
-            result.add_error(error)
-            return result
 
         # 验证目标实体存在
-        target_entity = self.symbol_table.get_entity_by_id(
-            project_id, reference.target_entity_id
-        )
-
-        if target_entity is None:
-            error = ValidationError(
+        if target_entity_type is None:
+            return ValidationError(
                 rule_id="reference-existence",
                 message=f"引用的实体 '{reference.target_entity_id}' 不存在",
                 severity=ValidationSeverity.ERROR,
                 location=reference.location,
                 entity_id=reference.target_entity_id
             )
-            result.add_error(error)
 
-        return result
+        return None
 
     def _validate_type(
         self,
-        project_id: int,
         reference: EntityReference,
-        entities: List[EntityDeclaration]
-    ) -> ValidationResult:
+        source_entity_type: str,
+        actual_entity_type: str,
+        source_schema: Optional[Dict[str, Any]]
+    ) -> Optional[ValidationError]:
         """
         类型验证：验证字段引用的类型匹配
 
         Args:
-            project_id: 项目ID
             reference: 引用对象
-            entities: 实体列表
+            source_entity_type: 源实体类型
+            actual_entity_type: 目标实体的实际类型
+            source_schema: 源实体类型的模式，没有模式时为None
 
         Returns:
-            验证结果
+            验证错误，验证通过或无法验证时返回None
         """
-        result = ValidationResult.success_result()
-
-        # 获取源实体
-        source_entity = self.symbol_table.get_entity_by_id(
-            project_id, reference.source_entity_id
-        )
-
-        if source_entity is None:
-            # 源实体不存在，这应该已经被基础验证捕获
-            return result
-
-        # 获取目标实体
-        target_entity = self.symbol_table.get_entity_by_id(
-            project_id, reference.target_entity_id
-        )
-
-        if target_entity is None:
-            # 目标实体不存在，这应该已经被基础验证捕获
-            return result
-
-        # 获取源实体的模式
-        source_schema = self.symbol_table.get_schema_by_entity_type(
-            project_id, source_entity.entity_type
-        )
-
         if source_schema is None:
             # 源实体没有对应的模式，跳过类型验证
-            logger.debug(f"源实体 {source_entity.entity_type} 没有对应的模式，跳过类型验证")
-            return result
+            logger.debug(f"源实体 {source_entity_type} 没有对应的模式，跳过类型验证")
+            return None
 
         # 查找引用对应的字段
         field_info = self._find_reference_field(source_schema, reference)
         if not field_info:
             # 无法确定引用对应的字段，跳过类型验证
             logger.debug(f"无法确定引用对应的字段，跳过类型验证")
-            return result
-
-        # 提取字段的类型约束
-        field_type_str = field_info["type"]
+            return None
 
-        # 尝试从字符串中提取类型约束
-        target_entity_type = self._extract_type_constraint_from_string(field_type_str)
+        # 从字段类型中提取类型约束
+        target_entity_type = self._extract_type_constraint_from_string(field_info["type"])
 
         if target_entity_type is None:
             # 字段没有类型约束，跳过类型验证
             logger.debug(f"字段 {field_info['name']} 没有类型约束，跳过类型验证")
-            return result
-
-        # 调试日志
-        logger.debug(f"类型验证: {source_entity.entity_type} -> {target_entity.entity_type}")
-        logger.debug(f"字段约束: {field_info['name']} 期望 {target_entity_type}")
-        logger.debug(f"实际类型: {target_entity.entity_type}")
+            return None
 
         # 验证目标实体类型匹配
-        if target_entity.entity_type != target_entity_type:
-            error = ValidationError(
+        if actual_entity_type != target_entity_type:
+            return ValidationError(
                 rule_id="reference-type-mismatch",
                 message=(
                     f"类型不匹配: 字段 '{field_info['name']}' 期望类型 '{target_entity_type}', "
-                    f"但引用的是 '{target_entity.entity_type}' 类型的实体"
+                    f"但引用的是 '{actual_entity_type}' 类型的实体"
                 ),
                 severity=ValidationSeverity.ERROR,
                 location=reference.location,
                 entity_id=reference.source_entity_id
             )
-            result.add_error(error)
 
-        return result
+        return None
 
     def _find_reference_field(
         self,
@@ -244,18 +259,8 @@ class ReferenceValidator:
         Returns:
             目标实体类型，如果没有约束则返回None
         """
-        # 查找 Ref('TypeName') 模式
-        import re
-
-        # 匹配 Ref('TypeName') 或 Ref("TypeName")
-        pattern = r"Ref\s*\(\s*['\"]([^'\"]+)['\"]\s*\)"
-        match = re.search(pattern, type_string)
-
-        if match:
-            return match.group(1)
-
-        # 如果没有找到 Ref 约束，返回 None
-        return None
+        match = REF_CONSTRAINT_PATTERN.search(type_string)
+        return match.group(1) if match else None
 
     def get_dangling_references(
         self,
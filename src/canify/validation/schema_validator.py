@@ -8,7 +8,7 @@ import logging
 import importlib.util
 import sys
 from pathlib import Path
-from typing import Dict, Any, Optional, List, Type
+from typing import Dict, Any, Optional, List, Tuple, Type
 
 from pydantic import BaseModel, ValidationError
 
@@ -29,7 +29,8 @@ class SchemaValidator:
             symbol_table: 符号表管理器
         """
         self.symbol_table = symbol_table
-        self._model_cache: Dict[str, Type[BaseModel]] = {}
+        # 模式名称到 (模式数据, 模型类)，模式数据变化时重新创建模型类
+        self._model_cache: Dict[str, Tuple[Dict[str, Any], Type[BaseModel]]] = {}
 
     def validate_entity(self, entity: EntityDeclaration, project_id: int) -> ValidationResult:
         """
@@ -132,19 +133,20 @@ class SchemaValidator:
         """
         schema_name = schema_data["name"]
 
-        # 检查缓存
-        if schema_name in self._model_cache:
-            return self._model_cache[schema_name]
+        # 检查缓存：模式注册表对未变化的模式返回同一个字典对象
+        cached = self._model_cache.get(schema_name)
+        if cached is not None and (cached[0] is schema_data or cached[0] == schema_data):
+            return cached[1]
 
         # 尝试使用实际模块导入
         model_class = self._get_model_from_actual_module(schema_data)
         if model_class:
-            self._model_cache[schema_name] = model_class
+            self._model_cache[schema_name] = (schema_data, model_class)
             return model_class
 
         # 回退到动态创建模型类
         model_class = self._create_dynamic_model(schema_data)
-        self._model_cache[schema_name] = model_class
+        self._model_cache[schema_name] = (schema_data, model_class)
 
         return model_class
 
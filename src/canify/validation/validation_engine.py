@@ -5,9 +5,10 @@
 """
 
 import logging
-from typing import List, Dict, Any
+from itertools import islice
+from typing import List, Dict, Any, Iterable, Optional
 
-from ..models import View, ValidationResult
+from ..models import View, ValidationResult, ValidationError, ValidationSeverity, EntityReference
 from ..storage import SymbolTableManager
 from .reference_validator import ReferenceValidator
 from .schema_validator import SchemaValidator
@@ -15,6 +16,9 @@ from .type_constraint_validator import TypeConstraintValidator
 
 logger = logging.getLogger(__name__)
 
+# 流式验证时每批处理的引用数
+STREAM_CHUNK_SIZE = 1000
+
 
 class ValidationEngine:
     """验证引擎"""
@@ -59,7 +63,7 @@ class ValidationEngine:
         # result.merge(validator_result)
 
         if verbose:
-            result.verbose_data = self._collect_verbose_data(project_id)
+            result.verbose_data = self.collect_verbose_data(project_id)
 
         logger.info(
             f"验证完成: 成功={result.success}, "
@@ -68,15 +72,138 @@ class ValidationEngine:
 
         return result
 
-    def _collect_verbose_data(self, project_id: int) -> Dict[str, Any]:
+    def validate_project(
+        self,
+        project_id: int,
+        path_prefix: Optional[str] = None,
+        verbose: bool = False
+    ) -> ValidationResult:
+        """
+        流式验证项目中的实体和引用
+
+        与 validate_view 执行相同的检查并产生相同的结果，但不构建视图：
+        实体和引用从符号表逐个读取，验证后即可释放，内存占用与项目规模无关。
+
+        Args:
+            project_id: 项目ID
+            path_prefix: 只验证位置文件以该前缀（绝对路径）开头的实体和引用，None 表示整个项目
+            verbose: 是否启用详细模式
+
+        Returns:
+            验证结果
+        """
+        logger.info(f"开始流式验证: {path_prefix or '整个项目'}")
+        result = ValidationResult.success_result()
+
+        # 1. 引用验证和类型约束验证，一次遍历引用，两类结果分别累积以保持错误顺序
+        type_result = ValidationResult.success_result()
+        references = self.symbol_table.iter_references(project_id, path_prefix)
+        while True:
+            chunk = list(islice(references, STREAM_CHUNK_SIZE))
+            if not chunk:
+                break
+            result.merge(self.reference_validator.validate_all(project_id, chunk, []))
+
+            for reference in chunk:
+                # 目标实体需在验证范围内
+                target_entity = self.symbol_table.get_entity_by_id(project_id, reference.target_entity_id)
+                if target_entity is None:
+                    continue
+                if path_prefix is not None and not str(target_entity.location.file_path).startswith(path_prefix):
+                    continue
+                type_result.merge(
+                    self.type_constraint_validator.validate_reference(reference, target_entity, project_id)
+                )
+        result.merge(type_result)
+
+        # 2. 悬空引用
+        dangling_count = 0
+        for reference in self.symbol_table.iter_dangling_references(project_id):
+            result.add_error(self._dangling_reference_error(reference))
+            dangling_count += 1
+        if dangling_count:
+            logger.warning(f"发现 {dangling_count} 个悬空引用")
+
+        # 3. Schema验证
+        for entity in self.symbol_table.iter_entities(project_id, path_prefix):
+            result.merge(self.schema_validator.validate_entity(entity, project_id))
+
+        if verbose:
+            result.verbose_data = self.collect_verbose_data(project_id)
+
+        logger.info(
+            f"验证完成: 成功={result.success}, "
+            f"错误={len(result.errors)}, 警告={len(result.warnings)}"
+        )
+
+        return result
+
+    def validate_files(self, project_id: int, file_paths: Iterable[str]) -> Dict[str, ValidationResult]:
+        """
+        逐个文件验证其中的实体和引用
+
+        与 validate_view 执行相同的引用、类型约束和 Schema 检查，但只读取给定文件的符号，
+        用于文件变更后的增量重新验证。
+
+        Args:
+            project_id: 项目ID
+            file_paths: 文件路径列表（相对于项目根目录）
+
+        Returns:
+            文件路径到验证结果的映射
+        """
+        results: Dict[str, ValidationResult] = {}
+        for file_path in file_paths:
+            entities = self.symbol_table.get_entities_by_file(project_id, file_path)
+            references = self.symbol_table.get_references_by_file(project_id, file_path)
+
+            # 引用目标实体，用于类型约束验证和悬空引用检查
+            targets = {}
+            for reference in references:
+                target_id = reference.target_entity_id
+                if target_id and target_id not in targets:
+                    targets[target_id] = self.symbol_table.get_entity_by_id(project_id, target_id)
+
+            result = self.reference_validator.validate_all(project_id, references, entities)
+            for reference in references:
+                target_entity = targets.get(reference.target_entity_id)
+                if target_entity is not None:
+                    result.merge(self.type_constraint_validator.validate_reference(
+                        reference, target_entity, project_id
+                    ))
+                elif reference.target_entity_id:
+                    result.add_error(self._dangling_reference_error(reference))
+
+            for entity in entities:
+                entity_result = self.schema_validator.validate_entity(entity, project_id)
+                # 关联到实体，便于按实体查询诊断
+                for error in entity_result.errors:
+                    if error.entity_id is None:
+                        error.entity_id = entity.entity_id
+                result.merge(entity_result)
+
+            results[file_path] = result
+
+        return results
+
+    def _dangling_reference_error(self, reference: EntityReference) -> ValidationError:
+        """构建悬空引用的验证错误"""
+        return ValidationError(
+            rule_id="reference-existence",
+            message=f"悬空引用: 实体 '{reference.source_entity_id}' 引用了不存在的实体 '{reference.target_entity_id}'",
+            severity=ValidationSeverity.ERROR,
+            location=reference.location
+        )
+
+    def collect_verbose_data(self, project_id: int) -> Dict[str, Any]:
         """收集详细的诊断数据"""
-        symbols = self.symbol_table.get_all_symbols(project_id)
+        symbols = self.symbol_table.get_entity_summaries(project_id)
         symbol_data = {
             symbol.entity_id: {
                 "type": symbol.entity_type,
                 "name": symbol.name,
-                "file_path": str(symbol.location.file_path),
-                "start_line": symbol.location.start_line,
+                "file_path": symbol.location_file,
+                "start_line": symbol.location_line,
             }
             for symbol in symbols
         }
@@ -119,15 +246,7 @@ class ValidationEngine:
             logger.warning(f"发现 {len(dangling_refs)} 个悬空引用")
             # 将悬空引用添加为验证错误
             for ref in dangling_refs:
-                from ..models import ValidationError, ValidationSeverity
-                result.add_error(
-                    ValidationError(
-                        rule_id="reference-existence",
-                        message=f"悬空引用: 实体 '{ref.source_entity_id}' 引用了不存在的实体 '{ref.target_entity_id}'",
-                        severity=ValidationSeverity.ERROR,
-                        location=ref.location
-                    )
-                )
+                result.add_error(self._dangling_reference_error(ref))
 
         return result
 
@@ -15,6 +15,7 @@ import typer
 
 from .client.daemon_client import DaemonClient
 from .commands import daemon as daemon_command
+from .commands import db as db_command
 from .commands import version as version_command
 
 def version_callback(value: bool):
@@ -83,6 +84,10 @@ def verify(
     strict: bool = typer.Option(
         False, "--strict", "-s",
         help="严格模式，将警告视为错误"
+    ),
+    wait: bool = typer.Option(
+        False, "--wait",
+        help="等待 daemon 处理完已收到的文件变更后再返回结果"
     )
 ):
     """
@@ -90,7 +95,7 @@ def verify(
 
     所有计算由 Canify Daemon 处理，CLI 只负责显示结果。
     """
-    options = {"verbose": verbose, "strict": strict}
+    options = {"verbose": verbose, "strict": strict, "wait": wait}
     exit_code = _run_validation_command("verify", path, options)
     sys.exit(exit_code)
 
@@ -118,6 +123,10 @@ def validate(
     strict: bool = typer.Option(
         False, "--strict", "-s",
         help="严格模式，将警告视为错误"
+    ),
+    wait: bool = typer.Option(
+        False, "--wait",
+        help="等待 daemon 处理完已收到的文件变更后再返回结果"
     )
 ):
     """
@@ -129,7 +138,8 @@ def validate(
         "verbose": verbose,
         "strict": strict,
         "tags": tags,
-        "remote": remote
+        "remote": remote,
+        "wait": wait
     }
     exit_code = _run_validation_command("validate", path, options)
     sys.exit(exit_code)
@@ -278,10 +288,30 @@ def daemon_start(
     project_path: str = typer.Argument(
         ".",
         help="要监控的项目路径，默认为当前目录"
+    ),
+    scan_workers: Optional[int] = typer.Option(
+        None,
+        "--scan-workers",
+        help="初始扫描使用的工作进程数，默认为 CPU 核数，1 表示串行扫描"
+    ),
+    cold: bool = typer.Option(
+        False,
+        "--cold",
+        help="冷启动：清空已持久化的符号表并全量重新扫描"
+    ),
+    event_quiet_window: float = typer.Option(
+        0.2,
+        "--event-quiet-window",
+        help="文件事件的安静窗口（秒），窗口内同一文件的多个事件合并为一次处理"
+    ),
+    db_in_project: bool = typer.Option(
+        False,
+        "--db-in-project",
+        help="将项目数据库放在项目内的 .canify/index.db，而不是 ~/.canify/projects"
     )
 ):
     """启动 Canify Daemon"""
-    exit_code = daemon_command.run_daemon_start(project_path)
+    exit_code = daemon_command.run_daemon_start(project_path, scan_workers, cold, event_quiet_window, db_in_project)
     sys.exit(exit_code)
 
 
@@ -308,5 +338,50 @@ def daemon_status(
 app.add_typer(daemon_app)
 
 
+# 项目数据库命令组
+db_app = typer.Typer(
+    name="db",
+    help="管理项目数据库",
+    no_args_is_help=True
+)
+
+
+@db_app.command("list")
+def db_list():
+    """列出 ~/.canify 中的项目数据库"""
+    exit_code = db_command.run_db_list()
+    sys.exit(exit_code)
+
+
+@db_app.command("gc")
+def db_gc(
+    dry_run: bool = typer.Option(
+        False,
+        "--dry-run",
+        help="只列出将被删除的数据库，不实际删除"
+    )
+):
+    """删除项目目录已不存在的项目数据库"""
+    exit_code = db_command.run_db_gc(dry_run)
+    sys.exit(exit_code)
+
+
+@db_app.command("vacuum")
+def db_vacuum(
+    dry_run: bool = typer.Option(
+        False,
+        "--dry-run",
+        help="只列出需要转换的数据库，不实际转换"
+    )
+):
+    """将旧项目数据库转换为增量整理模式（每个数据库执行一次完整 VACUUM）"""
+    exit_code = db_command.run_db_vacuum(dry_run)
+    sys.exit(exit_code)
+
+
+# 注册 db 子命令
+app.add_typer(db_app)
+
+
 if __name__ == "__main__":
     app()
\ No newline at end of file
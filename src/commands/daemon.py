@@ -18,10 +18,22 @@ from ..client.daemon_client import DaemonClient
 
 logger = logging.getLogger(__name__)
 
-def _daemon_worker(project_root: str):
+def _daemon_worker(
+    project_root: str,
+    scan_workers: Optional[int] = None,
+    warm_start: bool = True,
+    event_quiet_window: float = 0.2,
+    db_in_project: bool = False
+):
     """Daemon 工作线程"""
     try:
-        daemon = CanifyDaemon(Path(project_root))
+        daemon = CanifyDaemon(
+            Path(project_root),
+            scan_workers=scan_workers,
+            warm_start=warm_start,
+            event_quiet_window=event_quiet_window,
+            db_in_project=db_in_project
+        )
         daemon.start()
 
         # 保持 daemon 运行
@@ -33,12 +45,22 @@ def _daemon_worker(project_root: str):
         sys.exit(1)
 
 
-def run_daemon_start(project_path: str = ".") -> int:
+def run_daemon_start(
+    project_path: str = ".",
+    scan_workers: Optional[int] = None,
+    cold: bool = False,
+    event_quiet_window: float = 0.2,
+    db_in_project: bool = False
+) -> int:
     """
     启动 Canify Daemon，如果已有实例在运行，则直接退出。
 
     Args:
         project_path: 项目路径，默认为当前目录
+        scan_workers: 初始扫描的工作进程数，None 表示使用 CPU 核数
+        cold: 是否冷启动，丢弃已持久化的符号表并全量重新扫描
+        event_quiet_window: 文件事件的安静窗口（秒）
+        db_in_project: 是否将项目数据库放在项目内的 .canify 目录
 
     Returns:
         退出码
@@ -67,7 +89,7 @@ def run_daemon_start(project_path: str = ".") -> int:
         python_exe = sys.executable
         worker_code = (
             "from src.commands.daemon import _daemon_worker\n"
-            f"_daemon_worker(r'{project_root}')\n"
+            f"_daemon_worker(r'{project_root}', {scan_workers!r}, {not cold!r}, {event_quiet_window!r}, {db_in_project!r})\n"
         )
 
         creationflags = 0
@@ -0,0 +1,116 @@
+"""
+Canify 项目数据库命令
+
+列出、清理和整理 ~/.canify 中的项目数据库。
+"""
+
+import logging
+from datetime import datetime
+
+from ..canify.storage.project_databases import (
+    ProjectDatabase, gc_project_databases, list_project_databases, vacuum_project_databases
+)
+
+logger = logging.getLogger(__name__)
+
+
+def _describe(database: ProjectDatabase) -> str:
+    """单个项目数据库的描述"""
+    size_mb = database.size_bytes / (1024 * 1024)
+    modified = datetime.fromtimestamp(database.last_modified).strftime("%Y-%m-%d %H:%M")
+    if database.error is not None:
+        state = f"无法读取: {database.error}"
+    elif database.stale:
+        state = "过期"
+    else:
+        state = "使用中"
+    if database.auto_vacuum is not None:
+        state += f", 整理模式 {database.auto_vacuum}"
+    projects = ", ".join(database.project_paths) or "（无项目）"
+    return f"{database.db_path}\n    {size_mb:.1f} MB, 修改于 {modified}, {state}\n    项目: {projects}"
+
+
+def run_db_list() -> int:
+    """
+    列出项目数据库
+
+    Returns:
+        退出码
+    """
+    try:
+        databases = list_project_databases()
+        if not databases:
+            print("没有项目数据库")
+            return 0
+
+        for database in databases:
+            print(_describe(database))
+        stale_count = sum(1 for database in databases if database.stale)
+        print(f"\n共 {len(databases)} 个数据库，其中 {stale_count} 个过期（使用 'canify db gc' 删除）")
+        return 0
+
+    except Exception as e:
+        logger.error(f"列出项目数据库失败: {e}")
+        print(f"[ERROR] 列出项目数据库失败: {e}")
+        return 1
+
+
+def run_db_gc(dry_run: bool = False) -> int:
+    """
+    删除项目目录已不存在的项目数据库
+
+    Args:
+        dry_run: 只列出将被删除的数据库，不实际删除
+
+    Returns:
+        退出码
+    """
+    try:
+        stale = gc_project_databases(dry_run=dry_run)
+        if not stale:
+            print("[OK] 没有过期的项目数据库")
+            return 0
+
+        for database in stale:
+            print(_describe(database))
+        freed_mb = sum(database.size_bytes for database in stale) / (1024 * 1024)
+        action = "将删除" if dry_run else "已删除"
+        print(f"\n[OK] {action} {len(stale)} 个过期数据库，共 {freed_mb:.1f} MB")
+        return 0
+
+    except Exception as e:
+        logger.error(f"清理项目数据库失败: {e}")
+        print(f"[ERROR] 清理项目数据库失败: {e}")
+        return 1
+
+
+def run_db_vacuum(dry_run: bool = False) -> int:
+    """
+    将尚未启用增量整理的项目数据库转换为增量整理模式
+
+    Args:
+        dry_run: 只列出需要转换的数据库，不实际转换
+
+    Returns:
+        退出码
+    """
+    try:
+        pending = vacuum_project_databases(dry_run=dry_run)
+        if not pending:
+            print("[OK] 所有项目数据库都已启用增量整理")
+            return 0
+
+        for database in pending:
+            print(_describe(database))
+        failed = [database for database in pending if database.error is not None]
+        action = "将转换" if dry_run else "已转换"
+        print(f"\n[OK] {action} {len(pending) - len(failed)} 个项目数据库")
+        if failed:
+            print(f"[ERROR] {len(failed)} 个数据库转换失败（正在使用时请先停止 daemon）")
+            return 1
+        return 0
+
+    except Exception as e:
+        logger.error(f"整理项目数据库失败: {e}")
+        print(f"[ERROR] 整理项目数据库失败: {e}")
+        return 1
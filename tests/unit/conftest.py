@@ -0,0 +1,89 @@
+"""
+Shared fixtures for the unit tests: databases, symbol tables, indexers and file symbols.
+"""
+
+from pathlib import Path
+
+import pytest
+
+from src.canify.daemon.indexer import ProjectIndexer
+from src.canify.storage import DatabaseManager, SymbolTableManager, SpecStorageManager
+from src.canify.storage.file_symbols import FileSymbols
+
+
+@pytest.fixture
+def make_database(tmp_path):
+    """Create databases with an initialized schema under tmp_path; all are closed after the test."""
+    created = []
+
+    def make(db_path="canify.db", **kwargs) -> DatabaseManager:
+        db_manager = DatabaseManager(tmp_path / db_path, **kwargs)
+        db_manager.initialize_schema()
+        created.append(db_manager)
+        return db_manager
+
+    yield make
+    for db_manager in created:
+        db_manager.close()
+        db_manager.pool.close()
+
+
+@pytest.fixture
+def db_manager(make_database) -> DatabaseManager:
+    """The test's default database."""
+    return make_database()
+
+
+@pytest.fixture
+def symbol_table(db_manager) -> SymbolTableManager:
+    """A symbol table over the default database."""
+    return SymbolTableManager(db_manager)
+
+
+@pytest.fixture
+def project_root(tmp_path) -> Path:
+    """An empty project directory, separate from the database files."""
+    root = tmp_path / "project"
+    root.mkdir()
+    return root
+
+
+@pytest.fixture
+def project_id(symbol_table, project_root) -> int:
+    """The id of project_root in the default symbol table."""
+    return symbol_table.get_or_create_project(project_root)
+
+
+@pytest.fixture
+def make_indexer(db_manager, symbol_table, project_root):
+    """Create project indexers; by default over project_root, the default database and symbol table."""
+
+    def make(database=None, root=None, scan_workers=1, **kwargs) -> ProjectIndexer:
+        database = database or db_manager
+        table = symbol_table if database is db_manager else SymbolTableManager(database)
+        return ProjectIndexer(
+            root or project_root, database, table, SpecStorageManager(database), scan_workers=scan_workers, **kwargs
+        )
+
+    return make
+
+
+@pytest.fixture
+def file_symbols():
+    """Build file symbols declaring Task entities and referencing other entities."""
+
+    def build(file_path: str, declared=(), referenced=(), file_hash: str = "") -> FileSymbols:
+        return FileSymbols(
+            file_path=file_path,
+            declarations=[
+                (entity_id, "Task", entity_id, f'{{"id": "{entity_id}"}}', "", file_path, line, 1)
+                for line, entity_id in enumerate(declared, start=1)
+            ],
+            references=[
+                (None, target, f"entity://{target}", file_path, 100 + line, 1)
+                for line, target in enumerate(referenced)
+            ],
+            file_hash=file_hash,
+        )
+
+    return build
@@ -0,0 +1,108 @@
+"""
+Tests for the content-addressed symbol store used for branch switches.
+"""
+
+import pickle
+import zlib
+
+from src.canify.discovery.git_branch import read_current_branch
+from src.canify.models import SpecificationRule
+from src.canify.storage import BlobStore
+from src.canify.storage.file_symbols import FileSymbols, pack_text
+
+MAIN = "```entity\nid: task-1\ntype: Task\nname: Main version\n```\n"
+FEATURE = "```entity\nid: task-1\ntype: Task\nname: Feature version\n```\n"
+
+
+class TestBlobStore:
+    """Test restoring parse results, branch mappings and garbage collection."""
+
+    def test_restore_branch_content_without_reparsing(
+        self, db_manager, symbol_table, project_id, project_root, make_indexer
+    ):
+        """Content seen before is restored from the store, and gc keeps only referenced blobs."""
+        (project_root / "task.md").write_text(MAIN)
+        blob_store = BlobStore(db_manager)
+        indexer = make_indexer(blob_store=blob_store)
+        indexer.scan(project_id)
+        blob_store.record_branch(project_id, "main")
+
+        (project_root / "task.md").write_text(FEATURE)
+        indexer.scan(project_id, incremental=True)
+        blob_store.record_branch(project_id, "feature")
+        assert blob_store.get_stats(project_id)["blobs"] == 2
+
+        # Back on main; bypass the in-memory parse cache so the result must come from the store
+        indexer.processor.parse_cache.size = 0
+        (project_root / "task.md").write_text(MAIN)
+        stats = indexer.scan(project_id, incremental=True)
+        assert stats.restored_files == 1
+        assert symbol_table.get_entity_by_id(project_id, "task-1").name == "Main version"
+
+        # An edit that no branch records is collected once the file moves on
+        (project_root / "task.md").write_text(MAIN.replace("Main", "Draft"))
+        indexer.update_file(project_id, "task.md")
+        (project_root / "task.md").write_text(MAIN)
+        assert indexer.update_file(project_id, "task.md").restored
+        assert blob_store.gc(project_id) == 1
+        assert sorted(blob_store.get_branch_files(project_id, "feature")) == ["task.md"]
+
+        blob_store.forget_branch(project_id, "feature")
+        assert blob_store.gc(project_id) == 1
+        assert blob_store.list_branches(project_id) == ["main"]
+
+        # Refreshing only some paths leaves the rest of the branch mapping alone
+        (project_root / "extra.md").write_text(FEATURE.replace("task-1", "task-2"))
+        indexer.update_file(project_id, "extra.md")
+        assert blob_store.record_branch(project_id, "main", ["extra.md"]) == 1
+        assert sorted(blob_store.get_branch_files(project_id, "main")) == ["extra.md", "task.md"]
+
+    def test_payload_round_trip_without_pickle(self, db_manager, project_id):
+        """Rows, compressed text and specs survive a round trip; undecodable payloads count as misses."""
+        blob_store = BlobStore(db_manager)
+
+        long_text = "x" * 1000
+        symbols = FileSymbols(
+            file_path="a.md",
+            kind="markdown",
+            declarations=[("task-1", "Task", "T", pack_text('{"id": "task-1"}'), pack_text(long_text), "a.md", 1, 1)],
+            references=[(None, "task-1", pack_text(long_text), "a.md", 3, 5)],
+            schemas=[("Task", "Task", "{}", "", "models.py", 4)],
+            specs=[SpecificationRule(id="r1", name="r1", levels={"verify": "error"}, fixture="f.x", test_case="t.y")],
+            file_hash="h1",
+        )
+        assert isinstance(symbols.references[0][2], bytes)
+        assert blob_store.put_many(project_id, [symbols]) == 1
+
+        restored = blob_store.load(project_id, "a.md", "h1")
+        assert restored.restored
+        assert restored.kind == symbols.kind
+        assert restored.declarations == symbols.declarations
+        assert restored.references == symbols.references
+        assert restored.schemas == symbols.schemas
+        assert restored.specs == symbols.specs
+
+        # A pickled payload is never unpickled, and reparsing replaces it
+        with db_manager.transaction() as conn:
+            conn.execute(
+                "UPDATE symbol_blobs SET payload = ? WHERE blob_id = 'h1'",
+                (zlib.compress(pickle.dumps(("markdown", [], [], [], []))),)
+            )
+        assert blob_store.load(project_id, "a.md", "h1") is None
+        blob_store.put_many(project_id, [symbols])
+        assert blob_store.load(project_id, "a.md", "h1") is not None
+
+    def test_read_current_branch(self, tmp_path):
+        """Branch names come from .git/HEAD, including worktree gitdir files and detached heads."""
+        assert read_current_branch(tmp_path / "project") is None
+
+        git_dir = tmp_path / "repo.git"
+        git_dir.mkdir()
+        (git_dir / "HEAD").write_text("ref: refs/heads/feature/x\n")
+        project = tmp_path / "project"
+        (project / "sub").mkdir(parents=True)
+        (project / ".git").write_text(f"gitdir: {git_dir}\n")
+        assert read_current_branch(project / "sub") == "feature/x"
+
+        (git_dir / "HEAD").write_text("0123456789abcdef0123456789abcdef01234567\n")
+        assert read_current_branch(project) == "0123456789ab"
@@ -0,0 +1,85 @@
+"""
+Tests for the read-only connection pool used by IPC handler threads.
+"""
+
+import sqlite3
+import threading
+
+import pytest
+
+from src.canify.storage import SymbolTableManager
+
+
+class TestConnectionPool:
+    """Test checkout/return, bounded size and read-only readers."""
+
+    def test_reader_threads_share_a_bounded_set_of_connections(self, make_database, project_root):
+        """Many short-lived threads reuse at most pool_size connections."""
+        db_manager = make_database(pool_size=2)
+        symbol_table = SymbolTableManager(db_manager)
+        project_id = symbol_table.get_or_create_project(project_root)
+
+        def request():
+            with db_manager.reader():
+                assert symbol_table.count_entities(project_id) == 0
+
+        threads = [threading.Thread(target=request) for _ in range(20)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        stats = db_manager.pool.get_stats()
+        assert stats["checkouts"] == 20
+        assert stats["open"] <= 2
+        assert stats["in_use"] == 0
+
+    def test_reader_is_read_only_but_transactions_still_write(self, db_manager, symbol_table, project_root):
+        """Pooled connections reject writes; transactions use the thread's own connection."""
+
+        with db_manager.reader() as conn:
+            with pytest.raises(sqlite3.OperationalError):
+                conn.execute("DELETE FROM projects")
+            project_id = symbol_table.get_or_create_project(project_root)
+            assert symbol_table.get_or_create_project(project_root) == project_id
+
+    def test_checkout_times_out_when_exhausted(self, make_database):
+        """Checkout waits for a returned connection and gives up after the timeout."""
+        pool = make_database(pool_size=1).pool
+        pool.timeout = 0.05
+
+        conn = pool.checkout()
+        with pytest.raises(TimeoutError):
+            pool.checkout()
+        pool.checkin(conn)
+
+        with pool.connection() as again:
+            assert again is conn
+        pool.close()
+        assert pool.get_stats()["open"] == 0
+
+    def test_checkout_after_close_is_refused(self, make_database):
+        """Once closed, the pool opens no new connections, including for waiting readers."""
+        pool = make_database(pool_size=1).pool
+        conn = pool.checkout()
+
+        errors = []
+
+        def waiting_reader():
+            try:
+                pool.checkout()
+            except sqlite3.ProgrammingError as e:
+                errors.append(e)
+
+        waiter = threading.Thread(target=waiting_reader)
+        waiter.start()
+        pool.close()
+        waiter.join(timeout=5)
+        assert len(errors) == 1
+
+        with pytest.raises(sqlite3.ProgrammingError):
+            pool.checkout()
+
+        # The connection in use is closed when it comes back
+        pool.checkin(conn)
+        assert pool.get_stats()["open"] == 0
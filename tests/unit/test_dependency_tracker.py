@@ -0,0 +1,66 @@
+"""
+Tests for dependency-driven revalidation.
+"""
+
+import pytest
+
+from src.canify.daemon.dependency_tracker import DependencyTracker
+from src.canify.validation.validation_engine import ValidationEngine
+
+MODELS = "from pydantic import BaseModel\n\nclass Task(BaseModel):\n    name: str\n"
+TASKS = "```entity\nid: task-1\ntype: Task\nname: Ship it\n```\n\nOwned by [Ada](entity://user-1).\n"
+USERS = "```entity\nid: user-1\ntype: {type}\nname: {name}\n```\n"
+SPECS = (
+    "specs:\n  - id: r1\n    name: R1\n    levels: {verify: error}\n"
+    "    fixture: fixtures.all\n    test_case: tests.check\n"
+)
+
+
+@pytest.fixture
+def indexer(project_root, project_id, make_indexer):
+    """An indexer over a scanned project with a schema, a referencing document and a spec file."""
+    (project_root / "models.py").write_text(MODELS)
+    (project_root / "tasks.md").write_text(TASKS)
+    (project_root / "spec_rules.yaml").write_text(SPECS)
+    indexer = make_indexer()
+    indexer.scan(project_id)
+    return indexer
+
+
+class TestDependencyTracker:
+    """Test dependent-file lookups and the affected set of a change."""
+
+    @pytest.mark.usefixtures("indexer")
+    def test_get_dependent_files(self, symbol_table, project_id):
+        """Files are found through the entities, schemas and entity types they depend on."""
+        assert symbol_table.get_dependent_files(project_id, [("entity", "user-1")]) == {"tasks.md"}
+        assert symbol_table.get_dependent_files(project_id, [("schema", "Task")]) == {"tasks.md"}
+        assert symbol_table.get_dependent_files(project_id, [("entity_type", "*")]) == {"spec_rules.yaml"}
+        assert symbol_table.get_dependent_files(project_id, [("schema", "user-1")]) == set()
+
+        # Long id lists and several symbol types in one call
+        symbols = [("entity", f"missing-{i}") for i in range(1500)] + [("entity", "user-1"), ("entity_type", "*")]
+        assert symbol_table.get_dependent_files(project_id, symbols) == {"tasks.md", "spec_rules.yaml"}
+
+    def test_change_revalidates_dependents_only(self, indexer, symbol_table, project_id, project_root):
+        """Adding a referenced entity revalidates its referrers; a data-only edit reaches only specs."""
+        tracker = DependencyTracker(symbol_table)
+        engine = ValidationEngine(symbol_table)
+
+        def update(file_path: str, content: str):
+            before = tracker.capture(project_id, file_path)
+            (project_root / file_path).write_text(content)
+            indexer.update_file(project_id, file_path)
+            return tracker.affected_files(
+                project_id, {file_path: (before, tracker.capture(project_id, file_path))}
+            )
+
+        errors = engine.validate_files(project_id, ["tasks.md"])["tasks.md"].errors
+        assert errors and {error.rule_id for error in errors} == {"reference-existence"}
+
+        affected = update("users.md", USERS.format(type="User", name="Ada"))
+        assert affected == {"users.md", "tasks.md", "spec_rules.yaml"}
+        assert engine.validate_files(project_id, ["tasks.md"])["tasks.md"].success
+
+        assert update("users.md", USERS.format(type="User", name="Ada L.")) == {"users.md", "spec_rules.yaml"}
+        assert update("users.md", USERS.format(type="User", name="Ada L.")) == {"users.md"}
@@ -0,0 +1,69 @@
+"""
+Tests for the trigram full-text entity search index.
+"""
+
+from pathlib import Path
+
+
+def _write_entities(root: Path) -> None:
+    """Create a few entities with searchable names and nested field values."""
+    (root / "tasks.md").write_text("""
+```entity
+id: task-alpha
+type: Task
+name: Migrate billing service
+tags: [payments, backend]
+```
+
+```entity
+id: task-beta
+type: Task
+name: Rewrite login page
+details:
+  owner: frontend-team
+```
+""")
+    (root / "people.md").write_text("""
+```entity
+id: user-ada
+type: User
+name: Ada Billingsley
+```
+""")
+
+
+class TestEntitySearch:
+    """Test substring matching, filters, pagination and index maintenance."""
+
+    def test_search_matches_ids_names_and_field_values(self, symbol_table, project_id, project_root, make_indexer):
+        """Terms match case-insensitively anywhere in the id, name or nested values."""
+        _write_entities(project_root)
+        indexer = make_indexer()
+        indexer.scan(project_id)
+
+        def search(query, **kwargs):
+            return sorted(s.entity_id for s in symbol_table.search_entities(project_id, query, **kwargs))
+
+        assert search("billing") == ["task-alpha", "user-ada"]
+        assert search("BILLING", entity_type="User") == ["user-ada"]
+        assert search("frontend-team") == ["task-beta"]
+        assert search("payments migrate") == ["task-alpha"]
+        assert search("ta ph") == ["task-alpha"]  # short terms fall back to a scan
+        assert search("nothing-here") == []
+        assert len(symbol_table.search_entities(project_id, "task", limit=1, offset=1)) == 1
+
+        # Deleting a file removes its entities from the index
+        (project_root / "people.md").unlink()
+        indexer.delete_file(project_id, "people.md")
+        assert search("billing") == ["task-alpha"]
+
+    def test_rebuild_search_index(self, db_manager, symbol_table, project_id, project_root, make_indexer):
+        """The index can be rebuilt from entity_declarations, e.g. after a migration."""
+        _write_entities(project_root)
+        make_indexer().scan(project_id)
+
+        with db_manager.transaction() as conn:
+            conn.execute("DELETE FROM entity_search")
+            assert db_manager.rebuild_search_index(conn, project_id) == 3
+
+        assert [s.entity_id for s in symbol_table.search_entities(project_id, "login")] == ["task-beta"]
@@ -0,0 +1,94 @@
+"""
+Tests for folding raw watcher events into per-path actions.
+"""
+
+import threading
+import time
+
+import pytest
+
+from src.canify.daemon.event_coalescer import EventCoalescer
+
+# (raw events as (path, type[, src_path]), expected actions as (path, type, src_path))
+FOLD_CASES = [
+    ([("a.md", "modified")] * 3, [("a.md", "modified", None)]),
+    ([("a.md", "created"), ("a.md", "modified")], [("a.md", "created", None)]),
+    ([("a.md", "created"), ("a.md", "deleted")], []),
+    ([("a.md", "deleted"), ("a.md", "created")], [("a.md", "modified", None)]),
+    ([("a.md", "modified"), ("a.md", "deleted")], [("a.md", "deleted", None)]),
+    ([("b.md", "moved", "a.md")], [("b.md", "moved", "a.md")]),
+    ([("b.md", "moved", "a.md"), ("b.md", "modified")], [("b.md", "moved", "a.md")]),
+    ([("b.md", "moved", "a.md"), ("b.md", "deleted")], [("a.md", "deleted", None)]),
+    ([("a.md", "created"), ("b.md", "moved", "a.md")], [("b.md", "created", None)]),
+    ([("b.md", "moved", "a.md"), ("a.md", "created")], [("a.md", "modified", None), ("b.md", "created", None)]),
+    ([("a.md", "modified"), ("b.md", "deleted")], [("a.md", "modified", None), ("b.md", "deleted", None)]),
+]
+
+
+def _add_all(coalescer: EventCoalescer, events) -> None:
+    for event in events:
+        coalescer.add(*event)
+
+
+class TestEventCoalescer:
+    """Test fold rules, the quiet window and idle tracking."""
+
+    @pytest.mark.parametrize(("events", "expected"), FOLD_CASES)
+    def test_fold(self, events, expected):
+        """Each path's event sequence folds into a single final action."""
+        coalescer = EventCoalescer(quiet_window=10)
+        _add_all(coalescer, events)
+        batch = coalescer.flush()
+        assert sorted((e.file_path, e.event_type, e.src_path) for e in batch) == sorted(expected)
+        assert coalescer.pending_count == 0
+
+    def test_event_counts(self):
+        """Folded actions report how many raw events they absorbed."""
+        coalescer = EventCoalescer(quiet_window=10)
+        _add_all(coalescer, [("a.md", "modified")] * 3 + [("c.md", "moved", "b.md"), ("c.md", "modified")])
+        counts = {event.file_path: event.event_count for event in coalescer.flush()}
+        assert counts == {"a.md": 3, "c.md": 2}
+        assert coalescer.get_stats()["events_coalesced"] == 3
+
+    def test_quiet_window_and_max_delay(self):
+        """A path is emitted once it has been quiet, or after max_delay while it keeps changing."""
+        coalescer = EventCoalescer(quiet_window=0.05, max_delay=0.3)
+        coalescer.add("a.md", "modified")
+        assert coalescer.wait_for_batch(timeout=0.01) == []
+        assert [event.file_path for event in coalescer.wait_for_batch(timeout=1)] == ["a.md"]
+        coalescer.batch_done()
+
+        start = time.monotonic()
+        stop = threading.Event()
+
+        def keep_writing():
+            while not stop.is_set():
+                coalescer.add("b.md", "modified")
+                time.sleep(0.01)
+
+        writer = threading.Thread(target=keep_writing)
+        writer.start()
+        try:
+            batch = coalescer.wait_for_batch(timeout=2)
+        finally:
+            stop.set()
+            writer.join()
+        assert [event.file_path for event in batch] == ["b.md"]
+        assert 0.25 <= time.monotonic() - start < 1.5
+
+    def test_wait_until_idle(self):
+        """Idle means nothing pending and every emitted batch marked done."""
+        coalescer = EventCoalescer(quiet_window=10)
+        assert coalescer.wait_until_idle(timeout=0.01)
+
+        coalescer.add("a.md", "modified")
+        assert not coalescer.wait_until_idle(timeout=0.01)
+        assert len(coalescer.flush()) == 1
+        assert not coalescer.wait_until_idle(timeout=0.01)
+        coalescer.batch_done()
+        assert coalescer.wait_until_idle(timeout=0.01)
+
+        # Events that cancel out emit no batch and leave nothing in flight
+        _add_all(coalescer, [("tmp.md", "created"), ("tmp.md", "deleted")])
+        assert coalescer.flush() == []
+        assert coalescer.wait_until_idle(timeout=0.01)
@@ -0,0 +1,60 @@
+"""
+Tests for compact text storage and the summary projections.
+"""
+
+import json
+
+import pytest
+
+from src.canify.storage.file_symbols import (
+    COMPACT_TEXT_MIN_BYTES, EntitySummary, FileSymbols, ReferenceSummary, pack_text, unpack_text
+)
+
+
+class TestPackText:
+    """pack_text compresses long text only, and unpack_text restores it exactly."""
+
+    @pytest.mark.parametrize(("text", "compressed"), [
+        ("", False),
+        ("a" * (COMPACT_TEXT_MIN_BYTES - 1), False),
+        ("a" * COMPACT_TEXT_MIN_BYTES, True),
+        ("中" * 85, False),  # 255 bytes once encoded
+        ("中" * 86, True),  # 258 bytes: the threshold counts encoded bytes, not characters
+        ("name: task\n" * 100, True),
+    ])
+    def test_round_trip_at_threshold(self, text, compressed):
+        """Texts under 256 encoded bytes stay as they are; longer compressible texts become bytes."""
+        packed = pack_text(text)
+        assert isinstance(packed, bytes) == compressed
+        assert unpack_text(packed) == text
+
+
+class TestSummaryProjections:
+    """Summaries match the full models, with or without the in-memory index."""
+
+    @pytest.mark.parametrize("load_index", [False, True])
+    def test_summaries_match_full_models(self, load_index, symbol_table, project_id):
+        """Projections carry the same ids and locations as the decompressed models."""
+        raw_data = {"id": "task-1", "notes": "long text " * 100}
+        symbol_table.replace_file_symbols(project_id, FileSymbols(
+            file_path="a.md",
+            declarations=[
+                ("task-1", "Task", "T", pack_text(json.dumps(raw_data)), pack_text("x" * 500), "/p/a.md", 3, 1),
+            ],
+            references=[("task-1", "user-1", pack_text("see " * 200), "/p/a.md", 7, 4)],
+        ))
+        if load_index:
+            symbol_table.load_index(project_id)
+
+        entity = symbol_table.get_entity_by_id(project_id, "task-1")
+        assert entity.raw_data == raw_data
+        assert entity.source_code == "x" * 500
+        assert symbol_table.get_entity_summaries(project_id) == [
+            EntitySummary("task-1", "Task", "T", "/p/a.md", 3, 1)
+        ]
+
+        reference = symbol_table.get_references_by_file(project_id, "a.md")[0]
+        assert reference.context_text == "see " * 200
+        assert symbol_table.get_reference_summaries(project_id) == [
+            ReferenceSummary("task-1", "user-1", "/p/a.md", 7, 4)
+        ]
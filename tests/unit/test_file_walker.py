@@ -0,0 +1,91 @@
+"""
+Tests for the scandir file walker: virtualenv pruning, symlinked directories and file kinds.
+"""
+
+import os
+from pathlib import Path
+
+import pytest
+
+from src.canify.discovery.file_walker import (
+    FILE_KIND_MARKDOWN, FILE_KIND_PYTHON, FILE_KIND_SPEC, FILE_KIND_YAML, FileWalker, classify_file
+)
+
+
+def _touch(root: Path, relative_path: str, content: str = "") -> None:
+    path = root / relative_path
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(content)
+
+
+def _walk(root: Path, kinds=None):
+    """Relative paths and kinds yielded by a walk, sorted."""
+    return sorted((walked.relative_path, walked.kind) for walked in FileWalker(root, kinds).walk())
+
+
+class TestClassifyFile:
+    """File kinds come from case-sensitive extensions and the spec_ prefix."""
+
+    @pytest.mark.parametrize(("name", "kind"), [
+        ("README.md", FILE_KIND_MARKDOWN),
+        ("models.py", FILE_KIND_PYTHON),
+        ("spec_rules.yaml", FILE_KIND_SPEC),
+        ("spec_rules.yml", FILE_KIND_SPEC),
+        ("config.yaml", FILE_KIND_YAML),
+        ("rules_spec_.yaml", FILE_KIND_YAML),
+        ("README.MD", None),
+        ("Spec_rules.yaml", FILE_KIND_YAML),
+        ("spec_rules.YAML", None),
+        ("notes.txt", None),
+        ("md", None),
+    ])
+    def test_classify_file(self, name, kind):
+        """Only exact lowercase extensions are recognised, as before the walker existed."""
+        assert classify_file(name) == kind
+
+
+class TestFileWalker:
+    """Test pruning and symlink handling."""
+
+    def test_virtualenvs_are_pruned_by_marker(self, tmp_path):
+        """Any directory holding pyvenv.cfg is skipped whatever its name; the root itself is still walked."""
+        _touch(tmp_path, "pyvenv.cfg")
+        _touch(tmp_path, "doc.md")
+        _touch(tmp_path, "tools/python3/pyvenv.cfg", "home = /usr/bin\n")
+        _touch(tmp_path, "tools/python3/lib/site-packages/pkg/module.py")
+        _touch(tmp_path, "tools/python3/README.md")
+        _touch(tmp_path, "tools/build.py")
+        _touch(tmp_path, "src/app.py")
+
+        walker = FileWalker(tmp_path)
+        assert sorted(walked.relative_path for walked in walker.walk()) == [
+            "doc.md", os.path.join("src", "app.py"), os.path.join("tools", "build.py")
+        ]
+        assert walker.get_stats()["directories_pruned"] == 1
+
+    def test_symlinked_directories_are_not_followed(self, tmp_path):
+        """Directory links are skipped, so linked trees are neither duplicated nor walked outside the root."""
+        root = tmp_path / "project"
+        outside = tmp_path / "outside"
+        _touch(root, "docs/guide.md")
+        _touch(outside, "external.md")
+        (root / "docs_link").symlink_to(root / "docs", target_is_directory=True)
+        (root / "external").symlink_to(outside, target_is_directory=True)
+        (root / "loop").symlink_to(root, target_is_directory=True)
+
+        assert _walk(root) == [(os.path.join("docs", "guide.md"), FILE_KIND_MARKDOWN)]
+
+    def test_kinds_filter_and_classification(self, tmp_path):
+        """Files are classified by kind and filtered to the requested kinds."""
+        for name in ("a.md", "b.py", "spec_c.yaml", "d.yml", "E.MD", "f.txt"):
+            _touch(tmp_path, name)
+
+        assert _walk(tmp_path) == [
+            ("a.md", FILE_KIND_MARKDOWN),
+            ("b.py", FILE_KIND_PYTHON),
+            ("d.yml", FILE_KIND_YAML),
+            ("spec_c.yaml", FILE_KIND_SPEC),
+        ]
+        assert _walk(tmp_path, [FILE_KIND_SPEC, FILE_KIND_MARKDOWN]) == [
+            ("a.md", FILE_KIND_MARKDOWN), ("spec_c.yaml", FILE_KIND_SPEC)
+        ]
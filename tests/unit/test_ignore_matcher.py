@@ -0,0 +1,100 @@
+"""
+Tests for the .gitignore / .canifyignore matcher and the file walker that uses it.
+"""
+
+import tempfile
+from pathlib import Path
+
+from src.canify.discovery.file_walker import FileWalker
+from src.canify.discovery.ignore_matcher import IgnoreMatcher, parse_ignore_lines
+
+
+def _touch(root: Path, relative_path: str, content: str = "") -> None:
+    path = root / relative_path
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(content)
+
+
+class TestIgnoreMatcher:
+    """Test gitignore semantics, nesting and precedence."""
+
+    def test_gitignore_pattern_semantics(self):
+        """Anchoring, directory-only, wildcards, ** and negation follow git."""
+        with tempfile.TemporaryDirectory() as project_dir:
+            root = Path(project_dir)
+            _touch(root, ".gitignore", "\n".join([
+                "# comment",
+                "*.log",
+                "/top.md",
+                "drafts/",
+                "docs/**/tmp_*.md",
+                "generated/*.md",
+                "!generated/keep.md",
+            ]))
+            matcher = IgnoreMatcher(root)
+
+            assert matcher.is_ignored("a/b/debug.log")
+            assert matcher.is_ignored("top.md")
+            assert not matcher.is_ignored("sub/top.md")
+            assert matcher.is_ignored("drafts", is_dir=True)
+            assert matcher.is_ignored("x/drafts/note.md")
+            assert not matcher.is_ignored("drafts.md")
+            assert matcher.is_ignored("docs/tmp_a.md")
+            assert matcher.is_ignored("docs/a/b/tmp_a.md")
+            assert not matcher.is_ignored("docs/a/b/a.md")
+            assert matcher.is_ignored("generated/out.md")
+            assert not matcher.is_ignored("generated/keep.md")
+            assert not matcher.is_ignored("generated/sub/out.md")
+
+    def test_nested_files_and_precedence(self):
+        """Deeper files and .canifyignore override .gitignore; defaults come last."""
+        with tempfile.TemporaryDirectory() as project_dir:
+            root = Path(project_dir)
+            _touch(root, ".gitignore", "*.md\n")
+            _touch(root, ".canifyignore", "!docs/*.md\n!build/\n")
+            _touch(root, "docs/api/.gitignore", "!public.md\n")
+            matcher = IgnoreMatcher(root)
+
+            assert matcher.is_ignored("README.md")
+            assert not matcher.is_ignored("docs/guide.md")
+            assert matcher.is_ignored("docs/api/private.md")
+            assert not matcher.is_ignored("docs/api/public.md")
+            assert not matcher.is_ignored("build", is_dir=True)
+            assert matcher.is_ignored("node_modules/pkg/index.py")
+
+    def test_reload_picks_up_changed_ignore_file(self):
+        """Rules are cached per directory until reload()."""
+        with tempfile.TemporaryDirectory() as project_dir:
+            root = Path(project_dir)
+            matcher = IgnoreMatcher(root)
+            assert not matcher.is_ignored("notes/a.md")
+
+            _touch(root, ".canifyignore", "notes/\n")
+            assert not matcher.is_ignored("notes/a.md")
+            matcher.reload()
+            assert matcher.is_ignored("notes/a.md")
+
+    def test_escapes_and_blank_lines(self):
+        """Escaped leading characters are literal and blank lines are skipped."""
+        rules = parse_ignore_lines(["", "   ", "\\#hash.md", "\\!bang.md"])
+        assert [rule.pattern for rule in rules] == ["#hash.md", "!bang.md"]
+        assert not any(rule.negated for rule in rules)
+
+    def test_walker_prunes_ignored_directories(self):
+        """The walker never descends into ignored directories."""
+        with tempfile.TemporaryDirectory() as project_dir:
+            root = Path(project_dir)
+            _touch(root, ".gitignore", "vendor/\nskip.md\n")
+            _touch(root, "keep.md")
+            _touch(root, "skip.md")
+            _touch(root, "vendor/lib/a.md")
+            _touch(root, "node_modules/pkg/b.md")
+            _touch(root, "env/pyvenv.cfg")
+            _touch(root, "env/lib/c.py")
+            _touch(root, "docs/spec_rules.yaml")
+
+            walker = FileWalker(root)
+            found = {walked.relative_path: walked.kind for walked in walker.walk()}
+
+            assert found == {"keep.md": "markdown", str(Path("docs/spec_rules.yaml")): "spec"}
+            assert walker.directories_pruned == 3
@@ -0,0 +1,59 @@
+"""
+Tests for reverse-dependency impact analysis over the reference graph.
+"""
+
+from pathlib import Path
+
+from src.canify.daemon.impact_analyzer import ImpactAnalyzer
+
+
+def _write_chain(root: Path, count: int) -> None:
+    """Create entities where node-i owns node-(i-1), closing a cycle at node-0."""
+    for i in range(count):
+        (root / f"node{i}.md").write_text(f"""
+```entity
+id: node-{i}
+type: Node
+name: Node {i}
+owner: entity://node-{(i - 1) % count}
+```
+""")
+
+
+class TestImpactAnalyzer:
+    """Test transitive impact queries, depth limits and cache invalidation."""
+
+    def test_transitive_impact_with_and_without_index(self, symbol_table, project_id, project_root, make_indexer):
+        """SQL and in-memory traversals agree, terminate on cycles and honour max_depth."""
+        _write_chain(project_root, 6)
+        make_indexer().scan(project_id)
+
+        for loaded in (False, True):
+            if loaded:
+                symbol_table.load_index(project_id)
+            analyzer = ImpactAnalyzer(symbol_table)
+
+            report = analyzer.analyze(project_id, ["node-2"])
+            assert report.dependent_entities == ["node-3"]
+            assert report.impacted_entities == ["node-0", "node-1", "node-3", "node-4", "node-5"]
+            assert [ref["source_entity_id"] for ref in report.direct_references] == ["node-3"]
+
+            limited = analyzer.analyze(project_id, ["node-2"], max_depth=2)
+            assert limited.impacted_entities == ["node-3", "node-4"]
+            # Files holding references to node-2, node-3 and node-4
+            assert [Path(path).name for path in limited.impacted_files] == ["node3.md", "node4.md", "node5.md"]
+
+    def test_cache_is_invalidated_by_writes(self, symbol_table, project_id, project_root, make_indexer):
+        """Repeated queries hit the cache until the next write transaction."""
+        _write_chain(project_root, 4)
+        indexer = make_indexer()
+        indexer.scan(project_id)
+        analyzer = ImpactAnalyzer(symbol_table)
+
+        assert not analyzer.analyze(project_id, ["node-0"]).cached
+        assert analyzer.analyze(project_id, ["node-0"]).cached
+
+        indexer.delete_file(project_id, "node2.md")
+        report = analyzer.analyze(project_id, ["node-0"])
+        assert not report.cached
+        assert report.impacted_entities == ["node-1"]
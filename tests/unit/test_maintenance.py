@@ -0,0 +1,66 @@
+"""
+Tests for idle-time WAL checkpoints and incremental vacuum.
+"""
+
+import sqlite3
+
+from src.canify.storage import DatabaseManager
+from src.canify.storage.maintenance import MaintenanceScheduler
+from src.canify.storage.project_databases import legacy_db_path, list_project_databases, vacuum_project_databases
+
+
+def _churn(db_manager: DatabaseManager) -> None:
+    """Insert and delete enough rows to leave free pages and a large WAL behind."""
+    with db_manager.transaction() as conn:
+        conn.execute("CREATE TABLE IF NOT EXISTS churn (payload TEXT)")
+        conn.executemany("INSERT INTO churn VALUES (?)", [("x" * 500,)] * 4000)
+    with db_manager.transaction() as conn:
+        conn.execute("DELETE FROM churn")
+
+
+class TestMaintenanceScheduler:
+    """Test that maintenance steps return space and report file statistics."""
+
+    def test_steps_reclaim_free_pages_and_truncate_wal(self, db_manager):
+        """New databases use incremental auto-vacuum, and steps shrink both files."""
+        _churn(db_manager)
+        scheduler = MaintenanceScheduler(db_manager)
+
+        before = scheduler.get_stats()
+        assert before["auto_vacuum"] == "incremental"
+        assert before["freelist_count"] > 0 and before["wal_size_bytes"] > 0
+
+        for _ in range(100):
+            if scheduler.run_step(budget=0.5)["done"]:
+                break
+
+        after = scheduler.get_stats()
+        assert after["freelist_count"] == 0
+        assert after["wal_size_bytes"] == 0
+        assert after["db_size_bytes"] < before["db_size_bytes"]
+        assert after["pages_vacuumed"] >= before["freelist_count"]
+        assert after["truncations"] >= 1 and after["maintenance_seconds"] > 0
+
+    def test_existing_databases_are_converted_only_on_request(self, tmp_path, make_database):
+        """Opening an old database leaves its mode alone; 'db vacuum' converts project databases but not the legacy one."""
+        home = tmp_path / "home"
+        project_path = home / "projects" / "docs-0123456789ab.db"
+        project_path.parent.mkdir(parents=True)
+        for db_path in (project_path, legacy_db_path(home)):
+            conn = sqlite3.connect(db_path)
+            conn.execute("PRAGMA journal_mode = WAL")
+            conn.execute("CREATE TABLE legacy (value TEXT)")
+            conn.commit()
+            conn.close()
+
+            db_manager = make_database(db_path)
+            assert db_manager.get_file_stats()["auto_vacuum"] == "none"
+            db_manager.close()
+
+        assert [db.db_path for db in vacuum_project_databases(home, dry_run=True)] == [project_path]
+        [converted] = vacuum_project_databases(home)
+        assert (converted.db_path, converted.auto_vacuum, converted.error) == (project_path, "incremental", None)
+        assert vacuum_project_databases(home) == []
+
+        modes = {db.db_path: db.auto_vacuum for db in list_project_databases(home)}
+        assert modes == {legacy_db_path(home): "none", project_path: "incremental"}
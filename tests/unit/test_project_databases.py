@@ -0,0 +1,84 @@
+"""
+Tests for per-project database placement, legacy migration and garbage collection.
+"""
+
+import shutil
+from pathlib import Path
+
+import pytest
+
+from src.canify.storage import DatabaseManager, SymbolTableManager
+from src.canify.storage.project_databases import (
+    gc_project_databases, legacy_db_path, list_project_databases, migrate_from_legacy, project_db_path
+)
+
+
+def _write_project(root: Path) -> None:
+    (root / "doc.md").write_text("""
+See [task](entity://task-2).
+
+```entity
+id: task-1
+type: Task
+name: Task 1
+```
+""")
+
+
+@pytest.fixture
+def index(make_database, make_indexer):
+    """Scan a project into a database at the given path and close the database."""
+
+    def scan(root: Path, db_path: Path) -> None:
+        indexer = make_indexer(make_database(db_path), root)
+        indexer.scan(indexer.symbol_table.get_or_create_project(root))
+        indexer.db_manager.close()
+
+    return scan
+
+
+class TestProjectDatabases:
+    """Test database placement, migration from the shared database and gc."""
+
+    def test_paths_are_distinct_per_project(self, tmp_path):
+        """Projects with the same directory name get different database files."""
+        home = tmp_path / "home"
+        a, b = tmp_path / "first" / "docs", tmp_path / "second" / "docs"
+        assert project_db_path(a, home=home) != project_db_path(b, home=home)
+        assert project_db_path(a, home=home).parent == home / "projects"
+        assert project_db_path(a, in_project=True) == a.absolute() / ".canify" / "index.db"
+
+    def test_migration_moves_project_rows_out_of_the_legacy_database(
+        self, tmp_path, project_root, index, make_database
+    ):
+        """Rows are copied once, keep their ids and are removed from the shared database."""
+        home = tmp_path / "home"
+        _write_project(project_root)
+        index(project_root, legacy_db_path(home))
+
+        db_manager = make_database(project_db_path(project_root, home=home))
+        assert migrate_from_legacy(db_manager, project_root, legacy_db_path(home)) > 0
+        assert migrate_from_legacy(db_manager, project_root, legacy_db_path(home)) == 0
+
+        symbol_table = SymbolTableManager(db_manager)
+        project_id = symbol_table.get_or_create_project(project_root)
+        assert symbol_table.get_entity_by_id(project_id, "task-1") is not None
+        assert symbol_table.count_dangling_references(project_id) == 1
+
+        legacy = DatabaseManager(legacy_db_path(home)).connect()
+        assert legacy.execute("SELECT COUNT(*) FROM entity_declarations").fetchone()[0] == 0
+
+    def test_gc_removes_databases_of_deleted_projects(self, tmp_path, index):
+        """Only databases whose project directories are gone are collected."""
+        home = tmp_path / "home"
+        kept, removed = tmp_path / "projects" / "kept", tmp_path / "projects" / "removed"
+        for root in (kept, removed):
+            root.mkdir(parents=True)
+            _write_project(root)
+            index(root, project_db_path(root, home=home))
+        shutil.rmtree(removed)
+
+        assert [db.db_path for db in gc_project_databases(home, dry_run=True)] == [project_db_path(removed, home=home)]
+        gc_project_databases(home)
+        assert [db.db_path for db in list_project_databases(home)] == [project_db_path(kept, home=home)]
+        assert not Path(f"{project_db_path(removed, home=home)}-wal").exists()
@@ -0,0 +1,212 @@
+"""
+Tests for the project indexer used by the daemon's initial scan.
+"""
+
+import builtins
+from pathlib import Path
+
+from src.canify.storage import SymbolTableManager
+
+
+def _write_project(root: Path, count: int) -> None:
+    """Create a small project with cross-referencing entities."""
+    for i in range(count):
+        (root / f"doc{i}.md").write_text(f"""
+# Doc {i}
+
+Links to [previous](entity://task-{i - 1}).
+
+```entity
+id: task-{i}
+type: Task
+name: Task {i}
+```
+""")
+    (root / "models.py").write_text(
+        "from pydantic import BaseModel\n\nclass Task(BaseModel):\n    name: str\n"
+    )
+
+
+def _table_rows(symbol_table: SymbolTableManager, table: str, columns: str):
+    """All rows of a table, including row ids, so deleted and re-inserted rows show up as changes."""
+    conn = symbol_table.db_manager.connect()
+    return sorted(tuple(row) for row in conn.execute(f"SELECT id, {columns} FROM {table}"))  # noqa: S608
+
+
+class TestProjectIndexer:
+    """Test full scans and single-file updates."""
+
+    def test_parallel_scan_matches_serial_scan(
+        self, symbol_table, project_id, project_root, make_database, make_indexer
+    ):
+        """A process-pool scan stores exactly what a serial scan stores."""
+        _write_project(project_root, 80)
+
+        serial_stats = make_indexer(batch_size=16).scan(project_id)
+        parallel = make_indexer(make_database("parallel.db"), scan_workers=2, batch_size=16)
+        parallel_table = parallel.symbol_table
+        parallel_id = parallel_table.get_or_create_project(project_root)
+        parallel_stats = parallel.scan(parallel_id)
+
+        assert parallel_stats.workers == 2
+        assert serial_stats.files == parallel_stats.files == 81
+        assert (
+            sorted(symbol_table.get_entity_locations(project_id).items())
+            == sorted(parallel_table.get_entity_locations(parallel_id).items())
+        )
+        assert len(parallel_table.get_all_references(parallel_id)) == 80
+        assert parallel_table.get_schema_by_entity_type(parallel_id, "Task") is not None
+
+    def test_updating_a_file_does_not_report_its_own_entities_as_duplicates(
+        self, symbol_table, project_id, project_root, make_indexer
+    ):
+        """Re-indexing an unchanged file keeps its declarations."""
+        _write_project(project_root, 3)
+        indexer = make_indexer()
+        indexer.scan(project_id)
+
+        indexer.update_file(project_id, "doc1.md")
+
+        assert symbol_table.get_entity_by_id(project_id, "task-1") is not None
+        assert symbol_table.get_file_record(project_id, "doc1.md")["status"] == "parsed"
+
+    def test_incremental_scan_only_reprocesses_changed_files(
+        self, symbol_table, project_id, project_root, make_indexer
+    ):
+        """A warm rescan skips unchanged files, reparses edits and drops deleted files."""
+        _write_project(project_root, 5)
+        indexer = make_indexer()
+        indexer.scan(project_id)
+
+        (project_root / "doc1.md").write_text("""
+```entity
+id: task-1-renamed
+type: Task
+name: Renamed
+```
+""")
+        (project_root / "doc2.md").unlink()
+        # Touch without changing content: stat differs but the hash matches
+        (project_root / "doc3.md").write_text((project_root / "doc3.md").read_text())
+
+        stats = indexer.scan(project_id, incremental=True)
+
+        assert stats.files == 1
+        assert stats.unchanged_files == 4
+        assert stats.deleted_files == 1
+        assert symbol_table.get_entity_by_id(project_id, "task-1") is None
+        assert symbol_table.get_entity_by_id(project_id, "task-1-renamed") is not None
+        assert symbol_table.get_entity_by_id(project_id, "task-2") is None
+        assert symbol_table.get_file_record(project_id, "doc2.md") is None
+        assert symbol_table.get_entity_by_id(project_id, "task-3") is not None
+
+    def test_dangling_references_follow_declaration_changes(self, symbol_table, project_id, project_root, make_indexer):
+        """Resolved targets and the dangling count track added and removed declarations."""
+        _write_project(project_root, 4)
+        indexer = make_indexer()
+        indexer.scan(project_id)
+
+        def dangling():
+            return sorted(ref.target_entity_id for ref in symbol_table.get_dangling_references(project_id))
+
+        for loaded in (False, True):
+            if loaded:
+                symbol_table.load_index(project_id)
+            assert dangling() == ["task--1"]
+
+            indexer.delete_file(project_id, "doc2.md")
+            assert dangling() == ["task--1", "task-2"]
+            assert symbol_table.count_dangling_references(project_id) == 2
+
+            (project_root / "doc2.md").write_text("```entity\nid: task-2\ntype: Bug\nname: Bug\n```\n")
+            indexer.update_file(project_id, "doc2.md")
+            assert dangling() == ["task--1"]
+            assert symbol_table.count_dangling_references(project_id) == 1
+            [reference] = symbol_table.get_references_by_target(project_id, "task-2")
+            assert reference.target_entity_type == "Bug"
+
+    def test_file_updates_skip_unchanged_content_and_reuse_cached_parses(
+        self, symbol_table, project_id, project_root, make_indexer
+    ):
+        """Touches are not reparsed, and content restored after a round trip comes from the parse cache."""
+        _write_project(project_root, 3)
+        indexer = make_indexer()
+        indexer.scan(project_id)
+        cache = indexer.processor.parse_cache
+        original = (project_root / "doc1.md").read_text()
+
+        (project_root / "doc1.md").write_text(original)
+        assert indexer.update_file(project_id, "doc1.md").unchanged
+
+        # Switch to another branch and back
+        (project_root / "doc1.md").write_text("```entity\nid: task-1b\ntype: Task\nname: Other\n```\n")
+        assert not indexer.update_file(project_id, "doc1.md").unchanged
+        assert symbol_table.get_entity_by_id(project_id, "task-1") is None
+
+        (project_root / "doc1.md").write_text(original)
+        restored = indexer.update_file(project_id, "doc1.md")
+        assert cache.get_stats()["hits"] == 1
+        assert restored.entity_ids == ["task-1"]
+        assert symbol_table.get_entity_by_id(project_id, "task-1") is not None
+        assert symbol_table.get_entity_by_id(project_id, "task-1b") is None
+
+    def test_updates_touch_only_the_tables_of_the_file_kind(
+        self, monkeypatch, symbol_table, project_id, project_root, make_indexer
+    ):
+        """Python and spec updates leave markdown symbols alone; plain YAML files are not even read."""
+        _write_project(project_root, 3)
+        (project_root / "spec_rules.yaml").write_text(
+            "specs:\n  - id: r1\n    name: R1\n    levels: {verify: error}\n"
+            "    fixture: fixtures.all\n    test_case: tests.check\n"
+        )
+        indexer = make_indexer()
+        indexer.scan(project_id)
+
+        def snapshot(table: str, columns: str):
+            return _table_rows(symbol_table, table, columns)
+
+        declarations = snapshot("entity_declarations", "entity_id")
+        references = snapshot("entity_references", "target_entity_id")
+        markdown_dependencies = [row for row in snapshot("symbol_dependencies", "depended_symbol_type")
+                                 if row[1] != "entity_type"]
+
+        # Python: only the schemas change
+        (project_root / "models.py").write_text(
+            "from pydantic import BaseModel\n\nclass Task(BaseModel):\n    name: str\n    done: bool\n"
+        )
+        indexer.update_file(project_id, "models.py")
+        assert snapshot("entity_declarations", "entity_id") == declarations
+        assert snapshot("entity_references", "target_entity_id") == references
+        fields = symbol_table.get_schema_by_name(project_id, "Task")["fields"]
+        assert [field["name"] for field in fields] == ["name", "done"]
+
+        # Plain YAML: classified and skipped without opening the file
+        (project_root / "config.yaml").write_text("key: value\n")
+        opened = []
+        real_open = builtins.open
+
+        def spy_open(file, *args, **kwargs):
+            opened.append(Path(file).name)
+            return real_open(file, *args, **kwargs)
+
+        monkeypatch.setattr(builtins, "open", spy_open)
+        symbols = indexer.update_file(project_id, "config.yaml")
+        monkeypatch.undo()
+        assert "config.yaml" not in opened
+        assert (symbols.kind, symbols.file_hash, symbols.error) == ("yaml", "", None)
+        assert symbol_table.get_file_record(project_id, "config.yaml") is None
+
+        # Spec: only the file's spec rules and its dependency row change
+        schemas = snapshot("entity_schemas", "schema_name")
+        (project_root / "spec_rules.yaml").write_text(
+            "specs:\n  - id: r2\n    name: R2\n    levels: {verify: error}\n"
+            "    fixture: fixtures.all\n    test_case: tests.check\n"
+        )
+        indexer.update_file(project_id, "spec_rules.yaml")
+        assert snapshot("entity_declarations", "entity_id") == declarations
+        assert snapshot("entity_references", "target_entity_id") == references
+        assert snapshot("entity_schemas", "schema_name") == schemas
+        assert [row[1] for row in snapshot("spec_rules", "rule_id")] == ["r2"]
+        dependencies = snapshot("symbol_dependencies", "depended_symbol_type")
+        assert [row for row in dependencies if row[1] != "entity_type"] == markdown_dependencies
+        assert [row[1] for row in dependencies if row[1] == "entity_type"] == ["entity_type"]
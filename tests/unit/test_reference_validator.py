@@ -0,0 +1,69 @@
+"""
+Tests for batched reference validation.
+"""
+
+from src.canify.models import EntityDeclaration, Location
+from src.canify.validation.reference_validator import ReferenceValidator
+
+MODELS = """from typing import Annotated
+from pydantic import BaseModel
+from canify.types import CanifyReference, Ref
+
+class Task(BaseModel):
+    name: str
+    owner: Annotated[CanifyReference, Ref("User")]
+"""
+
+ENTITIES = """```entity
+id: task-1
+type: Task
+name: Ship it
+owner: entity://team-1
+```
+
+```entity
+id: team-1
+type: Team
+name: Platform
+```
+
+See [the owner](entity://user-1) and [a ghost](entity://missing-1).
+"""
+
+
+class TestReferenceValidator:
+    """Test existence and type checks over batch-resolved entity types."""
+
+    def test_validate_all(self, symbol_table, project_id, project_root, make_indexer):
+        """Missing targets and type mismatches are reported; given entities count as existing."""
+        (project_root / "models.py").write_text(MODELS)
+        (project_root / "tasks.md").write_text(ENTITIES)
+        make_indexer().scan(project_id)
+
+        # References fresh from the parser carry no resolved target type
+        references = [
+            reference.model_copy(update={"target_entity_type": None})
+            for reference in symbol_table.get_all_references(project_id)
+        ]
+        validator = ReferenceValidator(symbol_table)
+
+        result = validator.validate_all(project_id, references, [])
+        assert result.total_checks == 3
+        assert sorted(error.rule_id for error in result.errors) == [
+            "reference-existence", "reference-existence", "reference-type-mismatch"
+        ]
+
+        # An entity from the caller's list resolves without being in the symbol table
+        user = EntityDeclaration(
+            location=Location(file_path=project_root / "users.md", start_line=1, end_line=1),
+            entity_type="User",
+            entity_id="user-1",
+            name="Ada",
+            raw_data={"id": "user-1", "type": "User", "name": "Ada"},
+            source_code="",
+        )
+        result = validator.validate_all(project_id, references, [user])
+        assert [error.entity_id for error in result.errors if error.rule_id == "reference-existence"] == ["missing-1"]
+        assert symbol_table.get_entity_types(project_id, ["task-1", "team-1", "missing-1"]) == {
+            "task-1": "Task", "team-1": "Team"
+        }
@@ -0,0 +1,69 @@
+"""
+Tests for the decoded schema registry.
+"""
+
+import json
+
+import pytest
+
+from src.canify.storage import SymbolTableManager
+from src.canify.storage.file_symbols import FileSymbols
+from src.canify.storage.schema_registry import SchemaRegistry
+
+
+def _row(name: str, file_path: str, version: int = 1):
+    """A schema row whose data records the file and version it came from."""
+    data = {"name": name, "file_path": file_path, "version": version, "fields": []}
+    return (name, name, json.dumps(data), "", file_path, 1)
+
+
+class TestSchemaRegistry:
+    """Test lookups, cross-file overrides, per-file invalidation and transaction visibility."""
+
+    def test_per_file_updates(self):
+        """Schemas are decoded once; replacing or removing a file only touches that file's schemas."""
+        registry = SchemaRegistry()
+        registry.load(1, [("a.py", "Task", "Task", json.dumps({"name": "Task"}))])
+        registry.add_schemas("b.py", [_row("User", "b.py"), _row("Team", "b.py")])
+        assert registry.decodes == 3
+
+        assert registry.get_by_entity_type("User")["file_path"] == "b.py"
+        assert registry.get_by_name("Task") is registry.get_by_entity_type("Task")
+        assert registry.decodes == 3
+
+        # A schema redefined in another file moves there, like INSERT OR REPLACE on entity_schemas
+        registry.add_schemas("c.py", [_row("User", "c.py")])
+        registry.remove_file("b.py")
+        assert registry.get_by_entity_type("User")["file_path"] == "c.py"
+        assert registry.get_by_name("Team") is None
+
+        # replace=True drops the file's schemas that are no longer defined
+        registry.add_schemas("c.py", [_row("Project", "c.py")], replace=True)
+        assert sorted(registry.get_entity_types()) == ["Project", "Task"]
+        assert not registry.has_file("b.py")
+        assert registry.has_file("c.py")
+
+    def test_registry_follows_symbol_table(self, db_manager, symbol_table, project_id):
+        """With the registry loaded, schema reads match the table after writes and rollbacks."""
+        loaded = symbol_table
+        loaded.replace_file_symbols(project_id, FileSymbols("a.py", schemas=[_row("Task", "a.py")]))
+        loaded.load_index(project_id)
+        table = SymbolTableManager(db_manager)
+
+        def schemas(symbol_table):
+            return {
+                name: symbol_table.get_schema_by_entity_type(project_id, name)
+                for name in ("Task", "User")
+            }
+
+        with pytest.raises(RuntimeError), db_manager.transaction():
+            loaded.replace_file_symbols(project_id, FileSymbols("a.py", schemas=[_row("User", "a.py")]))
+            assert schemas(loaded) == schemas(table)
+            assert schemas(loaded)["Task"] is None
+            raise RuntimeError("roll back")
+
+        assert schemas(loaded) == schemas(table)
+        assert schemas(loaded)["Task"]["file_path"] == "a.py"
+
+        loaded.delete_file(project_id, "a.py")
+        assert schemas(loaded) == schemas(table) == {"Task": None, "User": None}
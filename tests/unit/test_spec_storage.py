@@ -0,0 +1,70 @@
+"""
+Tests for spec rule storage and the normalized spec_rule_tags table.
+"""
+
+import pytest
+
+from src.canify.models import SpecificationRule
+from src.canify.storage import SpecStorageManager
+
+
+def _spec(rule_id: str, tags=None) -> SpecificationRule:
+    return SpecificationRule(
+        id=rule_id,
+        name=rule_id,
+        levels={"verify": "error"},
+        fixture="fixtures.all",
+        test_case="tests.check",
+        tags=tags,
+    )
+
+
+@pytest.fixture
+def storage(db_manager) -> SpecStorageManager:
+    """Spec storage over the test database."""
+    return SpecStorageManager(db_manager)
+
+
+class TestSpecRuleTags:
+    """Test tag queries, tag counts and keeping the tag table in sync."""
+
+    def test_tag_set_operations(self, storage, project_id):
+        """Union, intersection and exclusion select the expected rules."""
+        storage.store_specs(project_id, "spec_a.yaml", [
+            _spec("r1", ["core", "fast"]),
+            _spec("r2", ["core", "slow"]),
+            _spec("r3", ["fast"]),
+            _spec("r4"),
+        ])
+
+        def ids(specs):
+            return [spec.id for spec in specs]
+
+        assert ids(storage.get_specs_by_tags(project_id, ["core"])) == ["r1", "r2"]
+        assert ids(storage.get_specs_by_tags(project_id, ["core", "fast"])) == ["r1", "r2", "r3"]
+        assert ids(storage.get_specs_by_tags(project_id, ["core", "fast"], match_all=True)) == ["r1"]
+        assert ids(storage.get_specs_by_tags(project_id, ["core"], exclude_tags=["slow"])) == ["r1"]
+        assert storage.get_specs_by_tags(project_id, []) == []
+        assert storage.get_all_tags(project_id) == ["core", "fast", "slow"]
+        assert storage.count_specs_by_tag(project_id) == {"core": 2, "fast": 2, "slow": 1}
+
+    def test_tags_follow_store_and_delete(self, storage, project_id):
+        """Re-storing or deleting a file's rules updates the tag table."""
+        storage.store_specs(project_id, "spec_a.yaml", [_spec("r1", ["core"])])
+        storage.store_specs(project_id, "spec_b.yaml", [_spec("r2", ["core", "nightly"])])
+
+        storage.store_specs(project_id, "spec_a.yaml", [_spec("r1", ["nightly"])])
+        assert storage.count_specs_by_tag(project_id) == {"core": 1, "nightly": 2}
+
+        storage.delete_specs_by_file(project_id, "spec_b.yaml")
+        assert storage.count_specs_by_tag(project_id) == {"nightly": 1}
+        assert [spec.id for spec in storage.get_specs_by_tags(project_id, ["core"])] == []
+
+    def test_existing_database_is_backfilled(self, db_manager, storage, project_id):
+        """Tags of rules stored before the tag table existed are backfilled."""
+        storage.store_specs(project_id, "spec_a.yaml", [_spec("r1", ["core", "fast"])])
+        with db_manager.transaction() as conn:
+            conn.execute("DELETE FROM spec_rule_tags")
+
+        db_manager.initialize_schema()
+        assert storage.count_specs_by_tag(project_id) == {"core": 1, "fast": 1}
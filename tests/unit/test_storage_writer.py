@@ -0,0 +1,87 @@
+"""
+Tests for the single-threaded storage writer.
+"""
+
+import threading
+
+import pytest
+
+from src.canify.storage import DatabaseManager
+from src.canify.storage.storage_writer import StorageWriter
+
+
+@pytest.fixture
+def db_manager(db_manager) -> DatabaseManager:
+    """The shared test database with an items table to write to."""
+    with db_manager.transaction() as conn:
+        conn.execute("CREATE TABLE items (value INTEGER)")
+    return db_manager
+
+
+def _insert(db_manager: DatabaseManager, value: int):
+    def operation():
+        db_manager.connect().execute("INSERT INTO items (value) VALUES (?)", (value,))
+        return value
+    return operation
+
+
+def _values(db_manager: DatabaseManager):
+    return sorted(row[0] for row in db_manager.connect().execute("SELECT value FROM items"))
+
+
+class TestStorageWriter:
+    """Test batching, per-operation failures and shutdown."""
+
+    def test_operations_are_batched(self, db_manager):
+        """Operations queued together are committed in one transaction, in order."""
+        writer = StorageWriter(db_manager, max_batch_size=100, max_batch_delay=0.5)
+        writer.start()
+        try:
+            futures = [writer.submit(_insert(db_manager, i)) for i in range(10)]
+            assert [future.result(timeout=5) for future in futures] == list(range(10))
+            assert writer.get_stats()["batches_committed"] == 1
+            assert writer.last_batch_size == 10
+            assert _values(db_manager) == list(range(10))
+        finally:
+            writer.stop()
+
+    def test_failed_operation_does_not_poison_batch(self, db_manager):
+        """A failing operation is rolled back alone; the rest of its batch commits."""
+        writer = StorageWriter(db_manager, max_batch_size=100, max_batch_delay=0.5)
+
+        def failing():
+            db_manager.connect().execute("INSERT INTO items (value) VALUES (99)")
+            raise ValueError("boom")
+
+        writer.start()
+        try:
+            futures = [writer.submit(_insert(db_manager, 1)), writer.submit(failing), writer.submit(_insert(db_manager, 2))]
+            with pytest.raises(ValueError):
+                futures[1].result(timeout=5)
+            assert futures[0].result(timeout=5) == 1
+            assert futures[2].result(timeout=5) == 2
+            assert writer.get_stats()["operations_failed"] == 1
+            assert writer.get_stats()["batches_committed"] == 1
+            assert _values(db_manager) == [1, 2]
+        finally:
+            writer.stop()
+
+    def test_stop_drains_queue_and_later_submits_run_inline(self, db_manager):
+        """Queued operations finish on stop; operations racing or following stop still resolve."""
+        writer = StorageWriter(db_manager, max_batch_size=1000, max_batch_delay=10)
+        writer.start()
+        queued = [writer.submit(_insert(db_manager, i)) for i in range(5)]
+
+        racing = []
+        submitter = threading.Thread(
+            target=lambda: racing.extend(writer.submit(_insert(db_manager, 100 + i)) for i in range(200))
+        )
+        submitter.start()
+        writer.stop()
+        submitter.join()
+
+        assert not writer.is_running
+        assert all(future.result(timeout=5) is not None for future in queued + racing)
+        assert writer.execute(_insert(db_manager, 500)) == 500
+        assert _values(db_manager) == [*range(5), *range(100, 300), 500]
+
@@ -0,0 +1,99 @@
+"""
+Tests for keeping the in-memory symbol index in sync with the committed tables.
+"""
+
+import threading
+
+import pytest
+
+from src.canify.storage import SymbolTableManager
+
+
+def _state(symbol_table: SymbolTableManager, project_id: int):
+    """Entities, references and the dangling count as seen by one symbol table."""
+    return (
+        sorted(symbol_table.get_entity_summaries(project_id)),
+        sorted(symbol_table.get_reference_summaries(project_id)),
+        symbol_table.count_dangling_references(project_id),
+    )
+
+
+class TestSymbolIndexRollback:
+    """The index must match the tables after savepoint and transaction rollbacks."""
+
+    def test_nested_rollback_restores_index(self, db_manager, symbol_table, project_id, file_symbols):
+        """Rolling back an inner savepoint undoes only its changes to the index."""
+        symbol_table.replace_file_symbols(project_id, file_symbols("a.md", ["task-1"], ["task-2", "task-3"]))
+        symbol_table.replace_file_symbols(project_id, file_symbols("b.md", ["task-2"], ["task-1"]))
+        symbol_table.load_index(project_id)
+        table = SymbolTableManager(db_manager)  # index never loaded: reads the tables
+
+        initial = _state(symbol_table, project_id)
+        assert initial == _state(table, project_id)
+        assert initial[2] == 1  # task-3 is missing
+
+        with pytest.raises(RuntimeError), db_manager.transaction():
+            # Declaring task-3 resolves the dangling reference
+            symbol_table.replace_file_symbols(project_id, file_symbols("c.md", ["task-3"]))
+            committed_inner = _state(symbol_table, project_id)
+            assert committed_inner == _state(table, project_id)
+            assert committed_inner[2] == 0
+
+            with pytest.raises(RuntimeError), db_manager.transaction():
+                # Deleting b.md leaves a.md's reference to task-2 dangling
+                symbol_table.delete_file(project_id, "b.md")
+                symbol_table.replace_file_symbols(project_id, file_symbols("a.md", ["task-1"], ["task-4"]))
+                assert _state(symbol_table, project_id) == _state(table, project_id)
+                assert _state(symbol_table, project_id)[2] == 1
+                raise RuntimeError("roll back the savepoint")
+
+            assert _state(symbol_table, project_id) == committed_inner
+            assert _state(table, project_id) == committed_inner
+            raise RuntimeError("roll back the transaction")
+
+        assert _state(symbol_table, project_id) == initial
+        assert _state(table, project_id) == initial
+
+    def test_failed_operation_in_batch_restores_index(self, db_manager, symbol_table, project_id, file_symbols):
+        """An operation that fails after touching the index is undone without affecting its neighbours."""
+        symbol_table.replace_file_symbols(project_id, file_symbols("a.md", ["task-1"], ["task-9"]))
+        symbol_table.load_index(project_id)
+        table = SymbolTableManager(db_manager)
+
+        with db_manager.transaction():
+            symbol_table.replace_file_symbols(project_id, file_symbols("b.md", ["task-2"], ["task-1"]))
+            with pytest.raises(RuntimeError), db_manager.transaction():
+                symbol_table.replace_file_symbols(project_id, file_symbols("c.md", ["task-9"]))
+                raise RuntimeError("fail after the index was updated")
+
+        state = _state(symbol_table, project_id)
+        assert state == _state(table, project_id)
+        assert [summary.entity_id for summary in state[0]] == ["task-1", "task-2"]
+        assert state[2] == 1
+
+    def test_other_threads_see_only_committed_changes(self, db_manager, symbol_table, project_id, file_symbols):
+        """Index reads from other threads ignore an open transaction and never see a rolled-back one."""
+        symbol_table.replace_file_symbols(project_id, file_symbols("a.md", ["task-1"], ["task-2"]))
+        symbol_table.load_index(project_id)
+
+        def read_elsewhere():
+            seen = []
+            reader = threading.Thread(target=lambda: seen.append((
+                symbol_table.get_entity_by_id(project_id, "task-2") is not None,
+                symbol_table.count_dangling_references(project_id),
+            )))
+            reader.start()
+            reader.join()
+            return seen[0]
+
+        with pytest.raises(RuntimeError), db_manager.transaction():
+            symbol_table.replace_file_symbols(project_id, file_symbols("b.md", ["task-2"]))
+            assert symbol_table.get_entity_by_id(project_id, "task-2") is not None  # the writer sees its own rows
+            assert read_elsewhere() == (False, 1)
+            raise RuntimeError("commit failed")
+        assert read_elsewhere() == (False, 1)
+
+        with db_manager.transaction():
+            symbol_table.replace_file_symbols(project_id, file_symbols("b.md", ["task-2"]))
+            assert read_elsewhere() == (False, 1)
+        assert read_elsewhere() == (True, 0)
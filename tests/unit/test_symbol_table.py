@@ -0,0 +1,140 @@
+"""
+Tests for symbol table writes and reads.
+"""
+
+import sqlite3
+
+import pytest
+
+from src.canify.models import SpecificationRule
+from src.canify.storage import SymbolTableManager
+from src.canify.storage.file_symbols import FileSymbols
+
+
+def _file_state(symbol_table: SymbolTableManager, project_id: int, file_path: str):
+    """Declarations, references and file record of one file."""
+    record = symbol_table.get_file_record(project_id, file_path)
+    return (
+        sorted(entity.entity_id for entity in symbol_table.get_entities_by_file(project_id, file_path)),
+        sorted(ref.target_entity_id for ref in symbol_table.get_references_by_file(project_id, file_path)),
+        (record["file_hash"], record["status"]),
+    )
+
+
+class TestReplaceFileSymbols:
+    """replace_file_symbols swaps a file's symbols in one transaction."""
+
+    @pytest.mark.parametrize("load_index", [False, True])
+    def test_failure_after_delete_keeps_old_rows(self, load_index, symbol_table, project_id, file_symbols):
+        """An insert that fails after the old rows were deleted leaves the file unchanged."""
+        symbol_table.replace_file_symbols(project_id, file_symbols("a.md", ["task-1"], ["task-2"], "h1"))
+        symbol_table.replace_file_symbols(project_id, file_symbols("b.md", ["task-2"]))
+        if load_index:
+            symbol_table.load_index(project_id)
+        before = _file_state(symbol_table, project_id, "a.md")
+
+        # task-2 is already declared in b.md, so the declaration insert violates the unique key
+        with pytest.raises(sqlite3.IntegrityError):
+            symbol_table.replace_file_symbols(
+                project_id, file_symbols("a.md", ["task-3", "task-2"], ["task-4"], "h2")
+            )
+
+        assert _file_state(symbol_table, project_id, "a.md") == before == (["task-1"], ["task-2"], ("h1", "parsed"))
+        assert symbol_table.get_entity_by_id(project_id, "task-3") is None
+        assert symbol_table.count_dangling_references(project_id) == 0
+
+
+class TestBulkInsertSymbols:
+    """bulk_insert_symbols writes many files in one transaction and replaces what they had."""
+
+    def test_bulk_insert_and_replace(self, symbol_table, project_id, file_symbols):
+        """Rows of every kind are written once; rewriting the same files does not duplicate them."""
+        files = [
+            file_symbols(f"f{i}.md", [f"task-{i}"], [f"task-{(i + 1) % 3}", "missing"], f"h{i}")
+            for i in range(3)
+        ]
+        files.append(FileSymbols(
+            file_path="models.py",
+            schemas=[("Task", "Task", '{"name": "Task", "fields": []}', "class Task: ...", "models.py", 1)],
+            file_hash="hm",
+        ))
+        files.append(FileSymbols(
+            file_path="spec_rules.yaml",
+            specs=[SpecificationRule(id="r1", name="R1", levels={"verify": "error"}, fixture="f.x", test_case="t.y")],
+            file_hash="hs",
+        ))
+
+        stats = symbol_table.bulk_insert_symbols(project_id, files)
+        assert (stats.files, stats.declarations, stats.references, stats.schemas, stats.specs) == (5, 3, 6, 1, 1)
+        assert stats.rows == 3 + 6 + stats.dependencies + 1 + 1
+
+        def contents():
+            return (
+                sorted(entity.entity_id for entity in symbol_table.get_all_entities(project_id)),
+                len(symbol_table.get_all_references(project_id)),
+                symbol_table.count_dangling_references(project_id),
+                symbol_table.get_all_schema_names(project_id),
+                [spec.id for _, spec in symbol_table.spec_storage.get_specs_with_files(project_id)],
+                [entity.entity_id for entity in symbol_table.search_entities(project_id, "task-1")],
+            )
+
+        expected = (["task-0", "task-1", "task-2"], 6, 3, ["Task"], ["r1"], ["task-1"])
+        assert contents() == expected
+        assert symbol_table.get_file_record(project_id, "f1.md")["file_hash"] == "h1"
+        assert symbol_table.get_file_record(project_id, "f1.md")["status"] == "parsed"
+
+        symbol_table.bulk_insert_symbols(project_id, files)
+        assert contents() == expected
+        assert symbol_table.bulk_stats.files == 10
+
+        # A later batch replaces a file's rows with its new contents
+        symbol_table.bulk_insert_symbols(project_id, [file_symbols("f0.md", ["task-9"], [], "h9")])
+        assert sorted(entity.entity_id for entity in symbol_table.get_all_entities(project_id)) == [
+            "task-1", "task-2", "task-9"
+        ]
+        assert symbol_table.count_dangling_references(project_id) == 3  # f2.md now refers to the removed task-0
+
+
+def _reference_key(reference):
+    """Everything that identifies a reference except its row id."""
+    return (
+        reference.source_entity_id, reference.target_entity_id, reference.context_text,
+        str(reference.location.file_path), reference.location.start_line,
+    )
+
+
+class TestKeysetIterators:
+    """iter_* read in keyset chunks and yield exactly the rows of the one-shot reads."""
+
+    @pytest.mark.parametrize("chunk_size", [1, 3, 4, 1000])
+    def test_chunk_boundaries_and_duplicate_rows(self, chunk_size, symbol_table, project_id, file_symbols):
+        """Every row is yielded once, in insertion order, whatever the chunk size and prefix filter."""
+        for i, directory in enumerate(["docs", "src", "docs", "src"]):
+            file_path = f"{directory}/f{i}.md"
+            symbols = file_symbols(file_path, [f"task-{i}-{j}" for j in range(3)], ["task-0-0"])
+            # Identical references (same target, text and location) must not collapse across chunks
+            symbols.references += [(None, "missing", "entity://missing", file_path, 7, 1)] * 4
+            symbol_table.replace_file_symbols(project_id, symbols)
+
+        entities = [entity.entity_id for entity in symbol_table.iter_entities(project_id, chunk_size=chunk_size)]
+        assert entities == [entity.entity_id for entity in symbol_table.get_all_entities(project_id)]
+        assert len(entities) == 12
+
+        references = [_reference_key(r) for r in symbol_table.iter_references(project_id, chunk_size=chunk_size)]
+        assert references == [_reference_key(r) for r in symbol_table.get_all_references(project_id)]
+        assert len(references) == 20
+
+        docs = [e.entity_id for e in symbol_table.iter_entities(project_id, "docs/", chunk_size=chunk_size)]
+        assert docs == [f"task-{i}-{j}" for i in (0, 2) for j in range(3)]
+        docs_references = list(symbol_table.iter_references(project_id, "docs/", chunk_size=chunk_size))
+        assert len(docs_references) == 10
+
+        dangling = list(symbol_table.iter_dangling_references(project_id, chunk_size=chunk_size))
+        assert len(dangling) == symbol_table.count_dangling_references(project_id) == 16
+        assert {reference.target_entity_id for reference in dangling} == {"missing"}
+
+        # The index path yields the same rows
+        symbol_table.load_index(project_id)
+        assert [e.entity_id for e in symbol_table.iter_entities(project_id, "docs/")] == docs
+        assert [_reference_key(r) for r in symbol_table.iter_references(project_id)] == references
+        assert len(list(symbol_table.iter_dangling_references(project_id))) == 16
@@ -0,0 +1,75 @@
+"""
+Tests for the continuously maintained validation snapshot.
+"""
+
+from src.canify.daemon.validation_snapshot import ValidationSnapshot
+from src.canify.models import ValidationError, ValidationResult, ValidationSeverity
+
+
+def _result(*entity_ids: str) -> ValidationResult:
+    """A result with one error per entity id; no ids means a clean result."""
+    result = ValidationResult.success_result()
+    for entity_id in entity_ids:
+        result.add_error(ValidationError(
+            rule_id="reference-existence",
+            message=f"missing {entity_id}",
+            severity=ValidationSeverity.ERROR,
+            entity_id=entity_id,
+        ))
+    result.total_checks = 1
+    return result
+
+
+class TestValidationSnapshot:
+    """Test generations, incremental updates and spec result invalidation."""
+
+    def test_generations_and_incremental_updates(self):
+        """Every update bumps the generation; results and entity diagnostics follow the files."""
+        snapshot = ValidationSnapshot()
+        assert not snapshot.is_ready
+
+        assert snapshot.replace({"a.md": _result("task-1"), "b.md": _result()}) == 1
+        assert snapshot.is_ready
+        result, generation = snapshot.collect()
+        assert (len(result.errors), result.total_checks, generation) == (1, 2, 1)
+        assert len(snapshot.get_entity_diagnostics("task-1")) == 1
+
+        # Revalidating a.md clears its diagnostics; removing b.md drops it from collect
+        assert snapshot.update({"a.md": _result()}, removed_files=["b.md"]) == 2
+        result, generation = snapshot.collect()
+        assert (result.success, result.total_checks, generation) == (True, 1, 2)
+        assert snapshot.get_entity_diagnostics("task-1") == []
+        assert snapshot.get_file_result("b.md") is None
+
+        snapshot.update({"docs/c.md": _result("task-3")})
+        result, _ = snapshot.collect(lambda file_path: file_path.startswith("docs/"))
+        assert [error.entity_id for error in result.errors] == ["task-3"]
+
+        # A full rebuild forgets files that are no longer validated
+        assert snapshot.replace({"a.md": _result()}) == 4
+        assert snapshot.get_stats()["files"] == 1
+
+    def test_spec_results_invalidation(self):
+        """Stale spec files drop their cached results; runs that started before that are not cached."""
+        snapshot = ValidationSnapshot()
+        generation = snapshot.replace({})
+        assert snapshot.set_spec_result("spec_a.yaml", "r1", _result(), generation)
+        assert snapshot.set_spec_result("spec_b.yaml", "r2", _result(), generation)
+
+        # A run of r1 starts at this generation, then an entity change invalidates spec_a.yaml
+        started = snapshot.collect()[1]
+        snapshot.update({}, stale_spec_files=["spec_a.yaml"])
+        assert snapshot.get_spec_result("spec_a.yaml", "r1") is None
+        assert snapshot.get_spec_result("spec_b.yaml", "r2") is not None
+        assert not snapshot.set_spec_result("spec_a.yaml", "r1", _result("old"), started)
+        assert snapshot.get_spec_result("spec_a.yaml", "r1") is None
+
+        # Runs started after the invalidation are cached again
+        assert snapshot.set_spec_result("spec_a.yaml", "r1", _result(), snapshot.collect()[1])
+        assert snapshot.get_spec_result("spec_a.yaml", "r1") is not None
+
+        # A rebuild invalidates every spec file, including runs in flight
+        started = snapshot.collect()[1]
+        snapshot.replace({})
+        assert snapshot.get_stats()["cached_spec_results"] == 0
+        assert not snapshot.set_spec_result("spec_b.yaml", "r2", _result(), started)